@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+End-to-end throughput benchmark against local stand-ins.
+
+Runs synthetic work lists through the downloader's browserless path (JIRA REST
+capture, Gerrit queries over SSH, HTTP patch downloads) with the stub JIRA and
+Gerrit servers and the fake ssh command of the test suite, so run modes can be
+compared and regressions caught without production servers or credentials.
+The browser mode drives headless Firefox through the stub's issue pages
+instead (page capture, href harvesting, PDF printing); it needs Firefox and
+GeckoDriver and is only run when asked for.
+Every mode and size runs in its own process, so peak RSS is measured per run.
+
+    python bench/e2e_bench.py --issues 10 100 1000 --links 3
+    python bench/e2e_bench.py --issues 20 --modes batch browser
+    python bench/e2e_bench.py --issues 5000 --workers 4 --delay-ms 20 --save results.json
+    python bench/e2e_bench.py --issues 500 --baseline results.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "test"))
+
+import tracing  # noqa: E402
+from jira_api import JiraApiClient  # noqa: E402
+from main import DownloaderPool, GerritManager, JiraConfig, JiraDownloader  # noqa: E402
+from page_waits import PageWaiter  # noqa: E402
+from patch_downloader import PatchDownloader  # noqa: E402
+from ssh_pool import SshConnectionPool  # noqa: E402
+from stub_gerrit import StubGerrit  # noqa: E402
+from stub_jira import StubJira  # noqa: E402
+
+FAKE_SSH = str(ROOT / "test" / "fake_ssh.py")
+MODES = ("serial", "batch", "pipeline")
+# Batch mode with browser workers, run only when listed in --modes
+BROWSER_MODE = "browser"
+# Servers the synthetic issues link to; all of them are pointed at the stub Gerrit
+LINK_TEMPLATES = [
+    ("10.24.71.91", "http://10.24.71.91/gerrit/{change}"),
+    ("10.230.1.88", "http://10.230.1.88/#/c/{change}/"),
+]
+
+
+def synthetic_issues(count: int, links: int, seed: int = 1) -> Dict[str, Dict]:
+    """StubJira issues BEN-1..BEN-<count>, each linking to <links> Gerrit changes"""
+    rng = random.Random(seed)
+    issues = {}
+    for number in range(1, count + 1):
+        hrefs = []
+        for _ in range(links):
+            _, template = rng.choice(LINK_TEMPLATES)
+            url = template.format(change=rng.randint(100000, 100000 + count * links * 4))
+            hrefs.append(f'<a href="{url}">{url}</a>')
+        issues[f"BEN-{number}"] = {"description": "Synthetic issue",
+                                   "rendered": "<p>" + " ".join(hrefs) + "</p>"}
+    return issues
+
+
+def write_work_list(path: Path, issues: Dict[str, Dict]) -> Path:
+    with open(path, "w", encoding="utf-8") as f:
+        for jira_id in issues:
+            f.write(json.dumps({"jira_id": jira_id, "folder": jira_id}) + "\n")
+    return path
+
+
+class StubPool(DownloaderPool):
+    """
+    DownloaderPool whose workers capture issues through the REST API, or with a
+    headless Firefox on a throwaway profile, without logging in anywhere
+    """
+
+    def start_stub_workers(self, coordinator: JiraDownloader, browsers: bool = False) -> None:
+        for worker_id in range(1, self.size + 1):
+            worker = JiraDownloader(str(self.download_path))
+            worker.worker_name = f"worker{worker_id}"
+            copy_services(coordinator, worker)
+            self.workers.append(worker)
+            if browsers:
+                start_browser(worker)
+
+    def close(self) -> None:
+        for worker in self.workers:
+            if worker.jira_api:
+                worker.jira_api.close()
+            worker.patch_downloader.close()
+            if worker.browser:
+                worker.browser.quit()
+            if worker.temp_profile_dir:
+                shutil.rmtree(worker.temp_profile_dir, ignore_errors=True)
+        self.workers = []
+
+
+def copy_services(source: JiraDownloader, worker: JiraDownloader) -> None:
+    worker.logger = source.logger
+    worker.gerrit_manager = source.gerrit_manager
+    worker.manifest = source.manifest
+    worker.pdf_renderer = source.pdf_renderer
+    worker.jira_api = JiraApiClient(source.jira_api.base_url)
+    worker.patch_downloader = PatchDownloader(max_workers=JiraConfig.DOWNLOAD_WORKERS,
+                                              log_callback=worker.logger.debug)
+
+
+def start_browser(worker: JiraDownloader) -> None:
+    """Give a worker a headless Firefox, so it captures issues from their pages"""
+    worker.temp_profile_dir = tempfile.mkdtemp(prefix="jira-bench-profile-")
+    worker.profile_path = worker.temp_profile_dir
+    worker.browser = worker.setup_firefox_driver()
+    worker.waiter = PageWaiter(worker.browser, worker.logger.debug)
+    worker.jira_api.close()
+    worker.jira_api = None
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def issue_latencies(spans: List[Dict]) -> List[float]:
+    """Seconds from the first to the last span of every issue"""
+    bounds = {}
+    for record in spans:
+        issue = record["tags"].get("issue")
+        if not issue:
+            continue
+        start, end = record["start_us"], record["start_us"] + record["duration_us"]
+        first, last = bounds.get(issue, (start, end))
+        bounds[issue] = (min(first, start), max(last, end))
+    return [(end - start) / 1e6 for start, end in bounds.values()]
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_once(mode: str, count: int, links: int, workers: int, delay: float, work_dir: Path) -> Dict:
+    """Download a synthetic work list in one mode and measure it"""
+    os.environ["FAKE_SSH_STATE"] = str(work_dir)
+    os.environ["FAKE_SSH_DELAY"] = str(delay)
+    browsers = mode == BROWSER_MODE
+    JiraConfig.PIPELINE = mode == "pipeline"
+    JiraConfig.RESUME = False
+    JiraConfig.TRACE = True
+    JiraConfig.PATCH_DOWNLOAD_MODE = "http"
+    JiraConfig.DOWNLOAD_GERRIT_ZIP = True
+
+    issues = synthetic_issues(count, links)
+    work_list = write_work_list(work_dir / "work_list.jsonl", issues)
+    logger = logging.getLogger("e2e_bench")
+    logger.setLevel(logging.WARNING)
+
+    with StubJira(issues, delay=delay) as jira, StubGerrit(delay=delay) as gerrit:
+        for address, _ in LINK_TEMPLATES:
+            JiraConfig.update_gerrit_server(address, url=gerrit.url)
+        if browsers:
+            JiraConfig.JIRA_ISSUE_BASE_URL = jira.url + "browse/"
+            JiraConfig.JIRA_DOC_BASE_URL = jira.url + "si/jira.issueviews:issue-html/"
+            JiraConfig.HEADLESS = True
+            JiraConfig.PDF_CAPTURE = "browser"
+        coordinator = JiraDownloader(str(work_dir / "output" / "Bench"))
+        coordinator.logger = logger
+        ssh_pool = SshConnectionPool("bench", ssh_command=FAKE_SSH)
+        coordinator.gerrit_manager = GerritManager("bench", ssh_pool)
+        coordinator.jira_api = JiraApiClient(jira.url)
+        coordinator.patch_downloader = PatchDownloader(max_workers=JiraConfig.DOWNLOAD_WORKERS,
+                                                       log_callback=logger.debug)
+
+        start = time.perf_counter()
+        reader, items = coordinator.open_work_list(str(work_list))
+        coordinator.start_pdf_renderer()
+        pool = None
+        if mode != "serial":
+            pool = StubPool(str(coordinator.download_path), logger, workers)
+            pool.start_stub_workers(coordinator, browsers)
+        try:
+            coordinator.run_work_list(reader, items, pool)
+            coordinator.close_pdf_renderer()
+        finally:
+            if pool:
+                pool.close()
+            coordinator.close_manifest()
+            ssh_pool.close()
+        elapsed = time.perf_counter() - start
+
+    latencies = issue_latencies(tracing.stop())
+    patches = sum(1 for _ in coordinator.download_path.glob("*/Source/*.zip"))
+    pdfs = sum(1 for _ in coordinator.download_path.glob("*/Investigation/*.pdf"))
+    minutes = elapsed / 60
+    return {
+        "mode": mode,
+        "issues": count,
+        "links": links,
+        "workers": 1 if mode == "serial" else workers,
+        "patches": patches,
+        "pdfs": pdfs,
+        "elapsed_s": round(elapsed, 2),
+        "issues_per_min": round(count / minutes, 1),
+        "patches_per_min": round(patches / minutes, 1),
+        "p50_s": round(percentile(latencies, 0.50), 3),
+        "p95_s": round(percentile(latencies, 0.95), 3),
+        "peak_rss_mb": round(peak_rss_mb() or 0, 1),
+    }
+
+
+def run_in_child(mode: str, count: int, args) -> Dict:
+    """Run one measurement in a fresh interpreter, so peak RSS belongs to that run alone"""
+    with tempfile.TemporaryDirectory(prefix="jira-bench-") as work_dir:
+        result_path = Path(work_dir) / "result.json"
+        subprocess.run([sys.executable, __file__, "--child", mode, str(count), str(result_path),
+                        "--links", str(args.links), "--workers", str(args.workers),
+                        "--delay-ms", str(args.delay_ms)],
+                       check=True, stdout=subprocess.DEVNULL)
+        return json.loads(result_path.read_text())
+
+
+def print_table(results: List[Dict]) -> None:
+    print(f"{'mode':<9} {'issues':>6} {'patches':>7} {'PDFs':>6} {'elapsed':>8} {'issues/min':>10} "
+          f"{'patches/min':>11} {'p50':>7} {'p95':>7} {'peak RSS':>9}")
+    for r in results:
+        print(f"{r['mode']:<9} {r['issues']:>6} {r['patches']:>7} {r.get('pdfs', 0):>6} "
+              f"{r['elapsed_s']:>7.1f}s "
+              f"{r['issues_per_min']:>10,.0f} {r['patches_per_min']:>11,.0f} "
+              f"{r['p50_s']:>6.2f}s {r['p95_s']:>6.2f}s {r['peak_rss_mb']:>6.0f} MB")
+
+
+def compare(results: List[Dict], baseline_path: str, tolerance: float) -> bool:
+    """Report runs whose throughput fell more than tolerance below the baseline"""
+    baseline = {(r["mode"], r["issues"]): r for r in json.loads(Path(baseline_path).read_text())}
+    ok = True
+    for r in results:
+        before = baseline.get((r["mode"], r["issues"]))
+        if not before:
+            continue
+        change = r["issues_per_min"] / before["issues_per_min"] - 1
+        if change < -tolerance:
+            ok = False
+        print(f"{r['mode']:<9} {r['issues']:>6} issues: {change:+.0%} issues/min vs baseline"
+              + ("  REGRESSION" if change < -tolerance else ""))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--issues", type=int, nargs="+", default=[10, 100, 1000],
+                        help="work list sizes to run (10 to 5000 issues)")
+    parser.add_argument("--links", type=int, default=3, help="Gerrit links per issue")
+    parser.add_argument("--modes", nargs="+", choices=MODES + (BROWSER_MODE,), default=list(MODES),
+                        help=f"run modes (default: {' '.join(MODES)})")
+    parser.add_argument("--workers", type=int, default=4, help="workers of the batch and pipeline modes")
+    parser.add_argument("--delay-ms", type=float, default=0.0,
+                        help="time every stub request and Gerrit query takes")
+    parser.add_argument("--save", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="results saved earlier with --save to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed throughput drop against the baseline (default 0.2)")
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "ISSUES", "RESULT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, count, result_path = args.child
+        with tempfile.TemporaryDirectory(prefix="jira-bench-run-") as work_dir:
+            result = run_once(mode, int(count), args.links, args.workers, args.delay_ms / 1000,
+                              Path(work_dir))
+        Path(result_path).write_text(json.dumps(result))
+        return
+
+    print(f"{args.links} links per issue, {args.workers} workers, {args.delay_ms:g} ms per request")
+    results = []
+    for count in args.issues:
+        for mode in args.modes:
+            results.append(run_in_child(mode, count, args))
+    print_table(results)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2))
+    if args.baseline and not compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
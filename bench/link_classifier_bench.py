@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Micro-benchmark for the Gerrit link classifier.
+
+Compares the compiled classifier with the substring checks that
+find_gerrit_links used before, over a saved link corpus (one URL per line)
+or a generated one.
+
+    python bench/link_classifier_bench.py --corpus links.txt
+    python bench/link_classifier_bench.py --generate 200000 --save links.txt
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from link_classifier import GerritLinkClassifier  # noqa: E402
+from main import JiraConfig  # noqa: E402
+
+URL_TEMPLATES = [
+    "https://secure.jp.sharp/android_review/gerrit/#/c/{change}/",
+    "http://10.24.71.91/gerrit/{change}",
+    "http://10.24.71.91/gerrit/#/c/platform/build/+/{change}/{patchset}",
+    "http://10.230.1.88/#/c/{change}/{patchset}",
+    "https://sharp-smart-mobile-comm.atlassian.net/browse/HSE-{change}",
+    "https://sharp-smart-mobile-comm.atlassian.net/secure/ViewProfile.jspa?name=user{patchset}",
+    "https://sharp-smart-mobile-comm.atlassian.net/issues/?jql=created>={date}&from={date}",
+    "https://sharp-smart-mobile-comm.atlassian.net/s/abc123/_/download/resources/style{patchset}.css",
+]
+
+
+def generate_corpus(count: int, seed: int = 1) -> list:
+    """Issue-page-like mix of Gerrit and unrelated links"""
+    rng = random.Random(seed)
+    return [
+        rng.choice(URL_TEMPLATES).format(change=rng.randint(10000, 9999999),
+                                         patchset=rng.randint(1, 30), date="2025-12-01")
+        for _ in range(count)
+    ]
+
+
+def legacy_classify(urls: list) -> tuple:
+    """The substring checks find_gerrit_links used before the classifier"""
+    gerrit_list_p, gerrit_list_q, gerrit_list_ep2 = [], [], []
+    for gerrit_str in urls:
+        if '/#/c/' in gerrit_str and 'gerrit' not in gerrit_str:
+            ids = re.findall(r'\d+', gerrit_str)
+            gerrit_list_ep2.extend([i for i in ids if 4 < len(i) < 10])
+        elif 'gerrit/#/c/' in gerrit_str:
+            ids = re.findall(r'\d+', gerrit_str)
+            if ids and 4 < len(ids[0]) < 10:
+                gerrit_list_p.append(ids[0])
+        elif 'gerrit/' in gerrit_str:
+            ids = re.findall(r'\d+', gerrit_str)
+            gerrit_list_q.extend([i for i in ids if 5 < len(i) < 10])
+    return gerrit_list_p, gerrit_list_q, gerrit_list_ep2
+
+
+def measure(name: str, func, count: int, repeat: int) -> None:
+    best = min(timed(func) for _ in range(repeat))
+    print(f"{name:<28} {best * 1000:9.1f} ms  {count / best:12,.0f} links/s")
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--corpus", help="file with one URL per line")
+    parser.add_argument("--generate", type=int, default=100000, help="number of URLs to generate")
+    parser.add_argument("--save", help="write the generated corpus to this file")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.corpus:
+        urls = Path(args.corpus).read_text(encoding="utf-8").split()
+    else:
+        urls = generate_corpus(args.generate)
+        if args.save:
+            Path(args.save).write_text("\n".join(urls) + "\n", encoding="utf-8")
+
+    text = "\n".join(urls)
+    print(f"Corpus: {len(urls):,} links, {len(text):,} bytes")
+
+    build_start = time.perf_counter()
+    classifier = GerritLinkClassifier(JiraConfig.gerrit_link_prefixes())
+    print(f"{'compile classifier':<28} {(time.perf_counter() - build_start) * 1000:9.1f} ms")
+
+    measure("legacy substring checks", lambda: legacy_classify(urls), len(urls), args.repeat)
+    measure("classifier.iter_links", lambda: list(classifier.iter_links(urls)), len(urls), args.repeat)
+    measure("classifier.scan_text", lambda: list(classifier.scan_text(text)), len(urls), args.repeat)
+
+    found = GerritLinkClassifier.group_by_server(classifier.iter_links(urls))
+    for server, changes in sorted(found.items()):
+        print(f"  {server}: {len(changes):,} unique changes")
+
+
+if __name__ == "__main__":
+    main()
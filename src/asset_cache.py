@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Disk cache for the assets of JIRA issue views.
+Every issue view pulls the same stylesheets, fonts, avatars and Atlassian
+static files. When the PDF renderers fetch a page through this cache, the
+page's assets are downloaded once, stored on disk and referenced as local
+files afterwards. Static assets are reused until they expire; attachment
+images are revalidated with their ETag / Last-Modified headers. The cache is
+trimmed to a size limit by evicting the least recently used assets.
+"""
+
+import hashlib
+import html
+import http.cookiejar
+import json
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from browser_cookies import load_cookies
+from lru_store import LruStore
+
+# src/href of the tags whose targets the renderer loads
+HTML_ASSET_PATTERN = re.compile(
+    r"(<(img|script|link|source)\b[^>]*?\b(?:src|href)\s*=\s*)([\"'])(.*?)\3",
+    re.IGNORECASE | re.DOTALL,
+)
+LINK_ASSET_PATTERN = re.compile(r"\brel\s*=\s*[\"']?[^\"'>]*\b(?:stylesheet|icon)\b", re.IGNORECASE)
+# Inline CSS: <style> blocks and style attributes
+STYLE_PATTERN = re.compile(r"(<style\b[^>]*>)(.*?)(</style>)|(\bstyle\s*=\s*)([\"'])(.*?)\5",
+                           re.IGNORECASE | re.DOTALL)
+CSS_URL_PATTERN = re.compile(r"url\(\s*([\"']?)([^\"')]+)\1\s*\)", re.IGNORECASE)
+CSS_IMPORT_PATTERN = re.compile(r"@import\s+([\"'])([^\"']+)\1", re.IGNORECASE)
+MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+# Attachments change under the same URL when re-uploaded, so they are always revalidated
+ATTACHMENT_PATTERN = re.compile(r"/secure/(?:attachment|thumbnail)/|/rest/api/\d+/attachment/")
+
+
+class AssetCache(LruStore):
+    """Fetches page assets through a size-limited on-disk LRU cache keyed by URL"""
+
+    ENTRY_NAME = "assets"
+
+    def __init__(self, directory: str, default_ttl: float = 86400.0,
+                 log_callback: Callable[[str], None] = print, timeout: int = 30,
+                 max_bytes: int = 0):
+        super().__init__(max_bytes, log_callback)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Lifetime of static assets that do not send their own Cache-Control
+        self.default_ttl = default_ttl
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # The connections are shared by all workers but their logins are not: cookies
+        # and auth are sent per request, and cookies set by responses are not kept
+        self.session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+        self.local = threading.local()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.bytes_from_cache = 0
+        self.bytes_downloaded = 0
+
+    def set_credentials(self, cookies: List[Dict], auth: Optional[Tuple[str, str]] = None) -> None:
+        """
+        Use the browser's (or the REST session's) login for the asset requests
+        made by the calling thread; every worker renders on threads of its own.
+        """
+        jar = load_cookies(requests.cookies.RequestsCookieJar(), cookies)
+        self.local.credentials = {"cookies": jar, "auth": auth}
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """GET with the calling thread's login"""
+        credentials = getattr(self.local, "credentials", {})
+        return self.session.get(url, timeout=self.timeout, **credentials, **kwargs)
+
+    def paths_for(self, url: str) -> Tuple[Path, Path]:
+        """(body, metadata) file of a URL; the body keeps the URL's extension for the renderers"""
+        key = hashlib.sha256(url.encode()).hexdigest()
+        suffix = Path(urlparse(url).path).suffix
+        suffix = suffix if re.fullmatch(r"\.\w{1,5}", suffix) else ""
+        folder = self.directory / key[:2]
+        return folder / f"{key}{suffix}", folder / f"{key}.json"
+
+    def count(self, counter: str, size: int = 0, downloaded: bool = False) -> None:
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+            if downloaded:
+                self.bytes_downloaded += size
+            else:
+                self.bytes_from_cache += size
+
+    def expires_at(self, url: str, headers) -> float:
+        """Until when a response may be reused without asking the server"""
+        cache_control = headers.get("Cache-Control", "")
+        if ATTACHMENT_PATTERN.search(urlparse(url).path) or "no-cache" in cache_control:
+            return 0.0
+        match = MAX_AGE_PATTERN.search(cache_control)
+        if match:
+            return time.time() + int(match.group(1))
+        if "Expires" in headers:
+            try:
+                return parsedate_to_datetime(headers["Expires"]).timestamp()
+            except (TypeError, ValueError):
+                pass
+        return time.time() + self.default_ttl
+
+    def fetch(self, url: str) -> Optional[Path]:
+        """Local file holding the asset at url, downloaded or revalidated if needed"""
+        body_path, meta_path = self.paths_for(url)
+        meta = {}
+        if body_path.exists() and meta_path.exists():
+            try:
+                meta = json.loads(meta_path.read_text())
+            except ValueError:
+                meta = {}
+
+        if meta and meta.get("expires", 0) > time.time():
+            self.count("hits", body_path.stat().st_size)
+            self.touch(meta_path)
+            return body_path
+
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        try:
+            response = self.get(url, headers=headers)
+        except requests.RequestException as e:
+            self.log_callback(f"Could not fetch asset {url}: {e}")
+            return body_path if meta else None
+
+        if response.status_code == 304 and meta:
+            meta["expires"] = self.expires_at(url, response.headers)
+            self.write_atomic(meta_path, json.dumps(meta).encode())
+            self.count("revalidated", body_path.stat().st_size)
+            return body_path
+        if response.status_code != 200:
+            self.log_callback(f"Asset {url} returned HTTP {response.status_code}")
+            return None
+
+        body_path.parent.mkdir(parents=True, exist_ok=True)
+        previous_size = self.stored_size(body_path, meta_path)
+        self.write_atomic(body_path, response.content)
+        meta = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_type": response.headers.get("Content-Type", ""),
+            "expires": self.expires_at(url, response.headers),
+        }
+        self.write_atomic(meta_path, json.dumps(meta).encode())
+        self.count("misses", len(response.content), downloaded=True)
+        self.added(self.stored_size(body_path, meta_path) - previous_size)
+        return body_path
+
+    @staticmethod
+    def stored_size(*paths: Path) -> int:
+        size = 0
+        for path in paths:
+            try:
+                size += path.stat().st_size
+            except FileNotFoundError:
+                pass
+        return size
+
+    @staticmethod
+    def touch(path: Path) -> None:
+        """Mark an asset as recently used for eviction"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # evicted by another worker
+
+    def entries(self) -> List[Tuple[float, int, List[Path]]]:
+        """(last use, size, files) of every cached URL: its body, metadata and localized stylesheet"""
+        groups: Dict[str, Tuple[float, int, List[Path]]] = {}
+        for path in self.directory.glob("*/*"):
+            if path.suffix == ".tmp":
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            key = path.name.split(".", 1)[0]
+            used, size, files = groups.get(key, (0.0, 0, []))
+            groups[key] = (max(used, stat.st_mtime), size + stat.st_size, files + [path])
+        return list(groups.values())
+
+    @staticmethod
+    def write_atomic(path: Path, data: bytes) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def local_uri(self, url: str, base_url: str) -> Optional[str]:
+        """file:// URI of the cached copy of a (possibly relative) asset reference"""
+        url = url.strip()
+        if not url or url.startswith(("data:", "#", "javascript:", "about:", "file:")):
+            return None
+        absolute = urljoin(base_url, url)
+        if urlparse(absolute).scheme not in ("http", "https"):
+            return None
+        path = self.fetch(absolute)
+        if path and path.suffix.lower() == ".css":
+            path = self.localize_css(path, absolute)
+        return path.resolve().as_uri() if path else None
+
+    def localize_css(self, css_path: Path, css_url: str) -> Path:
+        """Copy of a cached stylesheet whose fonts and images point at cached files"""
+        localized = css_path.with_name(css_path.stem + ".local.css")
+        if localized.exists() and localized.stat().st_mtime >= css_path.stat().st_mtime:
+            return localized
+        css = css_path.read_text(encoding="utf-8", errors="replace")
+
+        def replace_import(match):
+            uri = self.local_uri(match.group(2), css_url)
+            return match.group(0).replace(match.group(2), uri) if uri else match.group(0)
+
+        css = CSS_IMPORT_PATTERN.sub(replace_import, self.localize_css_text(css, css_url))
+        self.write_atomic(localized, css.encode("utf-8"))
+        return localized
+
+    def localize_css_text(self, css: str, base_url: str) -> str:
+        def replace(match):
+            uri = self.local_uri(html.unescape(match.group(2)), base_url)
+            return match.group(0).replace(match.group(2), uri) if uri else match.group(0)
+
+        return CSS_URL_PATTERN.sub(replace, css)
+
+    def localize_html(self, page: str, base_url: str) -> str:
+        """Point every asset reference of a page at its cached copy"""
+        def replace_asset(match):
+            # Only stylesheets and icons among <link> tags are loaded by the renderer
+            if match.group(2).lower() == "link" and not LINK_ASSET_PATTERN.search(match.group(0)):
+                return match.group(0)
+            uri = self.local_uri(html.unescape(match.group(4)), base_url)
+            quote = match.group(3)
+            return f"{match.group(1)}{quote}{uri}{quote}" if uri else match.group(0)
+
+        def replace_style(match):
+            if match.group(1):
+                return match.group(1) + self.localize_css_text(match.group(2), base_url) + match.group(3)
+            quote = match.group(5)
+            return f"{match.group(4)}{quote}{self.localize_css_text(match.group(6), base_url)}{quote}"
+
+        page = HTML_ASSET_PATTERN.sub(replace_asset, page)
+        return STYLE_PATTERN.sub(replace_style, page)
+
+    def save_localized_page(self, url: str, target_dir: str) -> Optional[Path]:
+        """Download a page and write a copy whose assets are served from the cache"""
+        try:
+            response = self.get(url, headers={"Accept": "text/html"})
+            response.raise_for_status()
+        except requests.RequestException as e:
+            self.log_callback(f"Could not fetch {url} for local rendering: {e}")
+            return None
+        page_path = Path(target_dir) / "page.html"
+        page_path.write_text(self.localize_html(response.text, response.url), encoding="utf-8")
+        return page_path
+
+    def url_fetcher(self, url: str) -> Dict:
+        """weasyprint url_fetcher serving assets from the cache"""
+        if url.startswith(("http://", "https://")):
+            path = self.fetch(url)
+            if path:
+                content_type = mimetypes.guess_type(str(path))[0]
+                return {"string": path.read_bytes(), "mime_type": content_type, "redirected_url": url}
+        import weasyprint
+        return weasyprint.default_url_fetcher(url)
+
+    def stats(self) -> str:
+        with self.lock:
+            return (f"{self.hits} hits, {self.revalidated} revalidated, {self.misses} downloaded; "
+                    f"{self.bytes_from_cache / (1024 * 1024):.1f} MB served from cache, "
+                    f"{self.bytes_downloaded / (1024 * 1024):.1f} MB downloaded")
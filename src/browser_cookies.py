@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Browser login cookies for HTTP sessions.
+The HTTP clients reuse the logins of the Firefox sessions; Selenium hands the
+cookies over as dicts, which are loaded into the clients' requests cookie jars.
+"""
+
+from typing import Dict, Iterable
+
+from requests.cookies import RequestsCookieJar
+
+
+def load_cookies(jar: RequestsCookieJar, cookies: Iterable[Dict]) -> RequestsCookieJar:
+    """Add Selenium-style cookie dicts (name, value, domain, path) to jar and return it"""
+    for cookie in cookies:
+        jar.set(cookie["name"], cookie["value"],
+                domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+    return jar
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Long-lived downloader daemon.
+Keeps the browser workers (logged into JIRA and Gerrit), the SSH connections
+to the Gerrit servers and the shared caches alive between runs, and accepts
+jobs (project + work list) over an HTTP API on localhost. Jobs run one after
+another on the warm browsers and stream their log back as JSON lines, so
+main.py and the GUI only submit work and show progress, and a small request
+no longer pays for resolving geckodriver, launching Firefox and logging in.
+
+    POST /jobs               {"project": ..., "work_list": ...} -> {"id": ...}
+    GET  /jobs               all jobs
+    GET  /jobs/<id>          state of one job
+    GET  /jobs/<id>/events   progress as JSON lines, kept open until the job ends
+    GET  /status             browsers and job counts
+    POST /shutdown           finish the running job, close the browsers and exit
+
+Every request must send the token the daemon writes to output/.daemon/token.
+"""
+
+import hmac
+import json
+import logging
+import os
+import queue
+import re
+import secrets
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from daemon_client import GERRIT_PASSWORD_ENV, token_path
+from main import DownloaderPool, JiraConfig, JiraDownloader, load_config
+from work_items import SUPPORTED_SUFFIXES
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Seconds between the empty lines that keep an idle event stream open
+HEARTBEAT_INTERVAL = 5.0
+
+
+class DaemonJob:
+    """One submitted run and the progress messages it has produced so far"""
+
+    def __init__(self, project: str, work_list: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.project = project
+        self.work_list = work_list
+        self.state = QUEUED
+        self.error = ""
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.messages: List[str] = []
+        self.condition = threading.Condition()
+
+    def add_message(self, message: str) -> None:
+        with self.condition:
+            self.messages.append(message)
+            self.condition.notify_all()
+
+    def start(self) -> None:
+        with self.condition:
+            self.state = RUNNING
+            self.started_at = time.time()
+            self.condition.notify_all()
+
+    def finish(self, state: str, error: str = "") -> None:
+        with self.condition:
+            self.state = state
+            self.error = error
+            self.finished_at = time.time()
+            self.condition.notify_all()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (DONE, FAILED)
+
+    def wait_messages(self, since: int, timeout: float) -> Tuple[List[str], bool]:
+        """Messages after the first `since`, waiting up to timeout for new ones; and whether the job ended"""
+        with self.condition:
+            if len(self.messages) <= since and not self.finished:
+                self.condition.wait(timeout)
+            return self.messages[since:], self.finished
+
+    def to_dict(self) -> Dict:
+        with self.condition:
+            return {
+                "id": self.id, "project": self.project, "work_list": self.work_list,
+                "state": self.state, "error": self.error, "messages": len(self.messages),
+                "submitted_at": self.submitted_at, "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class JobLogHandler(logging.Handler):
+    """Copies the downloader's log records into a job's progress messages"""
+
+    def __init__(self, job: DaemonJob):
+        super().__init__(logging.INFO)
+        self.job = job
+        self.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.job.add_message(self.format(record))
+
+
+class DownloaderDaemon:
+    """Runs submitted jobs one at a time on browser workers that stay logged in"""
+
+    def __init__(self, project_root: Path, gerrit_username: str, gerrit_password: str,
+                 workers: int = 1):
+        self.project_root = Path(project_root)
+        self.output_base = self.project_root / "output"
+        # Browser downloads, logs and the token of the daemon itself
+        self.home = self.output_base / ".daemon"
+        self.gerrit_username = gerrit_username
+        self.gerrit_password = gerrit_password
+        self.workers = max(1, workers)
+        self.token = secrets.token_urlsafe(24)
+        self.jobs: Dict[str, DaemonJob] = {}
+        self.job_queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.coordinator: Optional[JiraDownloader] = None
+        self.pool: Optional[DownloaderPool] = None
+        self.session_started_at = None
+        self.jobs_run = 0
+        self.server = None
+        self.job_thread = None
+
+    # Warm session
+
+    def start_session(self) -> None:
+        """Launch the browser workers and the services they share"""
+        start = time.monotonic()
+        coordinator = JiraDownloader(str(self.home))
+        coordinator.logger = coordinator.setup_logger("daemon")
+        coordinator.start_shared_services(self.gerrit_username)
+        pool = DownloaderPool(str(self.home), coordinator.logger, self.workers)
+        self.coordinator = coordinator
+        self.pool = pool
+        pool.start(self.gerrit_username, self.gerrit_password, coordinator.gerrit_manager,
+                   asset_cache=coordinator.asset_cache, patch_cache=coordinator.patch_cache)
+        self.session_started_at = time.time()
+        coordinator.logger.info(f"Daemon session with {self.workers} browsers ready "
+                                f"in {time.monotonic() - start:.1f}s")
+
+    def refresh_logins(self) -> None:
+        """Log the warm browsers in again where JIRA or Gerrit no longer accepts their sessions"""
+        for worker in self.pool.workers:
+            worker.refresh_logins(self.gerrit_username, self.gerrit_password)
+
+    def close_session(self) -> None:
+        """Quit the browsers and close the shared connections and caches"""
+        if self.pool:
+            self.pool.close()
+            self.pool = None
+        if self.coordinator:
+            self.coordinator.close_shared_services()
+            self.coordinator = None
+        self.session_started_at = None
+
+    def use_project(self, project: str) -> logging.Logger:
+        """Point the coordinator and the workers at a project's folder and log files"""
+        download_path = self.output_base / project
+        self.coordinator.download_path = download_path
+        self.coordinator.logger = self.coordinator.setup_logger(project)
+        for worker_id, worker in enumerate(self.pool.workers, start=1):
+            worker.download_path = download_path
+            worker.logger = worker.setup_logger(project, worker_id)
+        return self.coordinator.logger
+
+    # Jobs
+
+    def resolve_work_list(self, work_list: str) -> Path:
+        path = Path(work_list)
+        if not path.is_absolute():
+            path = self.project_root / path
+        return path
+
+    def submit(self, project: str, work_list: str) -> DaemonJob:
+        """Validate and queue a job; raises ValueError for a bad request"""
+        project = (project or "").strip()
+        if not project or Path(project).name != project or project.startswith("."):
+            raise ValueError(f"Invalid project name '{project}'")
+        path = self.resolve_work_list((work_list or "").strip())
+        if not path.is_file():
+            raise ValueError(f"Work list not found at {path}")
+        if path.suffix.lower() not in SUPPORTED_SUFFIXES:
+            raise ValueError(f"Unsupported work list format '{path.suffix}'")
+
+        job = DaemonJob(project, str(path))
+        with self.lock:
+            self.jobs[job.id] = job
+        self.job_queue.put(job)
+        return job
+
+    def run_job(self, job: DaemonJob) -> None:
+        """Download one work list with the warm browsers"""
+        coordinator = self.coordinator
+        # The session outlives jobs; changes not merged for an earlier job may be now
+        coordinator.gerrit_manager.forget_unmerged()
+        reader, items = coordinator.open_work_list(job.work_list)
+        if items is None:
+            return
+        coordinator.start_pdf_renderer()
+        for worker in self.pool.workers:
+            worker.manifest = coordinator.manifest
+            worker.pdf_renderer = coordinator.pdf_renderer
+        try:
+            coordinator.run_work_list(reader, items, self.pool)
+        finally:
+            coordinator.close_pdf_renderer()
+            coordinator.close_manifest()
+            coordinator.export_trace()
+            for worker in self.pool.workers:
+                worker.manifest = None
+                worker.pdf_renderer = None
+
+    def execute(self, job: DaemonJob) -> None:
+        job.start()
+        try:
+            if not self.pool:
+                job.add_message("Starting browsers...")
+                self.start_session()
+            logger = self.use_project(job.project)
+            handler = JobLogHandler(job)
+            logger.addHandler(handler)
+            try:
+                logger.info(f"[START] Job {job.id}: {job.work_list}")
+                self.refresh_logins()
+                self.run_job(job)
+                logger.info(f"[END] Job {job.id}")
+            finally:
+                logger.removeHandler(handler)
+            job.finish(DONE)
+        except Exception as e:
+            job.finish(FAILED, str(e))
+            # A broken browser or session is replaced before the next job
+            self.close_session()
+        self.jobs_run += 1
+
+    def job_loop(self) -> None:
+        try:
+            self.start_session()
+        except Exception as e:
+            print(f"Could not start the daemon session, retrying with the first job: {e}")
+            self.close_session()
+        while True:
+            job = self.job_queue.get()
+            if job is None:
+                break
+            self.execute(job)
+        self.close_session()
+
+    def status(self) -> Dict:
+        with self.lock:
+            states = [job.state for job in self.jobs.values()]
+        return {
+            "browsers": len(self.pool.workers) if self.pool else 0,
+            "session_started_at": self.session_started_at,
+            "jobs_run": self.jobs_run,
+            "queued": states.count(QUEUED),
+            "running": states.count(RUNNING),
+        }
+
+    # Server
+
+    def write_token(self) -> Path:
+        path = token_path(self.output_base)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(self.token)
+        return path
+
+    def start(self, port: int) -> None:
+        """Start the job thread and the API server without blocking"""
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self.handler_class())
+        self.server.daemon_threads = True
+        self.write_token()
+        self.job_thread = threading.Thread(target=self.job_loop, name="daemon-jobs", daemon=True)
+        self.job_thread.start()
+        threading.Thread(target=self.server.serve_forever, name="daemon-api", daemon=True).start()
+
+    def stop(self) -> None:
+        """Let the running job finish, then close the browsers and the server"""
+        self.job_queue.put(None)
+        if self.job_thread:
+            self.job_thread.join()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+        token_path(self.output_base).unlink(missing_ok=True)
+
+    def serve(self, port: int) -> None:
+        """Run until a shutdown request or Ctrl+C"""
+        self.start(port)
+        print(f"Downloader daemon listening on 127.0.0.1:{port}")
+        try:
+            self.job_thread.join()
+        except KeyboardInterrupt:
+            print("Stopping...")
+        self.stop()
+
+    def handler_class(self):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, status: int, body) -> None:
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def authorized(self) -> bool:
+                expected = f"Bearer {daemon.token}"
+                if hmac.compare_digest(self.headers.get("Authorization", ""), expected):
+                    return True
+                self.send_json(401, {"error": "missing or wrong token"})
+                return False
+
+            def find_job(self, job_id: str) -> Optional[DaemonJob]:
+                with daemon.lock:
+                    job = daemon.jobs.get(job_id)
+                if not job:
+                    self.send_json(404, {"error": f"no job {job_id}"})
+                return job
+
+            def do_GET(self):
+                if not self.authorized():
+                    return
+                url = urlparse(self.path)
+                match = re.fullmatch(r"/jobs/(\w+)(/events)?", url.path)
+                if url.path == "/status":
+                    self.send_json(200, daemon.status())
+                elif url.path == "/jobs":
+                    with daemon.lock:
+                        jobs = [job.to_dict() for job in daemon.jobs.values()]
+                    self.send_json(200, jobs)
+                elif match:
+                    job = self.find_job(match.group(1))
+                    if not job:
+                        return
+                    if match.group(2):
+                        since = int(parse_qs(url.query).get("since", ["0"])[0])
+                        self.stream_events(job, since)
+                    else:
+                        self.send_json(200, job.to_dict())
+                else:
+                    self.send_json(404, {"error": f"unknown path {url.path}"})
+
+            def do_POST(self):
+                if not self.authorized():
+                    return
+                if self.path == "/jobs":
+                    try:
+                        length = int(self.headers.get("Content-Length", 0))
+                        body = json.loads(self.rfile.read(length) or b"{}")
+                        job = daemon.submit(body.get("project"), body.get("work_list"))
+                    except ValueError as e:
+                        self.send_json(400, {"error": str(e)})
+                        return
+                    self.send_json(202, job.to_dict())
+                elif self.path == "/shutdown":
+                    self.send_json(202, {"state": "stopping"})
+                    daemon.job_queue.put(None)
+                else:
+                    self.send_json(404, {"error": f"unknown path {self.path}"})
+
+            def stream_events(self, job: DaemonJob, since: int) -> None:
+                """Send the job's messages as JSON lines until it has finished"""
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                try:
+                    while True:
+                        messages, finished = job.wait_messages(since, HEARTBEAT_INTERVAL)
+                        since += len(messages)
+                        lines = [json.dumps({"message": message}) + "\n" for message in messages]
+                        self.wfile.write("".join(lines).encode() or b"\n")
+                        self.wfile.flush()
+                        if finished:
+                            return
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+
+        return Handler
+
+
+def read_gerrit_password(settings) -> str:
+    """
+    The Gerrit password from config.ini or the environment, or typed in when the
+    daemon runs in a terminal. Empty if there is none.
+    """
+    password = settings.get('gerrit_password', '').strip() or os.environ.get(GERRIT_PASSWORD_ENV, '').strip()
+    if password or not (sys.stdin and sys.stdin.isatty()):
+        return password
+    return input('Enter Gerrit password: ').strip()
+
+
+def main():
+    """Start the daemon with the settings and credentials of config.ini"""
+    project_root = Path(__file__).parent.parent
+    settings = load_config(project_root)
+    gerrit_username = settings.get('gerrit_username', 'lx24060097').strip()
+    gerrit_password = read_gerrit_password(settings)
+    if not gerrit_password:
+        print(f"Gerrit password is required for login: set gerrit_password in config.ini "
+              f"or {GERRIT_PASSWORD_ENV}, or start the daemon in a terminal.", file=sys.stderr)
+        sys.exit(1)
+
+    daemon = DownloaderDaemon(project_root, gerrit_username, gerrit_password, JiraConfig.WORKERS)
+    daemon.serve(JiraConfig.DAEMON_PORT)
+
+
+if __name__ == '__main__':
+    main()
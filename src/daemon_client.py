@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Client for the downloader daemon (see daemon.py).
+Only uses the standard library, so the GUI can submit jobs and follow their
+progress before the downloader's own requirements are installed.
+"""
+
+import json
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional
+
+DEFAULT_PORT = 8765
+# Environment variable through which a started daemon gets the Gerrit password
+# when config.ini has none; a daemon without a terminal cannot ask for it
+GERRIT_PASSWORD_ENV = "JIRA_DOWNLOADER_GERRIT_PASSWORD"
+
+
+def token_path(output_base: Path) -> Path:
+    """File in which a running daemon keeps the token clients must send"""
+    return Path(output_base) / ".daemon" / "token"
+
+
+class DaemonClient:
+    """Submits jobs to a daemon on localhost and streams their progress"""
+
+    def __init__(self, port: int = DEFAULT_PORT, token_file: Optional[Path] = None,
+                 host: str = "127.0.0.1", timeout: float = 5.0):
+        self.base_url = f"http://{host}:{port}"
+        self.token_file = Path(token_file) if token_file else None
+        self.timeout = timeout
+
+    def token(self) -> str:
+        if not self.token_file:
+            return ""
+        try:
+            return self.token_file.read_text().strip()
+        except OSError:
+            return ""
+
+    def open(self, method: str, path: str, body: Optional[Dict] = None,
+             timeout: Optional[float] = None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        request.add_header("Authorization", f"Bearer {self.token()}")
+        if data is not None:
+            request.add_header("Content-Type", "application/json")
+        return urllib.request.urlopen(request, timeout=timeout or self.timeout)
+
+    def call(self, method: str, path: str, body: Optional[Dict] = None) -> Dict:
+        """Send one request and return its JSON answer; errors carry the daemon's message"""
+        try:
+            with self.open(method, path, body) as response:
+                return json.loads(response.read() or b"{}")
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error", e.reason)
+            except ValueError:
+                message = e.reason
+            raise RuntimeError(f"Daemon refused {method} {path}: {message}") from None
+
+    def available(self) -> bool:
+        """True if a daemon is listening and accepts our token"""
+        try:
+            self.call("GET", "/status")
+            return True
+        except (OSError, RuntimeError, ValueError):
+            return False
+
+    def status(self) -> Dict:
+        return self.call("GET", "/status")
+
+    def submit(self, project: str, work_list: str) -> str:
+        """Queue a job; returns its ID"""
+        return self.call("POST", "/jobs", {"project": project, "work_list": work_list})["id"]
+
+    def job(self, job_id: str) -> Dict:
+        return self.call("GET", f"/jobs/{job_id}")
+
+    def events(self, job_id: str, since: int = 0) -> Iterator[Dict]:
+        """Progress events of a job as they happen, until it has finished"""
+        # The stream stays open for as long as the job runs; the daemon sends
+        # an empty line every few seconds while there is nothing to report
+        with self.open("GET", f"/jobs/{job_id}/events?since={since}", timeout=60) as response:
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)
+
+    def run(self, project: str, work_list: str,
+            output: Callable[[str], None] = print) -> Dict:
+        """Submit a job, pass its progress messages to output and return its final state"""
+        job_id = self.submit(project, work_list)
+        output(f"Submitted job {job_id} to the downloader daemon at {self.base_url}")
+        seen = 0
+        while True:
+            for event in self.events(job_id, seen):
+                seen += 1
+                output(event["message"])
+            job = self.job(job_id)
+            if job["state"] not in ("queued", "running"):
+                return job
+
+    def shutdown(self) -> None:
+        self.call("POST", "/shutdown")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Event-driven detection of finished browser downloads.
+On Linux the download folder is watched with inotify, so a download is
+reported the moment Firefox renames its .part file to the final name.
+Every finished file is matched to the request that expects it by filename
+prefix, which keeps overlapping downloads apart.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# inotify event masks (see inotify(7))
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+INOTIFY_EVENT = struct.Struct("iIII")
+
+# Suffixes of files the browser is still writing
+PARTIAL_SUFFIXES = (".part", ".crdownload", ".tmp")
+
+
+class DownloadRequest:
+    """A download the caller is waiting for, identified by a filename prefix"""
+
+    def __init__(self, token: str):
+        self.token = token
+        self.path: Optional[Path] = None
+        self.done = threading.Event()
+
+
+class Inotify:
+    """Minimal ctypes binding for watching one directory with inotify"""
+
+    def __init__(self, directory: str, mask: int):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"Cannot watch {directory}")
+
+    def read_names(self, timeout: float) -> List[str]:
+        """Return the file names of the events received within timeout"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        names = []
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            names.append(os.fsdecode(data[offset:offset + length].rstrip(b"\0")))
+            offset += length
+        return names
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class DownloadWatcher:
+    """Reports finished downloads in a directory and hands them to waiting requests"""
+
+    def __init__(self, directory: str, log_callback=print):
+        self.directory = Path(directory)
+        self.log_callback = log_callback
+        self.pending: List[DownloadRequest] = []
+        # Finished files nobody has asked for yet, by name
+        self.unclaimed: Dict[str, Path] = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.inotify = None
+        self.thread = None
+        self.existing = set()
+
+    def start(self) -> None:
+        """Start watching the download directory"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if sys.platform.startswith("linux"):
+            try:
+                self.inotify = Inotify(str(self.directory), IN_CLOSE_WRITE | IN_MOVED_TO)
+            except OSError as e:
+                self.log_callback(f"inotify not available ({e}), scanning the download folder instead")
+        # Files present before start() are old downloads, not answers to requests
+        self.existing = set(os.listdir(self.directory))
+        self.thread = threading.Thread(target=self.watch, daemon=True)
+        self.thread.start()
+
+    def watch(self) -> None:
+        """Background loop feeding finished file names to on_finished"""
+        if self.inotify:
+            while not self.stop_event.is_set():
+                for name in self.inotify.read_names(0.5):
+                    self.on_finished(name)
+            return
+
+        # Fallback for systems without inotify: compare directory listings
+        reported = set(self.existing)
+        while not self.stop_event.wait(0.2):
+            for name in sorted(set(os.listdir(self.directory)) - reported):
+                if self.on_finished(name):
+                    reported.add(name)
+
+    def on_finished(self, name: str) -> bool:
+        """
+        Hand a finished file to the first request whose token matches its name.
+        Returns False if the file is still being written.
+        """
+        path = self.directory / name
+        # Firefox creates an empty placeholder under the final name and later
+        # moves the finished .part file over it
+        if name.endswith(PARTIAL_SUFFIXES) or (self.directory / f"{name}.part").exists():
+            return False
+        try:
+            if path.stat().st_size == 0:
+                return False
+        except FileNotFoundError:
+            return False
+
+        with self.lock:
+            for request in self.pending:
+                if name.startswith(request.token):
+                    self.pending.remove(request)
+                    request.path = path
+                    request.done.set()
+                    return True
+            self.unclaimed[name] = path
+        return True
+
+    def expect(self, token: str) -> DownloadRequest:
+        """Register interest in the next finished file whose name starts with token"""
+        request = DownloadRequest(token)
+        with self.lock:
+            for name, path in self.unclaimed.items():
+                if name.startswith(token):
+                    del self.unclaimed[name]
+                    request.path = path
+                    request.done.set()
+                    return request
+            self.pending.append(request)
+        return request
+
+    def wait(self, request: DownloadRequest, timeout: float) -> Optional[Path]:
+        """Block until the request's file has finished downloading; None on timeout"""
+        start = time.monotonic()
+        if request.done.wait(timeout):
+            self.log_callback(f"Wait for download {request.path.name}: {time.monotonic() - start:.2f}s")
+            return request.path
+
+        with self.lock:
+            if request in self.pending:
+                self.pending.remove(request)
+        self.log_callback(f"Wait for download '{request.token}*': timed out after {timeout:.1f}s")
+        return None
+
+    def close(self) -> None:
+        """Stop watching"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+        if self.inotify:
+            self.inotify.close()
+            self.inotify = None
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Cached geckodriver resolution.
+webdriver-manager asks GitHub for the latest geckodriver release on every
+start, which costs a network round trip and fails on offline hosts. The
+resolved driver is copied into a local cache together with its version, and
+reused without any network access until the pin is older than max_age.
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+DRIVER_NAME = "geckodriver.exe" if sys.platform == "win32" else "geckodriver"
+
+
+def default_install() -> str:
+    """Download (or find in its own cache) the latest geckodriver with webdriver-manager"""
+    from webdriver_manager.firefox import GeckoDriverManager
+    return GeckoDriverManager().install()
+
+
+def driver_version(driver_path: str) -> str:
+    """Version reported by `geckodriver --version`, or "" if it cannot be run"""
+    try:
+        result = subprocess.run([driver_path, "--version"], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return ""
+    match = re.search(r"geckodriver (\S+)", result.stdout)
+    return match.group(1) if match else ""
+
+
+class DriverCache:
+    """Pins a geckodriver binary and its version in a local directory"""
+
+    def __init__(self, cache_dir: str, max_age: float = 7 * 86400,
+                 install: Callable[[], str] = default_install,
+                 log_callback: Callable[[str], None] = print):
+        self.cache_dir = Path(cache_dir)
+        self.pin_path = self.cache_dir / "geckodriver.json"
+        self.max_age = max_age
+        self.install = install
+        self.log_callback = log_callback
+
+    def read_pin(self) -> Optional[dict]:
+        try:
+            pin = json.loads(self.pin_path.read_text())
+        except (OSError, ValueError):
+            return None
+        return pin if Path(pin.get("path", "")).is_file() else None
+
+    def pin(self, driver_path: str) -> dict:
+        """Copy a driver into the cache and record its version"""
+        version = driver_version(driver_path) or "unknown"
+        target = self.cache_dir / version / DRIVER_NAME
+        if Path(driver_path).resolve() != target.resolve():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(driver_path, target)
+        pin = {"path": str(target), "version": version, "resolved_at": time.time()}
+        temp_path = self.pin_path.with_name(self.pin_path.name + ".tmp")
+        temp_path.write_text(json.dumps(pin))
+        os.replace(temp_path, self.pin_path)
+        return pin
+
+    def resolve(self) -> str:
+        """
+        Path of the geckodriver to use: the pinned one while it is fresh,
+        otherwise a newly installed one, falling back to the stale pin and
+        finally to geckodriver on PATH when the network is not reachable.
+        """
+        pin = self.read_pin()
+        if pin and time.time() - pin.get("resolved_at", 0) < self.max_age:
+            self.log_callback(f"Using pinned geckodriver {pin['version']}")
+            return pin["path"]
+
+        try:
+            pin = self.pin(self.install())
+            self.log_callback(f"Pinned geckodriver {pin['version']}")
+            return pin["path"]
+        except Exception as e:
+            self.log_callback(f"Could not install geckodriver: {e}")
+
+        if pin:
+            self.log_callback(f"Using stale pinned geckodriver {pin['version']}")
+            return pin["path"]
+        on_path = shutil.which(DRIVER_NAME)
+        if on_path:
+            self.log_callback(f"Using geckodriver from PATH: {on_path}")
+            return on_path
+        raise FileNotFoundError("No geckodriver available: install failed and none found on PATH")
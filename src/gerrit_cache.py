@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Persistent cache of Gerrit query results.
+Only merged changes are queried, and the revision, project and files of a
+merged change never change again, so they are kept forever. Changes that were
+not found (not merged yet, or wrong number) are remembered only for a short
+time, since they may be merged later.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from gerrit_query import GerritChange
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS changes (
+    server TEXT NOT NULL,
+    number TEXT NOT NULL,
+    data TEXT,  -- GerritChange as JSON, NULL if the change was not found
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (server, number)
+);
+"""
+
+
+class GerritMetadataCache:
+    """SQLite-backed cache of merged-change lookups, shared by all projects"""
+
+    def __init__(self, db_path: str, negative_ttl: float = 3600.0):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        # Hits that were a cached "not merged or not found"
+        self.negative_hits = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def lookup(self, server: str, numbers: Iterable[str]) -> Dict[str, Optional[GerritChange]]:
+        """
+        Cached results for the given change numbers. Merged changes map to their
+        GerritChange, recently missing ones to None; unknown or expired numbers are left out.
+        """
+        numbers = list(numbers)
+        found = {}
+        expired_before = time.time() - self.negative_ttl
+        with self.lock:
+            for start in range(0, len(numbers), 500):
+                chunk = numbers[start:start + 500]
+                rows = self.conn.execute(
+                    f"SELECT number, data, fetched_at FROM changes WHERE server = ? "
+                    f"AND number IN ({','.join('?' * len(chunk))})",
+                    [server, *chunk],
+                )
+                for number, data, fetched_at in rows:
+                    if data is not None:
+                        found[number] = GerritChange(**json.loads(data))
+                    elif fetched_at >= expired_before:
+                        found[number] = None
+            self.hits += len(found)
+            self.misses += len(numbers) - len(found)
+            self.negative_hits += sum(1 for change in found.values() if change is None)
+        return found
+
+    def store(self, server: str, results: Dict[str, Optional[GerritChange]]) -> None:
+        """Remember query results; None marks a change that is not merged or does not exist"""
+        now = time.time()
+        rows = [(server, number, json.dumps(asdict(change)) if change else None, now)
+                for number, change in results.items()]
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO changes VALUES (?, ?, ?, ?)", rows)
+
+    def counters(self) -> Tuple[int, int, int]:
+        """(hits, misses, negative hits) since the cache was opened"""
+        with self.lock:
+            return self.hits, self.misses, self.negative_hits
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Helpers for bulk Gerrit queries.
+Builds OR-ed `change:` queries and parses `gerrit query --format=JSON` output
+into typed results, so a whole sheet can be resolved with a few queries per server.
+"""
+
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+
+class GerritLookupError(Exception):
+    """A change could not be looked up because its query failed; unlike "not merged", worth retrying"""
+
+
+@dataclass
+class GerritChange:
+    """Query result for a single Gerrit change"""
+
+    number: str
+    project: str = ""
+    revision: str = ""
+    patchset: int = 0
+    status: str = ""
+    last_updated: int = 0  # epoch seconds
+    files: List[str] = field(default_factory=list)
+
+    @property
+    def last_updated_date(self) -> int:
+        """Last update date as YYYYMMDD"""
+        return int(datetime.fromtimestamp(self.last_updated).strftime("%Y%m%d"))
+
+
+def chunk_ids(gerrit_ids: Iterable[str], chunk_size: int = 50) -> List[List[str]]:
+    """Deduplicate change IDs and split them into chunks of at most chunk_size"""
+    ids = list(dict.fromkeys(str(gerrit_id) for gerrit_id in gerrit_ids))
+    return [ids[start:start + chunk_size] for start in range(0, len(ids), chunk_size)]
+
+
+def build_change_query(gerrit_ids: Iterable[str], status: str = "merged") -> str:
+    """Build `status:X AND (change:1 OR change:2 ...)`"""
+    terms = " OR ".join(f"change:{gerrit_id}" for gerrit_id in gerrit_ids)
+    return f"status:{status} AND ({terms})" if status else f"({terms})"
+
+
+def build_change_queries(gerrit_ids: Iterable[str], chunk_size: int = 50,
+                         status: str = "merged") -> List[str]:
+    """Split change IDs into OR-ed queries of at most chunk_size terms"""
+    return [build_change_query(chunk, status) for chunk in chunk_ids(gerrit_ids, chunk_size)]
+
+
+def parse_change(data: Dict) -> GerritChange:
+    """Convert one change object from Gerrit's JSON output"""
+    patch_set = data.get("currentPatchSet") or {}
+    return GerritChange(
+        number=str(data.get("number", "")),
+        project=data.get("project", ""),
+        revision=patch_set.get("revision", ""),
+        patchset=int(patch_set.get("number", 0) or 0),
+        status=data.get("status", ""),
+        last_updated=int(data.get("lastUpdated", 0) or 0),
+        files=[f.get("file", "") for f in patch_set.get("files", [])],
+    )
+
+
+def parse_query_output(output: str) -> Dict[str, GerritChange]:
+    """Parse `gerrit query --format=JSON` output, one JSON object per line, keyed by change number"""
+    changes = {}
+    for line in output.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        # The last line is a statistics record, not a change
+        if data.get("type") == "stats" or "number" not in data:
+            continue
+        change = parse_change(data)
+        changes[change.number] = change
+    return changes
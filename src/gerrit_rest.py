@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Gerrit REST backend.
+Answers the same change lookups as the SSH `gerrit query` for servers whose
+port 29418 cannot be reached, using batched queries over a keep-alive session.
+"""
+
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from browser_cookies import load_cookies
+from gerrit_query import GerritChange
+
+# Gerrit prefixes every JSON response with this line to prevent XSSI
+XSSI_PREFIX = ")]}'"
+
+
+def parse_rest_response(text: str):
+    """Strip Gerrit's XSSI prefix and decode the JSON body"""
+    if text.startswith(XSSI_PREFIX):
+        text = text[len(XSSI_PREFIX):]
+    return json.loads(text)
+
+
+def parse_rest_timestamp(value: str) -> int:
+    """Convert Gerrit's 'YYYY-MM-DD hh:mm:ss.nnnnnnnnn' UTC timestamps to epoch seconds"""
+    if not value:
+        return 0
+    parsed = datetime.strptime(value[:19], "%Y-%m-%d %H:%M:%S")
+    return int(parsed.replace(tzinfo=timezone.utc).timestamp())
+
+
+def parse_rest_change(data: Dict) -> GerritChange:
+    """Convert a ChangeInfo entity into a GerritChange"""
+    revision = data.get("current_revision", "")
+    revision_info = data.get("revisions", {}).get(revision, {})
+    return GerritChange(
+        number=str(data.get("_number", "")),
+        project=data.get("project", ""),
+        revision=revision,
+        patchset=int(revision_info.get("_number", 0) or 0),
+        status=data.get("status", ""),
+        last_updated=parse_rest_timestamp(data.get("updated", "")),
+        files=list(revision_info.get("files", {}).keys()),
+    )
+
+
+class GerritRestClient:
+    """Runs change queries against one Gerrit server's REST API"""
+
+    def __init__(self, base_url: str, auth: Optional[Tuple[str, str]] = None,
+                 cookies: Optional[List[Dict]] = None, timeout: int = 30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=4))
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=4))
+        # Authenticated REST endpoints live under /a/ and use the HTTP password
+        self.prefix = "/a" if auth else ""
+        if auth:
+            self.session.auth = auth
+        if cookies:
+            self.update_cookies(cookies)
+
+    def update_cookies(self, cookies: List[Dict]) -> None:
+        """Add Selenium-style cookie dicts to the session"""
+        load_cookies(self.session.cookies, cookies)
+
+    def query_changes(self, query: str) -> Dict[str, GerritChange]:
+        """Run one change query and return the results keyed by change number"""
+        response = self.session.get(
+            f"{self.base_url}{self.prefix}/changes/",
+            params=[("q", query), ("o", "CURRENT_REVISION"), ("o", "CURRENT_FILES")],
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        changes = {}
+        for data in parse_rest_response(response.text):
+            change = parse_rest_change(data)
+            changes[change.number] = change
+        return changes
+
+    def close(self) -> None:
+        """Close the pooled connections"""
+        self.session.close()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Gerrit server registry.
+Everything the downloader knows about a Gerrit server lives in one
+GerritServer entry: its web URL and patch URL template, the link prefixes that
+point to it, how it is queried, and how hard it may be pushed. Each server has
+a HostLimiter that caps its parallel requests and request rate, and backs off
+while the server answers 429/5xx or its SSH connection fails.
+"""
+
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import requests
+
+# HTTP answers that mean "try again later" rather than "this will never work"
+TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether a failed request is worth repeating after backing off"""
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in TRANSIENT_STATUS
+    return isinstance(error, (ConnectionError, TimeoutError, subprocess.TimeoutExpired,
+                              requests.ConnectionError, requests.Timeout))
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the server asked us to wait in a Retry-After header, if any"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+
+class HostLimiter:
+    """Caps parallel requests and request rate to one server, slowing down while it struggles"""
+
+    # Attempts after the first one for requests that failed transiently
+    RETRIES = 2
+    BASE_BACKOFF = 1.0
+    MAX_BACKOFF = 30.0
+
+    def __init__(self, max_connections: int = 0, requests_per_second: float = 0.0):
+        # 0 leaves the number of parallel requests or the rate unlimited
+        self.slots = threading.BoundedSemaphore(max_connections) if max_connections > 0 else None
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self.retries = self.RETRIES
+        # Extra spacing between requests while the server signals overload
+        self.backoff = 0.0
+        self.next_start = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.waited = 0.0
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def request(self):
+        """Hold a connection slot for one request, started no earlier than the rate allows"""
+        if self.slots:
+            self.slots.acquire()
+        try:
+            self.wait_turn()
+            yield
+        finally:
+            if self.slots:
+                self.slots.release()
+
+    def wait_turn(self) -> None:
+        """Sleep until the next request may start"""
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_start)
+            self.next_start = start + max(self.interval, self.backoff)
+            self.requests += 1
+            self.waited += start - now
+        if start > now:
+            time.sleep(start - now)
+
+    def succeeded(self) -> None:
+        """Relax the backoff again after a successful request"""
+        with self.lock:
+            self.backoff = self.backoff / 2 if self.backoff > self.BASE_BACKOFF else 0.0
+
+    def failed(self, delay: Optional[float] = None) -> float:
+        """
+        Back off after a transient failure: double the spacing between requests,
+        or use the server's Retry-After. Returns the delay before the next request.
+        """
+        with self.lock:
+            self.failures += 1
+            self.backoff = min(self.MAX_BACKOFF, max(self.backoff * 2, self.BASE_BACKOFF))
+            if delay:
+                self.backoff = max(self.backoff, min(delay, self.MAX_BACKOFF))
+            self.next_start = max(self.next_start, time.monotonic() + self.backoff)
+            return self.backoff
+
+    def stats(self) -> str:
+        with self.lock:
+            return (f"{self.requests} requests, {self.failures} backoffs, "
+                    f"{self.waited:.1f}s waited for rate limit and backoff")
+
+
+@dataclass
+class GerritServer:
+    """One Gerrit server, keyed by the address the rest of the code uses for it"""
+
+    address: str
+    # Web root, e.g. https://secure.jp.sharp/android_review/gerrit
+    url: str
+    # URL prefixes (scheme optional) that identify links to this server
+    links: List[str] = field(default_factory=list)
+    # "ssh" runs `gerrit query` on ssh_port, "rest" uses the /changes/ REST API
+    backend: str = "ssh"
+    ssh_port: int = 29418
+    # REST authentication: "password" uses gerrit_http_password when it is set
+    # and the browser's login cookies otherwise; "cookies" always uses the cookies
+    auth: str = "password"
+    patch_url: str = "{url}/changes/{change}/revisions/{revision}/patch?zip"
+    # Requests (queries and patch downloads) in flight at once; 0 is unlimited
+    max_connections: int = 4
+    # Requests started per second; 0 is unlimited
+    requests_per_second: float = 0.0
+    limiter: HostLimiter = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.url = self.url.rstrip("/")
+        self.limiter = HostLimiter(self.max_connections, self.requests_per_second)
+
+    def patch_download_url(self, change: str, revision: str) -> str:
+        """Where the zip of a change's revision is downloaded from"""
+        return self.patch_url.format(url=self.url, change=change, revision=revision)
@@ -1,11 +1,14 @@
 import tkinter as tk
 from tkinter import messagebox, filedialog
 import configparser
+import os
 import subprocess
 from pathlib import Path
 import threading
 import sys
 
+from daemon_client import DEFAULT_PORT, GERRIT_PASSWORD_ENV, DaemonClient, token_path
+
 try:
     import pkg_resources
 except ImportError:
@@ -38,7 +41,8 @@ class App(tk.Tk):
             "gerrit_username",
             "gerrit_password",
             "sharp_name",
-            "fih_name"
+            "fih_name",
+            "workers"
         ]
 
         for i, setting in enumerate(settings):
@@ -87,6 +91,9 @@ class App(tk.Tk):
         self.save_button = tk.Button(button_frame, text="Save Config", command=self.save_config)
         self.save_button.pack(side="left", padx=5)
 
+        self.daemon_button = tk.Button(button_frame, text="Start Daemon", command=self.start_daemon)
+        self.daemon_button.pack(side="left", padx=5)
+
         self.run_button = tk.Button(
             button_frame,
             text="Run Downloader",
@@ -219,7 +226,8 @@ class App(tk.Tk):
     def browse_excel_file(self):
         file_path = filedialog.askopenfilename(
             title="Select Excel File",
-            filetypes=(("Excel files", "*.xlsx *.xls"), ("All files", "*.*"))
+            filetypes=(("Work lists", "*.xlsx *.xlsm *.csv *.jsonl"), ("Excel files", "*.xlsx *.xlsm"),
+                       ("CSV files", "*.csv"), ("JSON Lines files", "*.jsonl"), ("All files", "*.*"))
         )
         if file_path:
             self.entries["excel_file"].delete(0, tk.END)
@@ -240,7 +248,61 @@ class App(tk.Tk):
         thread.daemon = True
         thread.start()
 
+    def daemon_client(self):
+        port = DEFAULT_PORT
+        if 'settings' in self.config:
+            port = self.config['settings'].getint('daemon_port', fallback=DEFAULT_PORT)
+        return DaemonClient(port, token_path(self.project_root / "output"))
+
+    def start_daemon(self):
+        """Launch daemon.py in the background; later runs reuse its browsers"""
+        if self.daemon_client().available():
+            messagebox.showinfo("Daemon", "The downloader daemon is already running.")
+            return
+        log_path = self.project_root / "output" / "daemon.out"
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        # The daemon has no terminal to ask for a password that is not saved in config.ini
+        env = dict(os.environ)
+        password_entry = self.entries.get("gerrit_password")
+        if password_entry and password_entry.get().strip():
+            env[GERRIT_PASSWORD_ENV] = password_entry.get().strip()
+        try:
+            with open(log_path, "a") as log_file:
+                subprocess.Popen(
+                    [sys.executable, str(self.project_root / "src" / "daemon.py")],
+                    stdin=subprocess.DEVNULL,
+                    stdout=log_file,
+                    stderr=subprocess.STDOUT,
+                    cwd=self.project_root,
+                    env=env,
+                )
+            self.log_output(f"Started the downloader daemon (output in {log_path}).\n"
+                            "It logs into JIRA and Gerrit once and keeps its browsers for later runs.\n")
+        except Exception as e:
+            self.log_output(f"Failed to start the daemon: {e}\n")
+
+    def run_with_daemon(self, client):
+        """Hand the run to the daemon and show its progress"""
+        try:
+            job = client.run(
+                self.entries["project_name"].get().strip(),
+                self.entries["excel_file"].get().strip(),
+                lambda message: self.log_output(message + "\n"),
+            )
+            if job["state"] != "done":
+                self.log_output(f"\nThe daemon could not finish the job: {job['error']}\n")
+        except Exception as e:
+            self.log_output(f"An error occurred while talking to the daemon:\n{e}")
+        finally:
+            self.after(0, self.show_completion_message)
+            self.enable_buttons()
+
     def run_script(self):
+        client = self.daemon_client()
+        if client.available():
+            self.run_with_daemon(client)
+            return
+
         main_script_path = self.project_root / "src" / "main.py"
         if not main_script_path.exists():
             self.log_output(f"Error: main.py not found at {main_script_path}")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Browser-free access to JIRA issues through the REST API.
+Fetches the issue JSON (with rendered fields) and its remote links over a
+pooled HTTP session, and saves the HTML issue view with a direct GET.
+"""
+
+import html
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from browser_cookies import load_cookies
+
+# Absolute URLs inside JSON strings and rendered HTML
+URL_PATTERN = re.compile(r"https?://[^\s\"'<>\[\]|\\]+")
+
+
+def collect_strings(value) -> List[str]:
+    """All string values of a decoded JSON document"""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        strings = []
+        for item in value:
+            strings.extend(collect_strings(item))
+        return strings
+    return []
+
+
+def extract_urls(document) -> List[str]:
+    """Every URL mentioned anywhere in a JSON document, in order of appearance"""
+    urls = []
+    for text in collect_strings(document):
+        urls.extend(URL_PATTERN.findall(html.unescape(text)))
+    return list(dict.fromkeys(urls))
+
+
+class JiraApiClient:
+    """Fetches JIRA issue data over a keep-alive session"""
+
+    def __init__(self, base_url: str, auth: Optional[Tuple[str, str]] = None,
+                 cookies: Optional[List[Dict]] = None, timeout: int = 30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=8)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept"] = "application/json"
+        if auth:
+            # Atlassian Cloud API tokens use basic auth with the account e-mail
+            self.session.auth = auth
+        load_cookies(self.session.cookies, cookies or [])
+
+    def get_json(self, path: str, **params):
+        response = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def authenticated(self) -> bool:
+        """Whether JIRA still accepts the session; False once it answers 401 or 403"""
+        try:
+            self.get_json("/rest/api/2/myself")
+        except requests.HTTPError as e:
+            return e.response is None or e.response.status_code not in (401, 403)
+        except requests.RequestException:
+            # Unreachable is not logged out; the run reports it per issue
+            pass
+        return True
+
+    def get_issue(self, issue_key: str) -> Dict:
+        """Issue JSON including the HTML-rendered fields"""
+        return self.get_json(f"/rest/api/2/issue/{issue_key}", expand="renderedFields")
+
+    def get_remote_links(self, issue_key: str) -> List[Dict]:
+        """Remote links (e.g. Gerrit changes) attached to the issue"""
+        return self.get_json(f"/rest/api/2/issue/{issue_key}/remotelink")
+
+    def get_issue_urls(self, issue_key: str) -> List[str]:
+        """All URLs referenced by the issue's fields, comments and remote links"""
+        return extract_urls([self.get_issue(issue_key), self.get_remote_links(issue_key)])
+
+    def html_view_url(self, issue_key: str) -> str:
+        """URL of the printable HTML issue view"""
+        return f"{self.base_url}/si/jira.issueviews:issue-html/{issue_key}/{issue_key}.html"
+
+    def save_html_view(self, issue_key: str, target_path: str) -> None:
+        """Download the HTML issue view to target_path"""
+        target = Path(target_path)
+        part_path = target.with_name(target.name + ".part")
+        with self.session.get(self.html_view_url(issue_key), stream=True, timeout=self.timeout,
+                              headers={"Accept": "text/html"}) as response:
+            response.raise_for_status()
+            with open(part_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+        os.replace(part_path, target)
+
+    def cookies(self) -> List[Dict]:
+        """Session cookies as Selenium-style dicts"""
+        return [{"name": c.name, "value": c.value, "domain": c.domain, "path": c.path}
+                for c in self.session.cookies]
+
+    def close(self) -> None:
+        """Close the pooled connections"""
+        self.session.close()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Gerrit link classifier.
+Builds one precompiled regular expression from per-server URL prefixes and
+extracts (server, change number, patchset) from URLs or raw HTML.
+"""
+
+import re
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+# Everything after a server's base URL that leads to a change number:
+#   12345  |  #/c/12345/2  |  #/c/project/+/12345/2  |  c/project/+/12345/2
+CHANGE_PATH = r"(?:#/)?(?:c/(?:[^\s\"'<>#?]*?/\+/)?)?(?P<change>\d{1,9})(?:/(?P<patchset>\d{1,4}))?(?![\d])"
+
+
+class GerritLink(NamedTuple):
+    """A link to a Gerrit change"""
+
+    server: str
+    change: str
+    patchset: Optional[int]
+    url: str
+
+
+def normalize_prefix(prefix: str) -> str:
+    """Strip the scheme and make sure the prefix ends with a slash"""
+    prefix = re.sub(r"^[a-z]+://", "", prefix.strip(), flags=re.IGNORECASE)
+    return prefix if prefix.endswith("/") else prefix + "/"
+
+
+class GerritLinkClassifier:
+    """Maps URLs to Gerrit servers using URL prefixes declared per server"""
+
+    def __init__(self, rules: Dict[str, List[str]]):
+        # rules: server address -> URL prefixes, e.g. {"10.24.71.91": ["10.24.71.91/gerrit/"]}
+        self.prefix_to_server = {}
+        for server, prefixes in rules.items():
+            for prefix in prefixes:
+                self.prefix_to_server[normalize_prefix(prefix).lower()] = server
+
+        # Longest prefixes first so that ".../gerrit/" wins over the bare host
+        alternatives = "|".join(re.escape(prefix) for prefix in
+                                sorted(self.prefix_to_server, key=len, reverse=True))
+        self.pattern = re.compile(
+            rf"(?:https?://)?(?<![\w.-])(?P<prefix>{alternatives}){CHANGE_PATH}",
+            re.IGNORECASE,
+        )
+        # hrefs start with the scheme, so single URLs only need an anchored match
+        self.url_pattern = re.compile(
+            rf"(?:https?://)?(?P<prefix>{alternatives}){CHANGE_PATH}",
+            re.IGNORECASE,
+        )
+
+    def link_from_match(self, match) -> GerritLink:
+        prefix, change, patchset = match.group("prefix", "change", "patchset")
+        server = self.prefix_to_server.get(prefix) or self.prefix_to_server[prefix.lower()]
+        return GerritLink(server, change, int(patchset) if patchset else None, match.group(0))
+
+    def classify(self, url: str) -> Optional[GerritLink]:
+        """The Gerrit change a single URL points to, or None"""
+        match = self.url_pattern.match(url)
+        return self.link_from_match(match) if match else None
+
+    def iter_links(self, urls: Iterable[str]) -> Iterator[GerritLink]:
+        """Gerrit links among a stream of URLs"""
+        match_url = self.url_pattern.match
+        for url in urls:
+            if url:
+                match = match_url(url)
+                if match:
+                    yield self.link_from_match(match)
+
+    def scan_text(self, text: str) -> Iterator[GerritLink]:
+        """Gerrit links anywhere in raw text or HTML"""
+        for match in self.pattern.finditer(text):
+            yield self.link_from_match(match)
+
+    @staticmethod
+    def group_by_server(links: Iterable[GerritLink]) -> Dict[str, List[str]]:
+        """Deduplicated change numbers per server, in order of first appearance"""
+        grouped: Dict[str, Dict[str, None]] = {}
+        for link in links:
+            grouped.setdefault(link.server, {})[link.change] = None
+        return {server: list(changes) for server, changes in grouped.items()}
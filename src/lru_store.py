@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Size limit of the on-disk caches.
+The bytes a cache holds are counted once, when the first entry is stored, and
+kept as a running total after that, so the cache directory is only scanned
+again when the total goes over the limit. Eviction then removes the least
+recently used entries until the cache is a bit below the limit.
+"""
+
+import threading
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+# Share of max_bytes an eviction trims the cache down to, so that it does not run on every store
+EVICT_TO = 0.9
+
+
+class LruStore:
+    """Base of a directory cache whose entries are evicted least recently used first"""
+
+    # Plural of what an entry is, for the eviction log line
+    ENTRY_NAME = "entries"
+
+    def __init__(self, max_bytes: int, log_callback: Callable[[str], None] = print):
+        # 0 leaves the cache size unlimited
+        self.max_bytes = max_bytes
+        self.log_callback = log_callback
+        # Bytes in the cache, counted on the first store and kept up to date after that
+        self.total_bytes: Optional[int] = None
+        self.lock = threading.Lock()
+        self.evict_lock = threading.Lock()
+
+    def entries(self) -> List[Tuple[float, int, List[Path]]]:
+        """(last use, size, files) of every entry; files are removed together"""
+        raise NotImplementedError
+
+    def added(self, size: int) -> None:
+        """Account for bytes stored in the cache and evict old entries once it is over max_bytes"""
+        if not self.max_bytes:
+            return
+        with self.lock:
+            if self.total_bytes is None:
+                # The first count already includes the entry just stored
+                self.total_bytes = sum(entry_size for _, entry_size, _ in self.entries())
+            else:
+                self.total_bytes += size
+            over = self.total_bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache is a bit below max_bytes"""
+        with self.evict_lock:
+            with self.lock:
+                if self.total_bytes is not None and self.total_bytes <= self.max_bytes:
+                    return  # another worker evicted meanwhile
+            entries = sorted(self.entries(), key=lambda entry: entry[0])
+            total = sum(size for _, size, _ in entries)
+            evicted = 0
+            for _, size, files in entries:
+                if total <= self.max_bytes * EVICT_TO:
+                    break
+                for path in files:
+                    try:
+                        path.unlink()
+                    except FileNotFoundError:
+                        pass
+                total -= size
+                evicted += 1
+            with self.lock:
+                self.total_bytes = total
+        self.log_callback(f"Evicted {evicted} {self.ENTRY_NAME} from {self.directory}")
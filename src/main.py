@@ -6,24 +6,53 @@ JIRA Issue Downloader - Modernized Python 3 Version
 Downloads JIRA issues and associated Gerrit patches using Chrome WebDriver
 """
 
+import base64
 import configparser
+import dataclasses
+import functools
+import itertools
 import logging
+import os
+import queue
 import re
+import shlex
 import shutil
 import subprocess
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import List, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
-import openpyxl
 from selenium import webdriver
 
 from selenium.webdriver.common.by import By
 from selenium.webdriver.firefox.options import Options as FirefoxOptions
 from selenium.webdriver.firefox.service import Service as FirefoxService
 
-from webdriver_manager.firefox import GeckoDriverManager
+from asset_cache import AssetCache
+from daemon_client import DEFAULT_PORT, DaemonClient, token_path
+from download_watcher import DownloadWatcher
+from driver_cache import DriverCache
+from gerrit_cache import GerritMetadataCache
+from gerrit_query import GerritChange, GerritLookupError, build_change_query, chunk_ids, parse_query_output
+from gerrit_rest import GerritRestClient
+from gerrit_servers import GerritServer, is_transient, retry_after
+from jira_api import JiraApiClient
+from link_classifier import GerritLinkClassifier
+from page_waits import PageWaiter
+from patch_cache import PatchCache
+from pdf_render_pool import PdfRenderPool
+from patch_downloader import PatchDownloader, holds_revision
+from pipeline import IssueJob, Pipeline, Stage
+from profile_builder import ProfileBuilder, default_template_dir
+from run_manifest import DONE, FAILED, RunManifest
+from ssh_pool import SshConnectionPool
+import tracing
+from work_items import WorkListReader
 
 
 def find_default_firefox_profile() -> str:
@@ -95,6 +124,80 @@ def find_default_firefox_profile() -> str:
     return ""
 
 
+# Files Firefox keeps open or regenerates on launch; copying them breaks the copy.
+PROFILE_COPY_IGNORE = (
+    "lock", ".parentlock", "parent.lock", "cache2", "startupCache",
+    "thumbnails", "crashes", "minidumps", "saved-telemetry-pings",
+)
+
+
+def copy_firefox_profile(profile_path: str, target_dir: str) -> str:
+    """
+    Copies a Firefox profile so that several browsers can run from it at once.
+    Lock files and caches are skipped; cookies and logins are kept.
+    """
+    target_path = Path(target_dir)
+    if target_path.exists():
+        shutil.rmtree(target_path)
+    shutil.copytree(profile_path, target_path,
+                    ignore=shutil.ignore_patterns(*PROFILE_COPY_IGNORE))
+    return str(target_path)
+
+
+# Returns every href on the page in one round trip; el.href is the resolved
+# absolute URL (what get_attribute('href') returns), SVG elements fall back to the attribute
+PAGE_HREFS_JS = """
+return Array.from(document.querySelectorAll('[href]'),
+                  el => typeof el.href === 'string' ? el.href : el.getAttribute('href'));
+"""
+
+# Preferences for page loads that only read links: no images, web fonts,
+# media autoplay or service workers
+LEAN_PREFERENCES = {
+    "permissions.default.image": 2,
+    "gfx.downloadable_fonts.enabled": False,
+    "media.autoplay.default": 5,
+    "dom.serviceWorkers.enabled": False,
+}
+
+# Sets Firefox preferences at runtime (chrome context) and returns their previous
+# user values; null clears a preference back to its default
+APPLY_PREFERENCES_JS = """
+const previous = {};
+for (const [name, value] of Object.entries(arguments[0])) {
+    if (!Services.prefs.prefHasUserValue(name)) {
+        previous[name] = null;
+    } else if (Services.prefs.getPrefType(name) == Services.prefs.PREF_BOOL) {
+        previous[name] = Services.prefs.getBoolPref(name);
+    } else if (Services.prefs.getPrefType(name) == Services.prefs.PREF_INT) {
+        previous[name] = Services.prefs.getIntPref(name);
+    } else {
+        previous[name] = Services.prefs.getStringPref(name);
+    }
+    if (value === null) {
+        Services.prefs.clearUserPref(name);
+    } else if (typeof value === 'boolean') {
+        Services.prefs.setBoolPref(name, value);
+    } else if (typeof value === 'number') {
+        Services.prefs.setIntPref(name, value);
+    } else {
+        Services.prefs.setStringPref(name, value);
+    }
+}
+return previous;
+"""
+
+# Seconds before a login cookie expires from which a warm session logs in again
+LOGIN_EXPIRY_MARGIN = 600
+
+# Bytes the browser transferred for the current page and its resources, which
+# wkhtmltopdf would have to download again to render it
+PAGE_BYTES_JS = """
+return performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'))
+                  .reduce((total, entry) => total + (entry.encodedBodySize || 0), 0);
+"""
+
+
 class JiraConfig:
     """Configuration for JIRA and Gerrit connections"""
 
@@ -103,14 +206,231 @@ class JiraConfig:
     JIRA_DOC_BASE_URL = "https://sharp-smart-mobile-comm.atlassian.net/si/jira.issueviews:issue-html/"
 
     GERRIT_LOGIN_URL = "https://secure.jp.sharp/android_review/gerrit/login/"
-    GERRIT_ADDRESSES = {
-        '10.24.71.180': 'https://secure.jp.sharp/android_review/gerrit',
-        '10.24.71.91': 'http://10.24.71.91/gerrit',
-        '10.230.1.88': 'http://10.230.1.88'
+    # Gerrit servers by address, overridden by the [gerrit:<address>] sections of config.ini
+    GERRIT_SERVERS = {
+        '10.24.71.180': GerritServer('10.24.71.180', 'https://secure.jp.sharp/android_review/gerrit',
+                                     ['secure.jp.sharp/android_review/gerrit/', '10.24.71.180/gerrit/'],
+                                     max_connections=2, requests_per_second=5),
+        '10.24.71.91': GerritServer('10.24.71.91', 'http://10.24.71.91/gerrit', ['10.24.71.91/gerrit/'],
+                                    max_connections=8),
+        '10.230.1.88': GerritServer('10.230.1.88', 'http://10.230.1.88', ['10.230.1.88/'],
+                                    max_connections=8),
     }
+    _link_classifier = None
 
     DOWNLOAD_GERRIT_ZIP = True
 
+    # Run Firefox without a window
+    HEADLESS = False
+
+    # "ephemeral" launches Firefox from a copy of a small template holding only the
+    # cookies, logins and certificates of the default profile; "default" uses the
+    # default profile itself. PROFILE_TMPFS keeps the template in /dev/shm (Linux).
+    PROFILE_MODE = "ephemeral"
+    PROFILE_TMPFS = False
+    PROFILE_TEMPLATE_MAX_AGE = 3600.0
+
+    # geckodriver to use; if empty it is resolved with webdriver-manager and
+    # pinned in DRIVER_CACHE_DIR, without network checks for DRIVER_CACHE_DAYS
+    GECKODRIVER_PATH = ""
+    DRIVER_CACHE_DIR = str(Path.home() / ".cache" / "jira-downloader" / "drivers")
+    DRIVER_CACHE_DAYS = 7.0
+    # Load the pages that are only read for links without images, fonts, media
+    # and service workers; the HTML view printed to PDF keeps full fidelity
+    LEAN_EXTRACTION = True
+
+    # Number of parallel browser workers used by process_excel_file
+    WORKERS = 1
+
+    # Run the issues through a staged pipeline (fetch, link extraction, Gerrit
+    # resolve, patch download, PDF render) instead of capturing the whole sheet
+    # before any patch is downloaded. Threads per stage; the fetch stage uses
+    # one per browser worker and the render stage PDF_WORKERS.
+    PIPELINE = False
+    PIPELINE_GERRIT_WORKERS = 2
+    PIPELINE_PATCH_WORKERS = 2
+    # Issues waiting in front of each stage before the previous one pauses
+    PIPELINE_QUEUE_SIZE = 4
+
+    # Record spans of every stage and write them to output/<project>/traces/
+    # as JSON lines and as a Chrome trace for Perfetto
+    TRACE = False
+
+    # Localhost port of the downloader daemon (daemon.py); runs are handed to
+    # it whenever it is listening
+    DAEMON_PORT = DEFAULT_PORT
+
+    # "http" streams patch zips with the login cookies, "browser" uses window.open
+    PATCH_DOWNLOAD_MODE = "http"
+    DOWNLOAD_WORKERS = 4
+
+    # Patch zips shared between projects; the directory defaults to output/.patch_cache
+    PATCH_CACHE = True
+    PATCH_CACHE_DIR = ""
+    PATCH_CACHE_SIZE_MB = 2048
+
+    # Keep one multiplexed SSH connection per Gerrit server for the whole run
+    SSH_MULTIPLEX = True
+
+    # Timeouts (seconds) for the condition-based waits that replace fixed sleeps
+    PAGE_LOAD_TIMEOUT = 20.0
+    NETWORK_IDLE_TIMEOUT = 10.0
+    IMAGES_TIMEOUT = 15.0
+    LOGIN_TIMEOUT = 15.0
+    DOWNLOAD_TIMEOUT = 30.0
+
+    # How issue PDFs are produced: "wkhtmltopdf" fetches the view again, "browser"
+    # prints the page Firefox already loaded, "compare" does both and logs the difference
+    PDF_CAPTURE = "wkhtmltopdf"
+
+    # Stylesheets, fonts and images of issue views are kept in output/.asset_cache
+    # and given to the PDF renderers as local files; assets without their own
+    # cache headers are reused for ASSET_CACHE_TTL seconds. The least recently
+    # used assets are evicted beyond ASSET_CACHE_SIZE_MB
+    ASSET_CACHE = True
+    ASSET_CACHE_TTL = 86400.0
+    ASSET_CACHE_SIZE_MB = 512
+
+    # Number of wkhtmltopdf processes rendering issue PDFs in the background;
+    # 0 renders each PDF before moving on to the next issue
+    PDF_WORKERS = 2
+    # Cookie Gerrit sets once the login succeeded
+    GERRIT_LOGIN_COOKIE = "GerritAccount"
+
+    # "browser" loads every issue in Firefox, "api" fetches it with the JIRA REST API
+    # and only falls back to the browser when that fails
+    JIRA_FETCH_MODE = "browser"
+    # Atlassian account e-mail and API token for the REST API; the browser's
+    # JIRA session cookies are used if empty
+    JIRA_EMAIL = ""
+    JIRA_API_TOKEN = ""
+
+    # Skip issues and patches a previous run of the project already finished
+    RESUME = True
+
+    # Gerrit HTTP password for the REST backend; the login cookies are used if empty
+    GERRIT_HTTP_PASSWORD = ""
+
+    # Query results kept in output/.gerrit_cache.sqlite; merged changes never
+    # expire, changes that were not found are asked again after the TTL (seconds)
+    GERRIT_CACHE = True
+    GERRIT_CACHE_NEGATIVE_TTL = 3600.0
+
+    @classmethod
+    def load_settings(cls, settings) -> None:
+        """Override defaults with values from the [settings] section of config.ini"""
+        cls.WORKERS = max(1, settings.getint('workers', fallback=cls.WORKERS))
+        cls.HEADLESS = settings.getboolean('headless', fallback=cls.HEADLESS)
+        cls.PROFILE_MODE = settings.get('profile_mode', cls.PROFILE_MODE).strip().lower()
+        cls.PROFILE_TMPFS = settings.getboolean('profile_tmpfs', fallback=cls.PROFILE_TMPFS)
+        cls.GECKODRIVER_PATH = settings.get('geckodriver_path', cls.GECKODRIVER_PATH).strip()
+        cls.DRIVER_CACHE_DAYS = settings.getfloat('driver_cache_days', fallback=cls.DRIVER_CACHE_DAYS)
+        cls.LEAN_EXTRACTION = settings.getboolean('lean_extraction', fallback=cls.LEAN_EXTRACTION)
+        cls.RESUME = settings.getboolean('resume', fallback=cls.RESUME)
+        cls.DAEMON_PORT = settings.getint('daemon_port', fallback=cls.DAEMON_PORT)
+        cls.TRACE = settings.getboolean('trace', fallback=cls.TRACE)
+        cls.PIPELINE = settings.getboolean('pipeline', fallback=cls.PIPELINE)
+        cls.PIPELINE_GERRIT_WORKERS = max(1, settings.getint('pipeline_gerrit_workers',
+                                                             fallback=cls.PIPELINE_GERRIT_WORKERS))
+        cls.PIPELINE_PATCH_WORKERS = max(1, settings.getint('pipeline_patch_workers',
+                                                            fallback=cls.PIPELINE_PATCH_WORKERS))
+        cls.PIPELINE_QUEUE_SIZE = max(1, settings.getint('pipeline_queue_size',
+                                                         fallback=cls.PIPELINE_QUEUE_SIZE))
+        cls.PATCH_DOWNLOAD_MODE = settings.get('patch_download', cls.PATCH_DOWNLOAD_MODE).strip().lower()
+        cls.DOWNLOAD_WORKERS = max(1, settings.getint('download_workers', fallback=cls.DOWNLOAD_WORKERS))
+        cls.PATCH_CACHE = settings.getboolean('patch_cache', fallback=cls.PATCH_CACHE)
+        cls.PATCH_CACHE_DIR = settings.get('patch_cache_dir', cls.PATCH_CACHE_DIR).strip()
+        cls.PATCH_CACHE_SIZE_MB = settings.getint('patch_cache_size_mb', fallback=cls.PATCH_CACHE_SIZE_MB)
+        cls.SSH_MULTIPLEX = settings.getboolean('ssh_multiplex', fallback=cls.SSH_MULTIPLEX)
+        cls.GERRIT_HTTP_PASSWORD = settings.get('gerrit_http_password', cls.GERRIT_HTTP_PASSWORD).strip()
+        cls.GERRIT_CACHE = settings.getboolean('gerrit_cache', fallback=cls.GERRIT_CACHE)
+        cls.GERRIT_CACHE_NEGATIVE_TTL = settings.getfloat('gerrit_cache_negative_ttl',
+                                                          fallback=cls.GERRIT_CACHE_NEGATIVE_TTL)
+        cls.JIRA_FETCH_MODE = settings.get('jira_fetch', cls.JIRA_FETCH_MODE).strip().lower()
+        cls.JIRA_EMAIL = settings.get('jira_email', cls.JIRA_EMAIL).strip()
+        cls.JIRA_API_TOKEN = settings.get('jira_api_token', cls.JIRA_API_TOKEN).strip()
+        cls.PAGE_LOAD_TIMEOUT = settings.getfloat('page_load_timeout', fallback=cls.PAGE_LOAD_TIMEOUT)
+        cls.NETWORK_IDLE_TIMEOUT = settings.getfloat('network_idle_timeout', fallback=cls.NETWORK_IDLE_TIMEOUT)
+        cls.IMAGES_TIMEOUT = settings.getfloat('images_timeout', fallback=cls.IMAGES_TIMEOUT)
+        cls.LOGIN_TIMEOUT = settings.getfloat('login_timeout', fallback=cls.LOGIN_TIMEOUT)
+        cls.DOWNLOAD_TIMEOUT = settings.getfloat('download_timeout', fallback=cls.DOWNLOAD_TIMEOUT)
+        cls.PDF_WORKERS = max(0, settings.getint('pdf_workers', fallback=cls.PDF_WORKERS))
+        cls.PDF_CAPTURE = settings.get('pdf_capture', cls.PDF_CAPTURE).strip().lower()
+        cls.ASSET_CACHE = settings.getboolean('asset_cache', fallback=cls.ASSET_CACHE)
+        cls.ASSET_CACHE_TTL = settings.getfloat('asset_cache_ttl', fallback=cls.ASSET_CACHE_TTL)
+        cls.ASSET_CACHE_SIZE_MB = settings.getint('asset_cache_size_mb', fallback=cls.ASSET_CACHE_SIZE_MB)
+
+    @classmethod
+    def update_gerrit_server(cls, address: str, **settings) -> None:
+        """Replace settings of a Gerrit server, adding the server if it is not known yet"""
+        server = cls.GERRIT_SERVERS.get(address) or GerritServer(address, f"http://{address}")
+        cls.GERRIT_SERVERS[address] = dataclasses.replace(server, **settings)
+        cls._link_classifier = None
+
+    @classmethod
+    def load_gerrit_server(cls, address: str, section) -> None:
+        """Read a [gerrit:<address>] section; keys left out keep their current values"""
+        server = cls.GERRIT_SERVERS.get(address) or GerritServer(address, f"http://{address}")
+        settings = {key: section.get(key).strip() for key in ('url', 'patch_url') if key in section}
+        settings.update({key: section.get(key).strip().lower() for key in ('backend', 'auth')
+                         if key in section})
+        if 'links' in section:
+            settings['links'] = cls.split_prefixes(section['links'])
+        cls.update_gerrit_server(
+            address, **settings,
+            ssh_port=section.getint('ssh_port', fallback=server.ssh_port),
+            max_connections=max(0, section.getint('max_connections', fallback=server.max_connections)),
+            requests_per_second=max(0.0, section.getfloat('requests_per_second',
+                                                          fallback=server.requests_per_second)),
+        )
+
+    @classmethod
+    def load_gerrit_backends(cls, section) -> None:
+        """Read the older [gerrit_backends] section: one `address = ssh|rest` line per server"""
+        for address, backend in section.items():
+            cls.update_gerrit_server(address, backend=backend.strip().lower())
+
+    @classmethod
+    def load_gerrit_links(cls, section) -> None:
+        """Read the older [gerrit_links] section: `address = prefix, prefix, ...` per server"""
+        for address, prefixes in section.items():
+            cls.update_gerrit_server(address, links=cls.split_prefixes(prefixes))
+
+    @staticmethod
+    def split_prefixes(prefixes: str) -> List[str]:
+        return [prefix.strip() for prefix in prefixes.split(',') if prefix.strip()]
+
+    @classmethod
+    def gerrit_server(cls, gerrit_address: str) -> GerritServer:
+        """Registry entry of a Gerrit address; unknown addresses get default settings"""
+        if gerrit_address not in cls.GERRIT_SERVERS:
+            cls.GERRIT_SERVERS.setdefault(gerrit_address,
+                                          GerritServer(gerrit_address, f"http://{gerrit_address}"))
+        return cls.GERRIT_SERVERS[gerrit_address]
+
+    @classmethod
+    def gerrit_link_prefixes(cls) -> Dict[str, List[str]]:
+        """URL prefixes that identify links to each Gerrit server"""
+        return {address: server.links for address, server in cls.GERRIT_SERVERS.items()}
+
+    @classmethod
+    def link_classifier(cls) -> GerritLinkClassifier:
+        """Classifier compiled from the link prefixes of all Gerrit servers, built once"""
+        if cls._link_classifier is None:
+            cls._link_classifier = GerritLinkClassifier(cls.gerrit_link_prefixes())
+        return cls._link_classifier
+
+    @classmethod
+    def profile_builder(cls, source_profile: str, log_callback=print) -> ProfileBuilder:
+        """Builder for ephemeral automation profiles made from source_profile"""
+        return ProfileBuilder(source_profile, str(default_template_dir(cls.PROFILE_TMPFS)),
+                              cls.PROFILE_TEMPLATE_MAX_AGE, log_callback)
+
+    @classmethod
+    def gerrit_backend(cls, gerrit_address: str) -> str:
+        """Query backend configured for a Gerrit address"""
+        return cls.gerrit_server(gerrit_address).backend
+
 
 class FileManager:
     """Handles file and directory operations"""
@@ -126,68 +446,52 @@ class FileManager:
             print(f"{path} directory exists")
 
     @staticmethod
-    def rename_downloaded_file(source_dir: str, download_dir: str,
-                               jira_id: str, num: int, log_callback) -> None:
-        """Waits for a new zip file to appear and renames it."""
-        download_path = Path(download_dir)
+    def store_download(downloaded_file: Path, source_dir: str,
+                       jira_id: str, num: int, log_callback, revision: Optional[str] = None) -> None:
+        """Move a finished browser download to Source/<JIRA>-NN.zip"""
         new_name = f"{jira_id.strip()}-{str(num).zfill(2)}.zip"
         target_path = Path(source_dir) / new_name
 
-        # Wait for the download to start by looking for a .part file
-        time.sleep(1) # Give browser a moment to start download
-
-        # Wait for the .zip file to appear
-        downloaded_file = None
-        for _ in range(30):  # Wait up to 30 seconds
-            # Find the most recently modified zip file that isn't a temp file
-            zip_files = [f for f in download_path.glob("*.zip") if not f.name.endswith('.part')]
-            if zip_files:
-                latest_file = max(zip_files, key=lambda f: f.stat().st_mtime)
-                # A simple check to see if it's a new file
-                if time.time() - latest_file.stat().st_mtime < 10:
-                    downloaded_file = latest_file
-                    break
-            time.sleep(1)
-
-        if downloaded_file:
-            if target_path.exists():
-                log_callback(f"Target file {new_name} already exists. Deleting downloaded file.")
-                downloaded_file.unlink()
-            else:
-                shutil.move(str(downloaded_file), str(target_path))
-                log_callback(f'Moved and renamed to {target_path.name}')
+        if target_path.exists() and (revision is None or holds_revision(target_path, revision)):
+            log_callback(f"Target file {new_name} already exists. Deleting downloaded file.")
+            downloaded_file.unlink()
         else:
-            log_callback(f"Error: No new zip file found for {jira_id}-{num} in {download_dir}")
-
-        time.sleep(1) # Brief pause before next action
+            with tracing.span("download.store", target=new_name):
+                shutil.move(str(downloaded_file), str(target_path))
+            log_callback(f'Moved and renamed to {target_path.name}')
 
     @staticmethod
-    def print_page_to_pdf(browser, investigation_dir: str, jira_id: str, log_callback) -> None:
-        """Use browser's print-to-PDF functionality to save the current page as PDF."""
-        investigation_path = Path(investigation_dir)
-        pdf_target_path = investigation_path / f"{jira_id}.pdf"
-
-        log_callback(f"Printing page to PDF: {jira_id}.pdf")
+    def render_url_to_pdf(url: str, cookies: List[Dict], pdf_target_path: str,
+                          log_callback, auth: Optional[Tuple[str, str]] = None,
+                          asset_cache: Optional[AssetCache] = None) -> bool:
+        """
+        Render a URL to PDF with wkhtmltopdf, authenticated with the given cookies.
+        With an asset cache the page is fetched once and rendered from a local
+        copy whose stylesheets, fonts and images come from the cache.
+        """
+        if not shutil.which("wkhtmltopdf"):
+            return False
+
+        log_callback("Using wkhtmltopdf for PDF conversion (with images)...")
+        pdf_target = Path(pdf_target_path)
+        source = url
+        page_dir = None
+        if asset_cache:
+            asset_cache.set_credentials(cookies, auth)
+            page_dir = tempfile.mkdtemp(prefix="jira-page-")
+            with tracing.span("pdf.localize_assets", target=pdf_target.name):
+                local_page = asset_cache.save_localized_page(url, page_dir)
+            if local_page:
+                source = str(local_page)
+        cookie_args = []
+        for cookie in cookies:
+            cookie_args.extend(['--cookie', cookie['name'], cookie['value']])
+        if auth:
+            cookie_args.extend(['--username', auth[0], '--password', auth[1]])
 
         try:
-            import base64
-
-            log_callback("Attempting to generate PDF using browser's print function...")
-
-            # Get the current URL for wkhtmltopdf to load directly
-            current_url = browser.current_url
-
-            # Try to use wkhtmltopdf with the URL directly (best for images)
-            if shutil.which("wkhtmltopdf"):
-                log_callback("Using wkhtmltopdf for PDF conversion (with images)...")
-
-                # Get cookies from the browser to pass to wkhtmltopdf for authentication
-                cookies = browser.get_cookies()
-                cookie_args = []
-                for cookie in cookies:
-                    cookie_args.extend(['--cookie', cookie['name'], cookie['value']])
-
-                result = subprocess.run(
+            with tracing.span("pdf.wkhtmltopdf", target=pdf_target.name):
+                subprocess.run(
                     [
                         "wkhtmltopdf",
                         "--enable-local-file-access",
@@ -204,19 +508,77 @@ class FileManager:
                         "--margin-left", "20mm",
                         "--margin-right", "20mm",
                         *cookie_args,
-                        current_url,
-                        str(pdf_target_path),
+                        source,
+                        str(pdf_target),
                     ],
                     timeout=90,
                     capture_output=True,
                     text=True
                 )
+        except subprocess.TimeoutExpired:
+            log_callback("wkhtmltopdf timed out.")
+        finally:
+            if page_dir:
+                shutil.rmtree(page_dir, ignore_errors=True)
 
-                if pdf_target_path.exists():
-                    log_callback(f"Successfully saved PDF to {pdf_target_path.name}")
-                    return
-                else:
-                    log_callback("wkhtmltopdf did not produce a PDF file.")
+        if pdf_target.exists():
+            log_callback(f"Successfully saved PDF to {pdf_target.name}")
+            return True
+        log_callback("wkhtmltopdf did not produce a PDF file.")
+        return False
+
+    @staticmethod
+    def print_browser_page(browser, pdf_target_path: str, log_callback) -> bool:
+        """Save the page currently loaded in the browser as PDF with WebDriver's print command"""
+        try:
+            from selenium.webdriver.common.print_page_options import PrintOptions
+
+            # Same layout as the wkhtmltopdf output
+            print_options = PrintOptions()
+            print_options.page_ranges = ['all']
+            print_options.page_width = 21.0
+            print_options.page_height = 29.7
+            print_options.margin_top = 2.4
+            print_options.margin_bottom = 2.4
+            print_options.margin_left = 2.0
+            print_options.margin_right = 2.0
+            print_options.background = True
+
+            with tracing.span("pdf.browser_print", target=Path(pdf_target_path).name):
+                pdf_bytes = base64.b64decode(browser.print_page(print_options))
+        except Exception as e:
+            log_callback(f"print_page method not available: {e}")
+            return False
+
+        pdf_target = Path(pdf_target_path)
+        part_path = pdf_target.with_name(pdf_target.name + ".part")
+        with open(part_path, 'wb') as f:
+            f.write(pdf_bytes)
+        os.replace(part_path, pdf_target)
+        log_callback(f"Successfully saved PDF to {pdf_target.name}")
+        return True
+
+    @staticmethod
+    def print_page_to_pdf(browser, investigation_dir: str, jira_id: str, log_callback,
+                          asset_cache: Optional[AssetCache] = None) -> None:
+        """Use browser's print-to-PDF functionality to save the current page as PDF."""
+        investigation_path = Path(investigation_dir)
+        pdf_target_path = investigation_path / f"{jira_id}.pdf"
+
+        log_callback(f"Printing page to PDF: {jira_id}.pdf")
+
+        try:
+            log_callback("Attempting to generate PDF using browser's print function...")
+
+            # Get the current URL for wkhtmltopdf to load directly
+            current_url = browser.current_url
+
+            # Try to use wkhtmltopdf with the URL directly (best for images)
+            # Get cookies from the browser to pass to wkhtmltopdf for authentication
+            if FileManager.render_url_to_pdf(current_url, browser.get_cookies(),
+                                             str(pdf_target_path), log_callback,
+                                             asset_cache=asset_cache):
+                return
 
             # Fallback: Save HTML and try other methods
             log_callback("Falling back to HTML-based conversion...")
@@ -225,33 +587,22 @@ class FileManager:
                 f.write(browser.page_source)
 
             # Try using Selenium 4's print_page method
-            try:
-                from selenium.webdriver.common.print_page_options import PrintOptions
-
-                print_options = PrintOptions()
-                print_options.page_ranges = ['all']
-
-                log_callback("Trying Selenium print_page method...")
-                pdf_base64 = browser.print_page(print_options)
-                pdf_bytes = base64.b64decode(pdf_base64)
-
-                with open(pdf_target_path, 'wb') as f:
-                    f.write(pdf_bytes)
-
-                if pdf_target_path.exists():
-                    log_callback(f"Successfully saved PDF to {pdf_target_path.name}")
-                    if temp_html_path.exists():
-                        temp_html_path.unlink()  # Remove temp HTML
-                    return
-
-            except (ImportError, AttributeError, Exception) as e:
-                log_callback(f"print_page method not available: {e}")
+            log_callback("Trying Selenium print_page method...")
+            if FileManager.print_browser_page(browser, str(pdf_target_path), log_callback):
+                if temp_html_path.exists():
+                    temp_html_path.unlink()  # Remove temp HTML
+                return
 
             # Try weasyprint as another fallback
             try:
                 import weasyprint
                 log_callback("Using weasyprint for PDF conversion...")
-                weasyprint.HTML(filename=str(temp_html_path)).write_pdf(str(pdf_target_path))
+                if asset_cache:
+                    asset_cache.set_credentials(browser.get_cookies())
+                    weasyprint.HTML(filename=str(temp_html_path), base_url=current_url,
+                                    url_fetcher=asset_cache.url_fetcher).write_pdf(str(pdf_target_path))
+                else:
+                    weasyprint.HTML(filename=str(temp_html_path)).write_pdf(str(pdf_target_path))
 
                 if pdf_target_path.exists():
                     log_callback(f"Successfully saved PDF to {pdf_target_path.name}")
@@ -275,60 +626,204 @@ class FileManager:
             log_callback(f"Error in print_page_to_pdf: {e}")
             log_callback(f"Could not generate PDF for {jira_id}")
 
-        time.sleep(1)
-
 
 class GerritManager:
     """Manages Gerrit operations including querying and downloading patches"""
 
-    def __init__(self, username: str):
-        self.username = username
-
-    def query_gerrit(self, gerrit_id: str, gerrit_address: str,
-                     query_field: str = "revision") -> str:
-        """Query Gerrit for specific information"""
-        if query_field == "revision":
-            cmd = (f"ssh -p 29418 {self.username}@{gerrit_address} "
-                   f"gerrit query status:merged --format=TEXT "
-                   f"--current-patch-set --files change:{gerrit_id} "
-                   f"| grep 'revision:' | awk '{{print $2}}'")
-        elif query_field == "lastupdated":
-            cmd = (f"ssh -p 29418 {self.username}@{gerrit_address} "
-                   f"gerrit query status:merged --current-patch-set "
-                   f"--files change:{gerrit_id} "
-                   f"| grep -i lastupdated | awk '{{print $2}}'")
-        elif query_field == "project":
-            cmd = (f"ssh -p 29418 {self.username}@{gerrit_address} "
-                   f"gerrit query status:merged --current-patch-set "
-                   f"--files change:{gerrit_id} "
-                   f"| grep -i project | awk '{{print $2}}'")
-        else:
-            return ""
+    # Number of change IDs OR-ed together in one query
+    QUERY_CHUNK_SIZE = 50
+    # Number of queries sent at once over a host's shared SSH connection
+    QUERY_PARALLELISM = 4
 
+    def __init__(self, username: str, ssh_pool: Optional[SshConnectionPool] = None,
+                 http_password: str = "", metadata_cache: Optional[GerritMetadataCache] = None):
+        self.username = username
+        self.ssh_pool = ssh_pool or SshConnectionPool(
+            username, multiplex=JiraConfig.SSH_MULTIPLEX,
+            ports={address: server.ssh_port for address, server in JiraConfig.GERRIT_SERVERS.items()},
+        )
+        self.http_password = http_password
+        # Browser cookies for REST servers when no HTTP password is configured
+        self.cookies: List[Dict] = []
+        self.rest_clients: Dict[str, GerritRestClient] = {}
+        # (gerrit_address, gerrit_id) -> GerritChange, or None if not merged/not found;
+        # IDs whose query failed have no entry, so the next lookup asks again
+        self.changes: Dict[Tuple[str, str], Optional[GerritChange]] = {}
+        # Results of earlier runs, consulted before querying the server
+        self.metadata_cache = metadata_cache
+        self.lock = threading.Lock()
+
+    def run_query(self, gerrit_address: str, query: str) -> str:
+        """Run one `gerrit query --format=JSON` over SSH and return its raw output"""
+        remote_args = [
+            "gerrit", "query", "--format=JSON", "--current-patch-set", "--files",
+            shlex.quote(query),
+        ]
         try:
-            result = subprocess.run(cmd, shell=True, capture_output=True,
-                                    text=True, timeout=30)
-            return result.stdout.strip()
+            result = self.ssh_pool.run(gerrit_address, remote_args)
+            return result.stdout
         except subprocess.TimeoutExpired:
-            print(f"Timeout querying Gerrit for {gerrit_id}")
+            print(f"Timeout querying Gerrit: {query}")
             return ""
         except Exception as e:
             print(f"Error querying Gerrit: {e}")
             return ""
 
+    def query_server(self, gerrit_address: str, query: str) -> Dict[str, GerritChange]:
+        """One query attempt on the server's configured backend; raises if it failed"""
+        if JiraConfig.gerrit_backend(gerrit_address) == "rest":
+            return self.rest_client(gerrit_address).query_changes(query)
+        output = self.run_query(gerrit_address, query)
+        # A successful query always ends with a statistics row
+        if not output:
+            raise ConnectionError(f"SSH query on {gerrit_address} returned nothing")
+        return parse_query_output(output)
+
+    def rest_client(self, gerrit_address: str) -> GerritRestClient:
+        """Keep-alive REST client for a server, created on first use"""
+        with self.lock:
+            if gerrit_address not in self.rest_clients:
+                server = JiraConfig.gerrit_server(gerrit_address)
+                auth = None
+                if self.http_password and server.auth == "password":
+                    auth = (self.username, self.http_password)
+                self.rest_clients[gerrit_address] = GerritRestClient(server.url, auth, self.cookies)
+            return self.rest_clients[gerrit_address]
+
+    def set_cookies(self, cookies: List[Dict]) -> None:
+        """Share the browser's Gerrit login cookies with the REST clients"""
+        with self.lock:
+            self.cookies = list(cookies)
+            for client in self.rest_clients.values():
+                client.update_cookies(cookies)
+
+    def fetch_changes(self, gerrit_address: str, query: str) -> Optional[Dict[str, GerritChange]]:
+        """
+        Run one change query within the server's connection and rate limits; None
+        if the query failed. Busy or unreachable servers are asked again after a backoff.
+        """
+        server = JiraConfig.gerrit_server(gerrit_address)
+        limiter = server.limiter
+        for attempt in range(limiter.retries + 1):
+            with limiter.request(), tracing.span("gerrit.query", server=gerrit_address,
+                                                 backend=server.backend, attempt=attempt) as span:
+                try:
+                    found = self.query_server(gerrit_address, query)
+                except Exception as e:
+                    span.tag(error=type(e).__name__)
+                    error = e
+                else:
+                    span.tag(found=len(found))
+                    limiter.succeeded()
+                    return found
+
+            if not is_transient(error):
+                print(f"Error querying Gerrit on {gerrit_address}: {error}")
+                return None
+            delay = limiter.failed(retry_after(error))
+            if attempt < limiter.retries:
+                print(f"Gerrit {gerrit_address} is busy or unreachable ({error}), "
+                      f"retrying in {delay:.0f}s")
+        print(f"Giving up on Gerrit query on {gerrit_address}: {error}")
+        return None
+
+    def resolve_changes(self, gerrit_address: str,
+                        gerrit_ids: List[str]) -> Dict[str, GerritChange]:
+        """
+        Look up many merged changes on one server with as few queries as possible.
+        Results are remembered, so later lookups of the same IDs cost nothing.
+        """
+        with self.lock:
+            missing = [gerrit_id for gerrit_id in dict.fromkeys(gerrit_ids)
+                       if (gerrit_address, gerrit_id) not in self.changes]
+
+        if self.metadata_cache and missing:
+            cached = self.metadata_cache.lookup(gerrit_address, missing)
+            with self.lock:
+                self.changes.update(((gerrit_address, number), change)
+                                    for number, change in cached.items())
+            missing = [gerrit_id for gerrit_id in missing if gerrit_id not in cached]
+
+        def run_chunk(chunk: List[str]) -> None:
+            found = self.fetch_changes(gerrit_address, build_change_query(chunk))
+            if found is None:
+                return  # Leave the IDs unknown so a later lookup retries them
+            # Anything not returned is not merged or does not exist
+            results = {gerrit_id: found.get(gerrit_id) for gerrit_id in chunk}
+            results.update(found)
+            with self.lock:
+                self.changes.update(((gerrit_address, number), change)
+                                    for number, change in results.items())
+            if self.metadata_cache:
+                self.metadata_cache.store(gerrit_address, results)
+
+        chunks = chunk_ids(missing, self.QUERY_CHUNK_SIZE)
+        if len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=self.QUERY_PARALLELISM) as executor:
+                list(executor.map(run_chunk, chunks))
+        else:
+            for chunk in chunks:
+                run_chunk(chunk)
+
+        with self.lock:
+            return {gerrit_id: self.changes[(gerrit_address, gerrit_id)]
+                    for gerrit_id in gerrit_ids
+                    if self.changes.get((gerrit_address, gerrit_id))}
+
+    def forget_unmerged(self) -> None:
+        """
+        Drop the remembered "not merged or not found" results, so that a long-lived
+        manager asks again for changes merged since; the metadata cache's
+        negative TTL still applies to them.
+        """
+        with self.lock:
+            self.changes = {key: change for key, change in self.changes.items() if change}
+
+    def get_change(self, gerrit_id: str, gerrit_address: str) -> Optional[GerritChange]:
+        """
+        Look up a single merged change; None if it is not merged or does not exist.
+        Raises GerritLookupError if the server could not be asked.
+        """
+        change = self.resolve_changes(gerrit_address, [gerrit_id]).get(gerrit_id)
+        if change is None:
+            with self.lock:
+                if (gerrit_address, gerrit_id) not in self.changes:
+                    raise GerritLookupError(f"Gerrit query for {gerrit_id} on {gerrit_address} failed")
+        return change
+
+    def query_gerrit(self, gerrit_id: str, gerrit_address: str,
+                     query_field: str = "revision") -> str:
+        """Query Gerrit for specific information; raises GerritLookupError if the query failed"""
+        change = self.get_change(gerrit_id, gerrit_address)
+        if not change:
+            return ""
+
+        if query_field == "revision":
+            return change.revision
+        elif query_field == "lastupdated":
+            return datetime.fromtimestamp(change.last_updated).strftime("%Y-%m-%d")
+        elif query_field == "project":
+            return change.project
+        return ""
+
     def get_commit_date(self, gerrit_id: str, gerrit_address: str) -> int:
         """Get commit date for a Gerrit change"""
-        date_str = self.query_gerrit(gerrit_id, gerrit_address, "lastupdated")
-        date_matches = re.findall(r'\d{4}-\d{2}-\d{2}', date_str)
-
-        if date_matches:
-            try:
-                return int(date_matches[0].replace('-', ''))
-            except (ValueError, IndexError):
-                print(f"Cannot parse date for {gerrit_id}")
-                return int(datetime.now().strftime("%Y%m%d"))
+        change = self.get_change(gerrit_id, gerrit_address)
+        if change and change.last_updated:
+            return change.last_updated_date
+        print(f"Cannot parse date for {gerrit_id}")
         return int(datetime.now().strftime("%Y%m%d"))
 
+    def close(self) -> None:
+        """Close the persistent SSH connections, REST sessions and the metadata cache"""
+        self.ssh_pool.close()
+        for client in self.rest_clients.values():
+            client.close()
+        self.rest_clients = {}
+        if self.metadata_cache:
+            self.metadata_cache.close()
+            self.metadata_cache = None
+
     @staticmethod
     def deduplicate_gerrit_ids(id_list: List[str]) -> List[str]:
         """Remove duplicate Gerrit IDs"""
@@ -338,21 +833,154 @@ class GerritManager:
 class JiraDownloader:
     """Main class for downloading JIRA issues and Gerrit patches"""
 
-    def __init__(self, download_path: str):
+    def __init__(self, download_path: str, profile_path: Optional[str] = None,
+                 browser_download_dir: Optional[str] = None):
         self.download_path = Path(download_path)
+        # Where Firefox drops files; defaults to the project output folder
+        self.browser_download_dir = Path(browser_download_dir or download_path)
+        self.profile_path = profile_path
         self.browser = None
+        self.waiter = None
+        # Cleared if the browser does not allow changing preferences at runtime
+        self.lean_supported = True
+        # Seconds spent in each browser startup phase
+        self.startup_times: Dict[str, float] = {}
+        # Tag of this browser in traces: its DownloaderPool worker number or "main"
+        self.worker_name = "main"
+        # Ephemeral profile created for this browser, removed by close_session
+        self.temp_profile_dir = None
+        # hrefs of the current page (see get_page_hrefs)
+        self.page_hrefs = None
+        self.webdriver_commands_saved = 0
+        # What printing the loaded page saved compared to a second load by wkhtmltopdf
+        self.pdf_bytes_saved = 0
+        self.pdf_seconds_saved = 0.0
+        self.download_watcher = None
         self.logger = None
+        # Cookies of the last Gerrit login (see refresh_logins)
+        self.gerrit_cookies: List[Dict] = []
         self.gerrit_manager = None
+        self.patch_downloader = None
+        self.jira_api = None
+        # Checkpoint manifest of the project (see process_excel_file)
+        self.manifest = None
+        # Work-list rows left out because the manifest records them as done
+        self.skipped_items = 0
+        # Background PDF renderer, asset and patch caches shared by all workers, if enabled
+        self.pdf_renderer = None
+        self.asset_cache = None
+        self.patch_cache = None
+        # Held while the browser is in use, so that pipeline stages sharing
+        # this worker do not drive it at the same time
+        self.browser_lock = threading.RLock()
+
+    def start_session(self, gerrit_username: str, gerrit_password: str,
+                      gerrit_manager: Optional[GerritManager] = None) -> None:
+        """Launch the browser, log into Gerrit and prepare the patch download session"""
+        with tracing.span("browser.start", worker=self.worker_name):
+            self.browser = self.setup_firefox_driver()
+        self.waiter = PageWaiter(self.browser, self.logger.info)
+        self.download_watcher = DownloadWatcher(str(self.browser_download_dir), self.logger.info)
+        self.download_watcher.start()
+        self.gerrit_manager = gerrit_manager or GerritManager(
+            gerrit_username, http_password=JiraConfig.GERRIT_HTTP_PASSWORD
+        )
+
+        self.login_gerrit(gerrit_username, gerrit_password)
+        self.log_startup_times()
+        self.patch_downloader = PatchDownloader(
+            self.gerrit_cookies, JiraConfig.DOWNLOAD_WORKERS, log_callback=self.logger.info
+        )
+
+        if JiraConfig.JIRA_FETCH_MODE == "api":
+            self.jira_api = self.create_jira_api_client()
+
+    def login_gerrit(self, gerrit_username: str, gerrit_password: str) -> None:
+        """Log the browser into Gerrit and hand its cookies to the query and download sessions"""
+        with tracing.span("gerrit.login", worker=self.worker_name):
+            self.gerrit_cookies = self.gerrit_login(gerrit_username, gerrit_password) or []
+        self.gerrit_manager.set_cookies(self.gerrit_cookies)
+        if self.patch_downloader:
+            self.patch_downloader.update_cookies(self.gerrit_cookies)
+
+    def gerrit_login_expired(self) -> bool:
+        """Whether Gerrit refused the login cookies since the last login, or they are about to run out"""
+        if self.patch_downloader and self.patch_downloader.auth_failures:
+            return True
+        login = next((cookie for cookie in self.gerrit_cookies
+                      if cookie["name"] == JiraConfig.GERRIT_LOGIN_COOKIE), None)
+        if login is None:
+            return True
+        # Session cookies have no expiry and last as long as the browser
+        return bool(login.get("expiry")) and login["expiry"] < time.time() + LOGIN_EXPIRY_MARGIN
+
+    def refresh_logins(self, gerrit_username: str, gerrit_password: str) -> None:
+        """
+        Log in again where a long-lived session's logins no longer work, as a
+        fresh session would: Gerrit through the browser's login form, JIRA by
+        picking up the browser's current session.
+        """
+        if self.gerrit_login_expired():
+            self.logger.info("Gerrit login expired or was refused, logging in again")
+            self.login_gerrit(gerrit_username, gerrit_password)
+        if self.jira_api and not self.jira_api.authenticated():
+            self.logger.info("JIRA session expired, picking up a new one")
+            self.jira_api.close()
+            self.jira_api = self.create_jira_api_client()
+
+    def create_jira_api_client(self) -> JiraApiClient:
+        """REST client authenticated with the API token or the browser's JIRA session"""
+        if JiraConfig.JIRA_EMAIL and JiraConfig.JIRA_API_TOKEN:
+            return JiraApiClient(JiraConfig.JIRA_URL,
+                                 auth=(JiraConfig.JIRA_EMAIL, JiraConfig.JIRA_API_TOKEN))
+
+        # Cookies are per domain, so visit JIRA once to pick up the session
+        with self.lean_navigation():
+            self.browser.get(JiraConfig.JIRA_URL)
+            self.waiter.document_ready(JiraConfig.PAGE_LOAD_TIMEOUT)
+        return JiraApiClient(JiraConfig.JIRA_URL, cookies=self.browser.get_cookies())
+
+    def close_session(self) -> None:
+        """Quit the browser and close pooled HTTP connections"""
+        if self.patch_downloader:
+            self.patch_downloader.close()
+            self.patch_downloader = None
+        if self.download_watcher:
+            self.download_watcher.close()
+            self.download_watcher = None
+        if self.jira_api:
+            self.jira_api.close()
+            self.jira_api = None
+        if self.browser:
+            self.browser.quit()
+            self.browser = None
+        if self.temp_profile_dir:
+            shutil.rmtree(self.temp_profile_dir, ignore_errors=True)
+            self.temp_profile_dir = None
 
     def setup_firefox_driver(self) -> webdriver.Firefox:
         """Configure and initialize Firefox WebDriver."""
-        profile_path = find_default_firefox_profile()
+        profile_path = self.profile_path
         if not profile_path:
-            raise FileNotFoundError("Could not find default Firefox profile.")
+            profile_path = find_default_firefox_profile()
+            if not profile_path:
+                raise FileNotFoundError("Could not find default Firefox profile.")
+            if JiraConfig.PROFILE_MODE == "ephemeral":
+                start = time.monotonic()
+                builder = JiraConfig.profile_builder(profile_path, self.logger.info if self.logger else print)
+                self.temp_profile_dir = tempfile.mkdtemp(prefix="jira-profile-")
+                profile_path = builder.create_instance(str(Path(self.temp_profile_dir) / "profile"))
+                self.startup_times["profile copy"] = time.monotonic() - start
 
         options = FirefoxOptions()
         options.add_argument("-profile")
         options.add_argument(profile_path)
+        if JiraConfig.HEADLESS:
+            options.add_argument("-headless")
+        if JiraConfig.LEAN_EXTRACTION:
+            # Newer Firefox versions only allow the chrome context (used to switch
+            # preferences between page loads) with this flag
+            options.add_argument("-remote-allow-system-access")
 
         # Anti-detection settings
         user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/115.0"
@@ -362,7 +990,7 @@ class JiraDownloader:
 
         # Set download preferences
         options.set_preference("browser.download.folderList", 2)
-        options.set_preference("browser.download.dir", str(self.download_path))
+        options.set_preference("browser.download.dir", str(self.browser_download_dir))
         options.set_preference("browser.download.useDownloadDir", True)
         options.set_preference('browser.download.manager.showWhenStarting', False)
         options.set_preference("browser.helperApps.neverAsk.saveToDisk", "application/zip, application/pdf, application/octet-stream, text/html, application/xhtml+xml")
@@ -371,9 +999,14 @@ class JiraDownloader:
 
 
         try:
-            print("Checking and installing GeckoDriver...")
-            service = FirefoxService(GeckoDriverManager().install())
+            start = time.monotonic()
+            driver_path = JiraConfig.GECKODRIVER_PATH or self.resolve_geckodriver()
+            self.startup_times["driver resolve"] = time.monotonic() - start
+
+            start = time.monotonic()
+            service = FirefoxService(driver_path)
             driver = webdriver.Firefox(service=service, options=options)
+            self.startup_times["browser launch"] = time.monotonic() - start
 
             browser_version = driver.capabilities.get('browserVersion', 'Unknown')
             print(f"Firefox browser version: {browser_version}")
@@ -389,14 +1022,52 @@ class JiraDownloader:
                 self.logger.error(error_msg)
             raise
 
+    def resolve_geckodriver(self) -> str:
+        """geckodriver from the local pin, refreshed with webdriver-manager when it is old"""
+        print("Resolving GeckoDriver...")
+        cache = DriverCache(JiraConfig.DRIVER_CACHE_DIR, JiraConfig.DRIVER_CACHE_DAYS * 86400,
+                            log_callback=self.logger.info if self.logger else print)
+        return cache.resolve()
+
+    def log_startup_times(self) -> None:
+        """Report how long driver resolution, browser launch and the first page load took"""
+        phases = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in self.startup_times.items())
+        total = sum(self.startup_times.values())
+        self.logger.info(f"Browser startup {total:.2f}s: {phases}")
+        print(f"Browser startup {total:.2f}s: {phases}")
+
+    def apply_preferences(self, preferences: Dict) -> Optional[Dict]:
+        """Change Firefox preferences of the running browser; returns the previous values"""
+        try:
+            with self.browser.context(self.browser.CONTEXT_CHROME):
+                return self.browser.execute_script(APPLY_PREFERENCES_JS, preferences)
+        except Exception as e:
+            self.logger.warning(f"Cannot change browser preferences, using full page loads: {e}")
+            self.lean_supported = False
+            return None
+
+    @contextmanager
+    def lean_navigation(self):
+        """Page loads inside this block skip images, fonts, media and service workers"""
+        previous = None
+        if JiraConfig.LEAN_EXTRACTION and self.lean_supported:
+            previous = self.apply_preferences(LEAN_PREFERENCES)
+        try:
+            yield
+        finally:
+            if previous is not None:
+                self.apply_preferences(previous)
+
     def gerrit_login(self, username, password):
         """
         Logs into a Gerrit instance using a username/password form.
         """
         try:
             self.logger.info(f"Attempting to log into Gerrit at: {JiraConfig.GERRIT_LOGIN_URL}")
+            start = time.monotonic()
             self.browser.get(JiraConfig.GERRIT_LOGIN_URL)
-            time.sleep(3)
+            self.waiter.element_present("username", JiraConfig.PAGE_LOAD_TIMEOUT)
+            self.startup_times.setdefault("first navigation", time.monotonic() - start)
 
             username_field = self.browser.find_element(By.NAME, "username")
             username_field.clear()
@@ -416,7 +1087,7 @@ class JiraDownloader:
             login_button.click()
             self.logger.info("Clicked login button.")
 
-            time.sleep(5)
+            self.waiter.cookie_present(JiraConfig.GERRIT_LOGIN_COOKIE, JiraConfig.LOGIN_TIMEOUT)
             self.logger.info("Login attempt finished.")
             return self.browser.get_cookies()
 
@@ -424,76 +1095,85 @@ class JiraDownloader:
             self.logger.error(f"Could not complete automatic Gerrit login: {e}")
             return None
 
-    def setup_logger(self, project_name: str) -> logging.Logger:
+    def setup_logger(self, project_name: str, worker_id: Optional[int] = None) -> logging.Logger:
         """Configure logging"""
-        logger = logging.getLogger(__name__)
+        if worker_id is None:
+            logger = logging.getLogger(__name__)
+            log_name = project_name
+        else:
+            # Worker loggers write their own file and propagate to the main log
+            logger = logging.getLogger(f"{__name__}.worker{worker_id}")
+            log_name = f"{project_name}-worker{worker_id}"
         logger.setLevel(logging.INFO)
+        # A daemon configures the same loggers again for every project it runs
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
 
         log_dir = self.download_path / 'logs'
         FileManager.create_directory(str(log_dir))
 
-        log_file = log_dir / f'{project_name}.log'
+        log_file = log_dir / f'{log_name}.log'
         file_handler = logging.FileHandler(log_file, 'w', encoding='utf-8')
         file_handler.setLevel(logging.INFO)
 
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.WARNING)
-
         formatter = logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
         file_handler.setFormatter(formatter)
-        console_handler.setFormatter(formatter)
-
         logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
-
-        return logger
-
-    def find_gerrit_links(self) -> Tuple[List[str], List[str], List[str]]:
-        """Extract Gerrit links from the current page"""
-        gerrit_list_p = []
-        gerrit_list_q = []
-        gerrit_list_ep2 = []
 
-        try:
-            links = self.browser.find_elements(By.XPATH, "//*[@href]")
-
-            for link in links:
-                gerrit_str = link.get_attribute('href')
-                if not gerrit_str:
-                    continue
+        if worker_id is None:
+            console_handler = logging.StreamHandler()
+            console_handler.setLevel(logging.WARNING)
+            console_handler.setFormatter(formatter)
+            logger.addHandler(console_handler)
 
-                # Find different Gerrit link patterns
-                if '/#/c/' in gerrit_str and 'gerrit' not in gerrit_str:
-                    self.logger.info(f"Found EP2 link: {gerrit_str}")
-                    ids = re.findall(r'\d+', gerrit_str)
-                    gerrit_list_ep2.extend([i for i in ids if 4 < len(i) < 10])
+        return logger
 
-                elif 'gerrit/#/c/' in gerrit_str:
-                    self.logger.info(f"Found P link: {gerrit_str}")
-                    ids = re.findall(r'\d+', gerrit_str)
-                    if ids and 4 < len(ids[0]) < 10:
-                        gerrit_list_p.append(ids[0])
+    def load_page(self, url: str) -> None:
+        """Navigate the browser and forget everything cached for the previous page"""
+        self.browser.get(url)
+        self.page_hrefs = None
+        if self.waiter:
+            self.waiter.track_resources()
 
-                elif 'gerrit/' in gerrit_str:
-                    self.logger.info(f"Found Q link: {gerrit_str}")
-                    ids = re.findall(r'\d+', gerrit_str)
-                    gerrit_list_q.extend([i for i in ids if 5 < len(i) < 10])
+    def get_page_hrefs(self) -> List[str]:
+        """
+        All href values of the current page, fetched with a single WebDriver call
+        and cached until the next load_page.
+        """
+        if self.page_hrefs is None:
+            self.page_hrefs = self.browser.execute_script(PAGE_HREFS_JS) or []
+            # find_elements plus one get_attribute per link would have been used
+            self.webdriver_commands_saved += len(self.page_hrefs)
+            self.logger.info(f"Collected {len(self.page_hrefs)} hrefs with one WebDriver call")
+        else:
+            self.webdriver_commands_saved += len(self.page_hrefs) + 1
+        return self.page_hrefs
 
+    def page_urls(self) -> List[str]:
+        """hrefs of the current page to look for Gerrit links in; none if they cannot be read"""
+        try:
+            return self.get_page_hrefs()
         except Exception as e:
             self.logger.error(f"Error finding Gerrit links: {e}")
+            return []
 
-        return gerrit_list_p, gerrit_list_q, gerrit_list_ep2
+    def extract_gerrit_links(self, urls: List[str]) -> Dict[str, List[str]]:
+        """Map each Gerrit server address to the change IDs linked from the given URLs"""
+        with tracing.span("links.extract", urls=len(urls)):
+            links = list(JiraConfig.link_classifier().iter_links(urls))
+        for link in links:
+            self.logger.info(f"Found {link.server} link: {link.url}")
+        return GerritLinkClassifier.group_by_server(links)
 
     def find_ticket_date(self) -> int:
         """Extract ticket creation date from the page"""
         try:
-            links = self.browser.find_elements(By.XPATH, "//*[@href]")
             date_list = []
 
-            for link in links:
-                date_str = link.get_attribute('href')
+            for date_str in self.get_page_hrefs():
                 if date_str and 'from' in date_str:
                     link_dates = re.findall(r'\d{4}-\d{2}-\d{2}', date_str)
                     if link_dates:
@@ -511,22 +1191,29 @@ class JiraDownloader:
         return int(datetime.now().strftime("%Y%m%d"))
 
     def download_gerrit_patches(self, jira_id: str, gerrit_list: List[str],
-                                source_dir: str, gerrit_address: str) -> None:
-        """Download Gerrit patches as zip files"""
+                                source_dir: str, gerrit_address: str,
+                                folder_name: Optional[str] = None) -> bool:
+        """Download Gerrit patches as zip files. Returns False if any download failed."""
         if not JiraConfig.DOWNLOAD_GERRIT_ZIP:
-            return
+            return True
+        folder_name = folder_name or jira_id
 
         # ticket_date = self.find_ticket_date()
         # self.logger.info(f"Ticket date: {ticket_date}")
         # print(f"Ticket date: {ticket_date}")
 
+        server = JiraConfig.gerrit_server(gerrit_address)
+        all_ok = True
         num = 0
+        jobs = []
+        cached_jobs = []
         for gerrit_id in gerrit_list:
             try:
                 # Get revision ID
-                revision_id = self.gerrit_manager.query_gerrit(
-                    gerrit_id, gerrit_address, "revision"
-                )
+                with tracing.span("gerrit.revision", change=gerrit_id, server=gerrit_address):
+                    revision_id = self.gerrit_manager.query_gerrit(
+                        gerrit_id, gerrit_address, "revision"
+                    )
 
                 if not revision_id:
                     continue
@@ -542,34 +1229,146 @@ class JiraDownloader:
 
                 # # Only download if commit is before or on ticket date
                 # if commit_date <= ticket_date:
-                # Build download URL based on Gerrit server
-                if gerrit_address == '10.24.71.180':
-                    download_url = (f"https://secure.jp.sharp/android_review"
-                                    f"/gerrit/changes/{gerrit_id}/revisions"
-                                    f"/{revision_id}/patch?zip")
-                else:  # 10.24.71.91
-                    download_url = (f"http://10.24.71.91/gerrit/changes/{gerrit_id}"
-                                    f"/revisions/{revision_id}/patch?zip")
-
-                # Open download in new window
-                js = f"window.open('{download_url}')"
-                print(f"Downloading: {download_url}")
-                self.browser.execute_script(js)
+                download_url = server.patch_download_url(gerrit_id, revision_id)
 
                 num += 1
-                time.sleep(2)
-
-                # Rename the downloaded file
-                FileManager.rename_downloaded_file(
-                    source_dir, str(self.download_path), jira_id, num, self.logger.info
-                )
+                if self.manifest:
+                    if self.manifest.patch_done(jira_id, folder_name, gerrit_address,
+                                                gerrit_id, revision_id):
+                        self.logger.info(f"Skipping {gerrit_id}: already downloaded")
+                        continue
+                    num = self.manifest.patch_number(jira_id, folder_name, gerrit_address, gerrit_id)
+                job = (num, download_url, revision_id, gerrit_id)
+                target = Path(source_dir) / f"{jira_id.strip()}-{str(num).zfill(2)}.zip"
+                if self.patch_cache and self.patch_cache.fetch(gerrit_address, gerrit_id,
+                                                               revision_id, str(target)):
+                    cached_jobs.append(job)
+                    continue
+                jobs.append(job)
 
             except Exception as e:
-                self.logger.error(f"Error downloading Gerrit {gerrit_id}: {e}")
+                # Not recorded as done, so that a resumed run asks again
+                self.logger.error(f"Error querying Gerrit {gerrit_id}: {e}")
+                all_ok = False
                 continue
 
-    def download_jira_issue(self, jira_id: str, folder_name: str) -> None:
-        """Download JIRA issue document and associated Gerrit patches"""
+        # Stream the zips directly when an HTTP session is available;
+        # anything it cannot fetch falls back to the browser download.
+        def target_path(num: int) -> Path:
+            return Path(source_dir) / f"{jira_id.strip()}-{str(num).zfill(2)}.zip"
+
+        def record(job, ok: bool) -> None:
+            num, _, revision_id, gerrit_id = job
+            if ok and self.patch_cache and job not in cached_jobs:
+                self.patch_cache.store(gerrit_address, gerrit_id, revision_id, str(target_path(num)))
+            if self.manifest:
+                self.manifest.mark_patch(jira_id, folder_name, gerrit_address, gerrit_id,
+                                         revision_id, DONE if ok else FAILED, str(target_path(num)))
+
+        for job in cached_jobs:
+            record(job, True)
+
+        browser_jobs = jobs
+        if self.patch_downloader and JiraConfig.PATCH_DOWNLOAD_MODE == "http":
+            targets = [(url, str(target_path(num)), revision_id) for num, url, revision_id, _ in jobs]
+            with tracing.span("patches.http", server=gerrit_address, patches=len(targets)):
+                results = self.patch_downloader.download_many(targets, server.limiter)
+            browser_jobs = []
+            for job, ok in zip(jobs, results):
+                if ok:
+                    record(job, True)
+                else:
+                    browser_jobs.append(job)
+        if not browser_jobs:
+            return all_ok
+
+        # Start all remaining browser downloads at once; the watcher matches each
+        # finished file to its request because Gerrit names the zip after the
+        # abbreviated revision (<rev>.diff.zip).
+        with self.browser_lock, tracing.span("patches.browser", server=gerrit_address,
+                                             patches=len(browser_jobs)):
+            started = []
+            for job in browser_jobs:
+                num, download_url, revision_id, _ = job
+                try:
+                    request = self.download_watcher.expect(revision_id[:7])
+
+                    # Open download in new window
+                    js = f"window.open('{download_url}')"
+                    print(f"Downloading: {download_url}")
+                    server.limiter.wait_turn()
+                    self.browser.execute_script(js)
+                    started.append((job, request))
+
+                except Exception as e:
+                    self.logger.error(f"Error downloading {download_url}: {e}")
+                    record(job, False)
+                    all_ok = False
+                    continue
+
+            for job, request in started:
+                num = job[0]
+                with tracing.span("download.wait", revision=job[2][:7]):
+                    downloaded_file = self.download_watcher.wait(request, JiraConfig.DOWNLOAD_TIMEOUT)
+                if downloaded_file:
+                    FileManager.store_download(downloaded_file, source_dir, jira_id, num,
+                                               self.logger.info, job[2])
+                else:
+                    self.logger.error(f"Error: No zip file downloaded for {jira_id}-{num} "
+                                      f"in {self.browser_download_dir}")
+                    all_ok = False
+                record(job, bool(downloaded_file))
+
+            if started:
+                self.close_extra_windows()
+        return all_ok
+
+    def close_extra_windows(self) -> None:
+        """Close the windows opened for downloads and return to the main window"""
+        main_window = self.browser.window_handles[0]
+        for handle in self.browser.window_handles[1:]:
+            self.browser.switch_to.window(handle)
+            self.browser.close()
+        self.browser.switch_to.window(main_window)
+
+    def capture_jira_issue(self, jira_id: str, folder_name: str) -> Dict[str, List[str]]:
+        """Save the JIRA issue document and return its Gerrit IDs per server address"""
+        gerrit_links = self.resumed_links(jira_id, folder_name)
+        if gerrit_links is not None:
+            return gerrit_links
+
+        with tracing.span("issue.capture", issue=jira_id, worker=self.worker_name):
+            try:
+                doc_dir, urls, _ = self.fetch_jira_issue(jira_id, folder_name)
+            except Exception as e:
+                self.logger.error(f"Error downloading JIRA {jira_id}: {e}")
+                if self.manifest:
+                    self.manifest.mark_issue_failed(jira_id, folder_name, str(e))
+                # Let a half-finished navigation end before the next issue uses the browser
+                if self.waiter:
+                    self.waiter.settled(JiraConfig.PAGE_LOAD_TIMEOUT)
+                return {}
+
+            gerrit_links = self.extract_gerrit_links(urls)
+            self.record_capture(jira_id, folder_name, doc_dir, gerrit_links)
+        return gerrit_links
+
+    def resumed_links(self, jira_id: str, folder_name: str) -> Optional[Dict[str, List[str]]]:
+        """Gerrit links of an issue an earlier run already captured, or None"""
+        if not self.manifest:
+            return None
+        gerrit_links = self.manifest.captured_links(jira_id, folder_name)
+        if gerrit_links is not None:
+            self.logger.info(f"Skipping capture of {jira_id}: already captured")
+        return gerrit_links
+
+    def fetch_jira_issue(self, jira_id: str, folder_name: str,
+                         defer_pdf: bool = False) -> Tuple[Path, List[str], Optional[Dict]]:
+        """
+        Save the JIRA issue document and collect the URLs linked from the issue.
+        Returns the document directory, the URLs and, with defer_pdf, the
+        background PDF render job that was left to the caller.
+        """
         # Create directory structure
         base_dir = self.download_path / folder_name
         doc_dir = base_dir / "Investigation"
@@ -579,107 +1378,621 @@ class JiraDownloader:
         for directory in [doc_dir, source_dir, test_dir]:
             FileManager.create_directory(str(directory))
 
+        if self.jira_api:
+            try:
+                with tracing.span("jira.api", issue=jira_id):
+                    urls, render_job = self.capture_jira_issue_api(jira_id, str(doc_dir), defer_pdf)
+                return doc_dir, urls, render_job
+            except Exception as e:
+                self.logger.warning(f"REST API capture failed for {jira_id}, using the browser: {e}")
+
         jira_url = JiraConfig.JIRA_ISSUE_BASE_URL + jira_id
 
-        try:
-            # Navigate to JIRA issue
-            self.browser.get(jira_url)
-            time.sleep(2)
+        # Navigate to JIRA issue
+        with self.lean_navigation(), tracing.span("jira.issue_page", issue=jira_id):
+            self.load_page(jira_url)
+            self.waiter.document_ready(JiraConfig.PAGE_LOAD_TIMEOUT)
 
-            # Navigate to the JIRA HTML view and print to PDF
-            html_url = (f"{JiraConfig.JIRA_DOC_BASE_URL}{jira_id}/"
-                       f"{jira_id}.html")
-            self.logger.info(f"Opening HTML view: {html_url}")
+        # Navigate to the JIRA HTML view and print to PDF
+        html_url = (f"{JiraConfig.JIRA_DOC_BASE_URL}{jira_id}/"
+                   f"{jira_id}.html")
+        self.logger.info(f"Opening HTML view: {html_url}")
 
+        with tracing.span("jira.html_view", issue=jira_id):
             # Open the HTML page
-            self.browser.get(html_url)
-            time.sleep(2)  # Initial wait for page load
+            self.load_page(html_url)
+            self.waiter.document_ready(JiraConfig.PAGE_LOAD_TIMEOUT)
 
             # Scroll to the bottom to trigger lazy-loaded images
             self.browser.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(1)
+            self.waiter.network_idle(JiraConfig.NETWORK_IDLE_TIMEOUT)
 
             # Scroll back to top
             self.browser.execute_script("window.scrollTo(0, 0);")
-            time.sleep(2)  # Additional wait for images to load
-
-            self.logger.info("Page fully loaded, generating PDF...")
-
-            # Print the page to PDF
-            FileManager.print_page_to_pdf(self.browser, str(doc_dir), jira_id, self.logger.info)
-
-            # Go back to the JIRA issue page for Gerrit link extraction
-            self.browser.get(jira_url)
-            time.sleep(2)
+            self.waiter.images_complete(JiraConfig.IMAGES_TIMEOUT)
+
+        self.logger.info("Page fully loaded, generating PDF...")
+
+        # Print the page to PDF
+        render_job = None
+        with tracing.span("pdf.capture", issue=jira_id, mode=JiraConfig.PDF_CAPTURE):
+            if JiraConfig.PDF_CAPTURE in ("browser", "compare"):
+                self.print_loaded_page(jira_id, doc_dir)
+            elif self.pdf_renderer:
+                render_job = self.pdf_render_job(jira_id, doc_dir)
+                if not defer_pdf:
+                    self.queue_pdf_render(render_job)
+                    render_job = None
+            else:
+                FileManager.print_page_to_pdf(self.browser, str(doc_dir), jira_id, self.logger.info,
+                                              self.asset_cache)
+
+        # Go back to the JIRA issue page for Gerrit link extraction
+        with self.lean_navigation(), tracing.span("jira.links_page", issue=jira_id):
+            self.load_page(jira_url)
+            self.waiter.document_ready(JiraConfig.PAGE_LOAD_TIMEOUT)
+            # The issue page renders its links with JavaScript after the load event
+            self.waiter.network_idle(JiraConfig.NETWORK_IDLE_TIMEOUT)
+            urls = self.page_urls()
+
+        return doc_dir, urls, render_job
+
+    def print_loaded_page(self, jira_id: str, doc_dir: Path) -> None:
+        """Save the already loaded HTML view as PDF without fetching it a second time"""
+        pdf_path = doc_dir / f"{jira_id}.pdf"
+        page_bytes = self.browser.execute_script(PAGE_BYTES_JS) or 0
+
+        start = time.monotonic()
+        if not FileManager.print_browser_page(self.browser, str(pdf_path), self.logger.info):
+            FileManager.print_page_to_pdf(self.browser, str(doc_dir), jira_id, self.logger.info,
+                                          self.asset_cache)
+            return
+        print_seconds = time.monotonic() - start
+        self.pdf_bytes_saved += page_bytes
+        self.logger.info(f"Printed {jira_id} from the loaded page in {print_seconds:.2f}s, "
+                         f"{page_bytes} bytes not fetched again")
+
+        if JiraConfig.PDF_CAPTURE == "compare":
+            # Render the same view the old way to measure what the single load saves
+            with tempfile.TemporaryDirectory() as temp_dir:
+                start = time.monotonic()
+                rendered = FileManager.render_url_to_pdf(
+                    self.browser.current_url, self.browser.get_cookies(),
+                    str(Path(temp_dir) / pdf_path.name), self.logger.info,
+                )
+                render_seconds = time.monotonic() - start
+            if rendered:
+                self.pdf_seconds_saved += render_seconds - print_seconds
+                self.logger.info(f"wkhtmltopdf needed {render_seconds:.2f}s for {jira_id}: "
+                                 f"{render_seconds - print_seconds:.2f}s and {page_bytes} bytes saved")
+
+    def pdf_render_job(self, jira_id: str, doc_dir: Path) -> Dict:
+        """Render job for the loaded HTML view, whose HTML is kept as a fallback"""
+        temp_html_path = doc_dir / f"{jira_id}_temp.html"
+        with open(temp_html_path, 'w', encoding='utf-8') as f:
+            f.write(self.browser.page_source)
+        return {
+            "url": self.browser.current_url,
+            "cookies": self.browser.get_cookies(),
+            "target_path": str(doc_dir / f"{jira_id}.pdf"),
+            "fallback_html": str(temp_html_path),
+            "fallback_target": str(doc_dir / f"{jira_id}.html"),
+        }
+
+    def queue_pdf_render(self, render_job: Dict) -> None:
+        """Hand a render job to the background renderer"""
+        self.pdf_renderer.submit(**render_job)
+        self.logger.info(f"Queued PDF render of {Path(render_job['target_path']).stem} "
+                         f"(queue depth {self.pdf_renderer.queue_depth()})")
+
+    def record_capture(self, jira_id: str, folder_name: str, doc_dir: Path,
+                       gerrit_links: Dict[str, List[str]]) -> None:
+        """Checkpoint a captured issue together with the document that was saved for it"""
+        if not self.manifest:
+            return
+        documents = [doc_dir / f"{jira_id}{suffix}" for suffix in (".pdf", ".html")]
+        # A PDF still being rendered is expected to exist on the next run
+        document = next((str(path) for path in documents if path.exists()), str(documents[0]))
+        self.manifest.mark_issue_captured(jira_id, folder_name, gerrit_links, document)
 
+    def capture_jira_issue_api(self, jira_id: str, doc_dir: str,
+                               defer_pdf: bool = False) -> Tuple[List[str], Optional[Dict]]:
+        """
+        Capture an issue through the REST API without loading it in the browser.
+        Returns the URLs found in the issue and, with defer_pdf, its PDF render job.
+        """
+        urls = self.jira_api.get_issue_urls(jira_id)
+        self.logger.info(f"Found {len(urls)} links in the REST data of {jira_id}")
+
+        html_path = Path(doc_dir) / f"{jira_id}.html"
+        self.jira_api.save_html_view(jira_id, str(html_path))
+        self.logger.info(f"Saved HTML view to {html_path.name}")
+
+        # wkhtmltopdf renders the view with the API session's cookies; keep the HTML otherwise
+        pdf_path = Path(doc_dir) / f"{jira_id}.pdf"
+        if self.pdf_renderer:
+            render_job = {
+                "url": self.jira_api.html_view_url(jira_id),
+                "cookies": self.jira_api.cookies(),
+                "target_path": str(pdf_path),
+                "auth": self.jira_api.session.auth,
+                "fallback_html": str(html_path),
+            }
+            if defer_pdf:
+                return urls, render_job
+            self.queue_pdf_render(render_job)
+        elif FileManager.render_url_to_pdf(self.jira_api.html_view_url(jira_id), self.jira_api.cookies(),
+                                           str(pdf_path), self.logger.info, self.jira_api.session.auth,
+                                           self.asset_cache):
+            html_path.unlink()
+
+        return urls, None
+
+    def download_issue_patches(self, jira_id: str, folder_name: str,
+                               gerrit_links: Dict[str, List[str]]) -> None:
+        """Download the Gerrit patches found by capture_jira_issue"""
+        source_dir = self.download_path / folder_name / "Source"
+        all_ok = True
+        with tracing.span("issue.patches", issue=jira_id, worker=self.worker_name):
+            for gerrit_address, gerrit_list in gerrit_links.items():
+                all_ok &= self.download_gerrit_patches(jira_id, gerrit_list, str(source_dir),
+                                                       gerrit_address, folder_name)
+        if all_ok and self.manifest and self.manifest.issue_state(jira_id, folder_name) != FAILED:
+            self.manifest.mark_issue_done(jira_id, folder_name)
 
-            # Find and download Gerrit patches
-            gerrit_list_p, gerrit_list_q, gerrit_list_ep2 = self.find_gerrit_links()
+    def download_jira_issue(self, jira_id: str, folder_name: str) -> None:
+        """Download JIRA issue document and associated Gerrit patches"""
+        gerrit_links = self.capture_jira_issue(jira_id, folder_name)
+        self.download_issue_patches(jira_id, folder_name, gerrit_links)
+
+    def resolve_sheet_changes(self, captured: List[Dict[str, List[str]]]) -> None:
+        """Query every Gerrit change found across the sheet, batched per server"""
+        ids_per_server: Dict[str, List[str]] = {}
+        for gerrit_links in captured:
+            for gerrit_address, gerrit_list in gerrit_links.items():
+                ids_per_server.setdefault(gerrit_address, []).extend(gerrit_list)
+
+        for gerrit_address, gerrit_ids in ids_per_server.items():
+            unique_ids = list(dict.fromkeys(gerrit_ids))
+            with tracing.span("gerrit.resolve", server=gerrit_address, changes=len(unique_ids)):
+                resolved = self.gerrit_manager.resolve_changes(gerrit_address, unique_ids)
+            self.logger.info(f"Resolved {len(resolved)} of {len(unique_ids)} merged changes "
+                             f"on {gerrit_address}")
+
+        self.log_gerrit_cache_stats()
+
+    def log_gerrit_cache_stats(self) -> None:
+        """Report how many Gerrit lookups the metadata cache answered"""
+        if self.gerrit_manager.metadata_cache:
+            hits, misses, negative = self.gerrit_manager.metadata_cache.counters()
+            self.logger.info(f"Gerrit metadata cache: {hits} hits ({negative} not merged), "
+                             f"{misses} misses")
+
+    def run_pipeline(self, pool: 'DownloaderPool', items: Iterable[Tuple[str, str]]) -> None:
+        """
+        Move every issue through fetch, link extraction, Gerrit resolve, patch
+        download and PDF render stages. Each browser fetches one issue at a time
+        while the issues fetched before it are resolved, downloaded and rendered.
+        """
+        idle_workers = queue.Queue()
+        for worker in pool.workers:
+            idle_workers.put(worker)
 
-            if gerrit_list_p:
-                unique_list = GerritManager.deduplicate_gerrit_ids(gerrit_list_p)
-                self.download_gerrit_patches(
-                    jira_id, unique_list, str(source_dir), '10.24.71.180'
-                )
+        def fetch(job: IssueJob) -> Optional[IssueJob]:
+            worker = idle_workers.get()
+            try:
+                return worker.fetch_issue_job(job)
+            finally:
+                idle_workers.put(worker)
+
+        queue_size = JiraConfig.PIPELINE_QUEUE_SIZE
+        chunk_size = GerritManager.QUERY_CHUNK_SIZE
+        pdf_workers = JiraConfig.PDF_WORKERS if self.pdf_renderer else 1
+        pipeline = Pipeline([
+            Stage("fetch", fetch, len(pool.workers), queue_size),
+            Stage("links", self.extract_job_links, 1, queue_size),
+            # Queued issues are resolved together, so their changes share queries
+            Stage("gerrit", self.resolve_jobs_changes, JiraConfig.PIPELINE_GERRIT_WORKERS,
+                  max(queue_size, chunk_size), batch_size=chunk_size),
+            Stage("patches", self.download_job_patches, JiraConfig.PIPELINE_PATCH_WORKERS, queue_size),
+            Stage("pdf", self.render_job_pdf, pdf_workers, queue_size),
+        ], self.logger.error)
+
+        finished = pipeline.run(IssueJob(jira_id, folder_name) for jira_id, folder_name in items)
+        for line in pipeline.stats():
+            self.logger.info(f"Pipeline {line}")
+        self.logger.info(f"Pipeline finished {len(finished)} issues in {pipeline.elapsed:.1f}s")
+        self.log_gerrit_cache_stats()
+
+    def fetch_issue_job(self, job: IssueJob) -> Optional[IssueJob]:
+        """Pipeline fetch stage: capture the issue with this worker's browser"""
+        job.worker = self
+        print(f"\nProcessing: {job}")
+        self.logger.info(f"Processing: {job}")
+        job.gerrit_links = self.resumed_links(job.jira_id, job.folder_name)
+        if job.gerrit_links is not None:
+            return job
 
-            if gerrit_list_q:
-                unique_list = GerritManager.deduplicate_gerrit_ids(gerrit_list_q)
-                self.download_gerrit_patches(
-                    jira_id, unique_list, str(source_dir), '10.24.71.91'
+        try:
+            with self.browser_lock:
+                job.doc_dir, job.urls, job.render = self.fetch_jira_issue(
+                    job.jira_id, job.folder_name, defer_pdf=True
                 )
+        except Exception as e:
+            self.logger.error(f"Error downloading JIRA {job.jira_id}: {e}")
+            if self.manifest:
+                self.manifest.mark_issue_failed(job.jira_id, job.folder_name, str(e))
+            return None
+        return job
 
-            if gerrit_list_ep2:
-                unique_list = GerritManager.deduplicate_gerrit_ids(gerrit_list_ep2)
-                self.download_gerrit_patches(
-                    jira_id, unique_list, str(source_dir), '10.230.1.88'
-                )
+    def extract_job_links(self, job: IssueJob) -> IssueJob:
+        """Pipeline link extraction stage"""
+        if job.gerrit_links is None:
+            job.gerrit_links = job.worker.extract_gerrit_links(job.urls)
+            job.worker.record_capture(job.jira_id, job.folder_name, job.doc_dir, job.gerrit_links)
+        return job
 
-        except Exception as e:
-            self.logger.error(f"Error downloading JIRA {jira_id}: {e}")
-            time.sleep(3)
+    def resolve_jobs_changes(self, jobs: List[IssueJob]) -> List[IssueJob]:
+        """
+        Pipeline Gerrit stage: the changes of all queued issues are looked up
+        together, in one batched resolve per server
+        """
+        ids_per_server: Dict[str, List[str]] = {}
+        for job in jobs:
+            for gerrit_address, gerrit_list in job.gerrit_links.items():
+                ids_per_server.setdefault(gerrit_address, []).extend(gerrit_list)
+
+        for gerrit_address, gerrit_ids in ids_per_server.items():
+            unique_ids = list(dict.fromkeys(gerrit_ids))
+            with tracing.span("gerrit.resolve", server=gerrit_address, issues=len(jobs),
+                              changes=len(unique_ids)):
+                resolved = self.gerrit_manager.resolve_changes(gerrit_address, unique_ids)
+            self.logger.info(f"Resolved {len(resolved)} of {len(unique_ids)} merged changes "
+                             f"of {len(jobs)} issues on {gerrit_address}")
+        return jobs
+
+    def download_job_patches(self, job: IssueJob) -> IssueJob:
+        """Pipeline patch stage, using the sessions of the worker that fetched the issue"""
+        job.worker.download_issue_patches(job.jira_id, job.folder_name, job.gerrit_links)
+        return job
+
+    def render_job_pdf(self, job: IssueJob) -> IssueJob:
+        """Pipeline PDF stage: render the view the fetch stage saved"""
+        if job.render:
+            self.pdf_renderer.run_job(**job.render)
+        return job
+
+    def log_webdriver_savings(self, downloaders: List['JiraDownloader']) -> None:
+        """Report how many WebDriver commands the single-call href harvesting avoided"""
+        saved = sum(downloader.webdriver_commands_saved for downloader in downloaders)
+        self.logger.info(f"Link harvesting saved {saved} WebDriver commands")
+        print(f"Link harvesting saved {saved} WebDriver commands")
+
+    def log_pdf_capture_savings(self, downloaders: List['JiraDownloader']) -> None:
+        """Report what printing the loaded pages saved compared to wkhtmltopdf"""
+        if JiraConfig.PDF_CAPTURE not in ("browser", "compare"):
+            return
+        saved_mb = sum(downloader.pdf_bytes_saved for downloader in downloaders) / (1024 * 1024)
+        message = f"Single-load PDF capture: {saved_mb:.1f} MB not fetched again"
+        if JiraConfig.PDF_CAPTURE == "compare":
+            seconds = sum(downloader.pdf_seconds_saved for downloader in downloaders)
+            message += f", {seconds:.1f}s saved compared to wkhtmltopdf"
+        self.logger.info(message)
+        print(message)
+
+    def log_patch_cache_stats(self) -> None:
+        """Report how many patch zips came from the shared cache"""
+        cache = self.patch_cache
+        if not cache:
+            return
+        saved_mb = cache.bytes_saved / (1024 * 1024)
+        message = f"Patch cache: {cache.hits} hits, {cache.misses} misses, {saved_mb:.1f} MB not downloaded"
+        self.logger.info(message)
+        print(message)
+
+    def pending_work_items(self, reader: WorkListReader) -> Iterator[Tuple[str, str]]:
+        """Stream the work list, leaving out issues the manifest records as done"""
+        for item in reader:
+            if self.manifest.issue_done(*item):
+                self.skipped_items += 1
+                continue
+            yield item
 
-    def process_excel_file(self, excel_path: str, gerrit_username: str, gerrit_password: str) -> None:
+    def process_excel_file(self, excel_path: str, gerrit_username: str, gerrit_password: str,
+                           workers: Optional[int] = None) -> None:
         """Process Excel file and download all JIRA issues"""
-        try:
-            # Setup
-            self.browser = self.setup_firefox_driver()
-            self.gerrit_manager = GerritManager(gerrit_username)
+        workers = workers or JiraConfig.WORKERS
 
-            # Perform Gerrit login
-            self.gerrit_login(gerrit_username, gerrit_password)
+        reader, items = self.open_work_list(excel_path)
+        if items is None:
+            return
 
-            # Load Excel file
-            workbook = openpyxl.load_workbook(excel_path)
-            sheet = workbook.active
+        self.start_shared_services(gerrit_username)
+        self.start_pdf_renderer()
 
-            # Process each row (skip header)
-            for row_idx, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
-                if not row[0]:  # Skip empty rows
-                    continue
+        if workers > 1 or JiraConfig.PIPELINE:
+            self.logger.info(f"Running {workers} browser workers"
+                             + (" in the staged pipeline" if JiraConfig.PIPELINE else ""))
+            pool = DownloaderPool(str(self.download_path), self.logger, workers)
+            try:
+                pool.start(gerrit_username, gerrit_password, self.gerrit_manager, self.manifest,
+                           self.pdf_renderer, self.asset_cache, self.patch_cache)
+                self.run_work_list(reader, items, pool)
+            finally:
+                pool.close()
+                self.close_shared_services()
+            return
 
-                jira_id = str(row[0]).strip()
-                folder_name = str(row[1]).strip() if len(row) > 1 else jira_id
+        try:
+            self.start_session(gerrit_username, gerrit_password, self.gerrit_manager)
+            self.run_work_list(reader, items)
+        finally:
+            self.close_session()
+            self.close_shared_services()
 
-                # Handle list format in cell
-                if '[' in jira_id and ']' in jira_id:
-                    try:
-                        import ast
-                        parsed = ast.literal_eval(jira_id)
-                        if isinstance(parsed, list) and len(parsed) > 0:
-                            jira_id = str(parsed[0]).strip()
-                    except:
-                        pass
+    def open_work_list(self, excel_path: str) -> Tuple[WorkListReader, Optional[Iterator[Tuple[str, str]]]]:
+        """
+        Open the project's manifest and start reading the work list. Returns the
+        reader and its pending items, or None as items if every issue is done.
+        """
+        self.manifest = RunManifest(str(self.download_path / "manifest.sqlite"))
+        if not JiraConfig.RESUME:
+            self.manifest.reset()
+
+        # Rows are read lazily, so processing starts with the first pending row
+        reader = WorkListReader(excel_path, self.logger.warning)
+        self.skipped_items = 0
+        items = self.pending_work_items(reader)
+        first_item = next(items, None)
+        if first_item is None:
+            self.logger.info(f"{reader.summary()}; all {self.skipped_items} issues already done "
+                             f"in {self.manifest.db_path}")
+            print(f"Resuming: all {self.skipped_items} issues already done")
+            self.close_manifest()
+            return reader, None
+        if JiraConfig.TRACE:
+            tracing.start()
+        return reader, itertools.chain([first_item], items)
+
+    def start_shared_services(self, gerrit_username: str) -> None:
+        """Create the Gerrit manager and the caches every worker of a run shares"""
+        metadata_cache = None
+        if JiraConfig.GERRIT_CACHE:
+            metadata_cache = GerritMetadataCache(str(self.download_path.parent / ".gerrit_cache.sqlite"),
+                                                 JiraConfig.GERRIT_CACHE_NEGATIVE_TTL)
+        self.gerrit_manager = GerritManager(
+            gerrit_username, http_password=JiraConfig.GERRIT_HTTP_PASSWORD,
+            metadata_cache=metadata_cache,
+        )
 
+        if JiraConfig.ASSET_CACHE:
+            self.asset_cache = AssetCache(str(self.download_path.parent / ".asset_cache"),
+                                          JiraConfig.ASSET_CACHE_TTL, self.logger.info,
+                                          max_bytes=JiraConfig.ASSET_CACHE_SIZE_MB * 1024 * 1024)
+
+        if JiraConfig.PATCH_CACHE:
+            cache_dir = JiraConfig.PATCH_CACHE_DIR or str(self.download_path.parent / ".patch_cache")
+            self.patch_cache = PatchCache(cache_dir, JiraConfig.PATCH_CACHE_SIZE_MB * 1024 * 1024,
+                                          self.logger.info)
+
+    def start_pdf_renderer(self) -> None:
+        """Start the background PDF renderer of a run, if it is enabled"""
+        # Without wkhtmltopdf the browser's own print function is used, which needs the page
+        if (JiraConfig.PDF_WORKERS and JiraConfig.PDF_CAPTURE == "wkhtmltopdf"
+                and shutil.which("wkhtmltopdf")):
+            render = functools.partial(FileManager.render_url_to_pdf, asset_cache=self.asset_cache)
+            self.pdf_renderer = PdfRenderPool(render, JiraConfig.PDF_WORKERS,
+                                              log_callback=self.logger.info)
+
+    def run_work_list(self, reader: WorkListReader, items: Iterable[Tuple[str, str]],
+                      pool: Optional['DownloaderPool'] = None) -> None:
+        """Download every issue of an opened work list with this browser or the pool's"""
+        if pool and JiraConfig.PIPELINE:
+            self.run_pipeline(pool, items)
+            self.log_work_list(reader)
+        elif pool:
+            fed_items = []
+
+            def feed() -> Iterator[Tuple[str, str]]:
+                for item in items:
+                    fed_items.append(item)
+                    yield item
+
+            # Issue pages are captured first so that all Gerrit IDs of the sheet
+            # can be resolved with a few bulk queries before any patch is fetched.
+            captured = pool.run(feed(), lambda worker, item: worker.capture_jira_issue(*item))
+            captured = [links or {} for links in captured]
+            self.log_work_list(reader)
+            self.resolve_sheet_changes(captured)
+            pool.run(list(zip(fed_items, captured)),
+                     lambda worker, job: worker.download_issue_patches(*job[0], job[1]))
+        else:
+            captured = []
+            processed = []
+            for jira_id, folder_name in items:
                 print(f"\nProcessing: {jira_id} -> {folder_name}")
                 self.logger.info(f"Processing: {jira_id} -> {folder_name}")
 
-                self.download_jira_issue(jira_id, folder_name)
+                processed.append((jira_id, folder_name))
+                captured.append(self.capture_jira_issue(jira_id, folder_name))
+            self.log_work_list(reader)
+
+            self.resolve_sheet_changes(captured)
+
+            for (jira_id, folder_name), gerrit_links in zip(processed, captured):
+                self.download_issue_patches(jira_id, folder_name, gerrit_links)
+
+        downloaders = pool.workers if pool else [self]
+        self.log_webdriver_savings(downloaders)
+        self.log_patch_cache_stats()
+        self.log_pdf_capture_savings(downloaders)
+
+    def log_work_list(self, reader: WorkListReader) -> None:
+        """Report what the work list contained once it has been read completely"""
+        message = f"{reader.summary()}; {self.skipped_items} issues already done"
+        self.logger.info(message)
+        print(message)
+
+    def close_pdf_renderer(self) -> None:
+        """Wait for the background PDF renders and log rendering statistics"""
+        if self.pdf_renderer:
+            depth = self.pdf_renderer.queue_depth()
+            if depth:
+                print(f"Waiting for {depth} PDF renders to finish...")
+            self.pdf_renderer.close()
+            self.logger.info(f"PDF rendering: {self.pdf_renderer.stats()}")
+            self.pdf_renderer = None
+
+    def close_manifest(self) -> None:
+        """Log the checkpoint summary and close the manifest"""
+        if self.manifest:
+            self.logger.info(f"Manifest summary: {self.manifest.summary()}")
+            self.manifest.close()
+            self.manifest = None
+
+    def close_shared_services(self) -> None:
+        """Finish the run: wait for the renderer, log cache statistics and close everything shared"""
+        if self.gerrit_manager:
+            self.gerrit_manager.close()
+        self.close_pdf_renderer()
+        if self.asset_cache:
+            self.logger.info(f"Asset cache: {self.asset_cache.stats()}")
+            self.asset_cache.session.close()
+            self.asset_cache = None
+        self.patch_cache = None
+        for address, server in JiraConfig.GERRIT_SERVERS.items():
+            if server.limiter.requests:
+                self.logger.info(f"Gerrit {address}: {server.limiter.stats()}")
+        self.close_manifest()
+        self.export_trace()
+
+    def export_trace(self) -> None:
+        """Write the spans recorded during the run next to the project's downloads"""
+        if not tracing.enabled():
+            return
+        name = datetime.now().strftime("trace-%Y%m%d-%H%M%S")
+        jsonl_path, trace_path = tracing.export(tracing.stop(), self.download_path / "traces", name)
+        self.logger.info(f"Trace written to {jsonl_path} and {trace_path} "
+                         f"(open the .trace.json in ui.perfetto.dev or chrome://tracing)")
 
-            workbook.close()
 
+class DownloaderPool:
+    """
+    Runs several JiraDownloader workers in parallel. Each worker drives its own
+    Firefox instance from a private profile made from the default one, downloads into
+    its own directory and writes its own log file. Work items are taken from a
+    shared queue, so a slow issue only holds up the worker processing it.
+    """
+
+    def __init__(self, download_path: str, logger: logging.Logger, workers: int):
+        self.download_path = Path(download_path)
+        self.logger = logger
+        self.size = workers
+        self.workers: List[JiraDownloader] = []
+        self.temp_dir = None
+
+    def start(self, gerrit_username: str, gerrit_password: str,
+              gerrit_manager: Optional[GerritManager] = None,
+              manifest: Optional[RunManifest] = None,
+              pdf_renderer: Optional[PdfRenderPool] = None,
+              asset_cache: Optional[AssetCache] = None,
+              patch_cache: Optional[PatchCache] = None) -> None:
+        """Copy the profile and launch one logged-in browser per worker"""
+        profile_path = find_default_firefox_profile()
+        if not profile_path:
+            raise FileNotFoundError("Could not find default Firefox profile.")
+
+        self.temp_dir = tempfile.mkdtemp(prefix="jira-workers-")
+        project_name = self.download_path.name
+
+        builder = None
+        if JiraConfig.PROFILE_MODE == "ephemeral":
+            builder = JiraConfig.profile_builder(profile_path, self.logger.info)
+
+        for worker_id in range(1, self.size + 1):
+            worker_target = str(Path(self.temp_dir) / f"profile-{worker_id}")
+            if builder:
+                worker_profile = builder.create_instance(worker_target)
+            else:
+                worker_profile = copy_firefox_profile(profile_path, worker_target)
+            download_dir = self.download_path / ".downloads" / f"worker-{worker_id}"
+            FileManager.create_directory(str(download_dir))
+
+            worker = JiraDownloader(str(self.download_path), worker_profile, str(download_dir))
+            worker.worker_name = f"worker{worker_id}"
+            worker.logger = worker.setup_logger(project_name, worker_id)
+            worker.manifest = manifest
+            worker.pdf_renderer = pdf_renderer
+            worker.asset_cache = asset_cache
+            worker.patch_cache = patch_cache
+            self.workers.append(worker)
+            worker.start_session(gerrit_username, gerrit_password, gerrit_manager)
+            self.logger.info(f"Worker {worker_id} ready (profile: {worker_profile})")
+
+    def run(self, items: Iterable, task: Callable[[JiraDownloader, object], object]) -> List:
+        """
+        Run task(worker, item) for every item and return the results in input order.
+        Items are consumed lazily through a bounded queue, so workers start on the
+        first item while the rest is still being read.
+        """
+        work_queue = queue.Queue(maxsize=self.size * 2)
+        results = {}
+
+        def worker_loop(worker: JiraDownloader) -> None:
+            while True:
+                entry = work_queue.get()
+                if entry is None:
+                    return
+                index, item = entry
+                worker.logger.info(f"Processing: {item}")
+                try:
+                    results[index] = task(worker, item)
+                except Exception as e:
+                    worker.logger.error(f"Error processing {item}: {e}")
+
+        threads = [threading.Thread(target=worker_loop, args=(worker,), daemon=True,
+                                    name=worker.worker_name)
+                   for worker in self.workers]
+        for thread in threads:
+            thread.start()
+        count = 0
+        try:
+            for count, item in enumerate(items, start=1):
+                work_queue.put((count - 1, item))
         finally:
-            if self.browser:
-                self.browser.quit()
+            for _ in threads:
+                work_queue.put(None)
+            for thread in threads:
+                thread.join()
+        return [results.get(index) for index in range(count)]
+
+    def close(self) -> None:
+        """Quit all browsers and remove the temporary profile copies"""
+        for worker in self.workers:
+            try:
+                worker.close_session()
+            except Exception as e:
+                self.logger.warning(f"Error closing worker browser: {e}")
+        self.workers = []
+        if self.temp_dir:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+            self.temp_dir = None
+
+
+def load_config(project_root: Path) -> configparser.SectionProxy:
+    """Read config.ini, apply it to JiraConfig and return its [settings] section"""
+    config = configparser.ConfigParser()
+    config.read(project_root / 'config.ini')
+    settings = config['settings']
+    JiraConfig.load_settings(settings)
+    if config.has_section('gerrit_backends'):
+        JiraConfig.load_gerrit_backends(config['gerrit_backends'])
+    if config.has_section('gerrit_links'):
+        JiraConfig.load_gerrit_links(config['gerrit_links'])
+    for section in config.sections():
+        if section.startswith('gerrit:'):
+            JiraConfig.load_gerrit_server(section.split(':', 1)[1].strip(), config[section])
+    return settings
 
 
 def main():
@@ -689,9 +2002,7 @@ def main():
     project_root = script_dir.parent
 
     # Load configuration
-    config = configparser.ConfigParser()
-    config.read(project_root / 'config.ini')
-    settings = config['settings']
+    settings = load_config(project_root)
 
     project_name = settings.get('project_name', '').strip()
     excel_file_name = settings.get('excel_file', '').strip()
@@ -706,8 +2017,12 @@ def main():
     print(f"Project: {project_name}")
     print(f"Excel File: {excel_file_name}")
     print(f"Gerrit User: {gerrit_username}")
+    print(f"Workers: {JiraConfig.WORKERS}")
     print("\nℹ️  This script will use your default Firefox profile to reuse sessions.")
-    print("Please close all Firefox windows before running.\n")
+    if JiraConfig.PROFILE_MODE == "ephemeral":
+        print("Only its cookies, logins and certificates are copied; Firefox can stay open.\n")
+    else:
+        print("Please close all Firefox windows before running.\n")
     input("Press Enter to continue...")
 
     if not project_name:
@@ -733,6 +2048,18 @@ def main():
         print(f'Error: Excel file not found at {excel_file_path}')
         return
 
+    # A running daemon already has logged-in browsers; it uses its own credentials
+    client = DaemonClient(JiraConfig.DAEMON_PORT, token_path(project_root / "output"))
+    if client.available():
+        job = client.run(project_name, str(excel_file_path))
+        if job["state"] != "done":
+            print(f"\nError during download process: {job['error']}")
+            return
+        print("\n" + "=" * 60)
+        print("Download process completed successfully!")
+        print("=" * 60)
+        return
+
     if not gerrit_password:
         # It's recommended to use a more secure method like environment variables or a config file for passwords
         gerrit_password = input('Enter Gerrit password: ').strip()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Condition-based waits for the browser.
+Each wait returns as soon as the page is actually ready instead of sleeping
+for a fixed time, and logs how long it took.
+"""
+
+import time
+from typing import Callable
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Resource timing entries kept per page; browsers stop recording at 250 by default
+RESOURCE_BUFFER_SIZE = 10000
+# Number of resources the page has requested so far. The first call raises the
+# resource timing buffer limit and starts a PerformanceObserver, which keeps
+# counting even if the buffer filled up before the page was first checked.
+RESOURCE_COUNT_JS = """
+if (!window.__resourceTracker) {
+    const tracker = {count: performance.getEntriesByType('resource').length};
+    performance.setResourceTimingBufferSize(arguments[0]);
+    new PerformanceObserver(list => { tracker.count += list.getEntries().length; })
+        .observe({type: 'resource'});
+    window.__resourceTracker = tracker;
+}
+return window.__resourceTracker.count;
+"""
+IMAGES_COMPLETE_JS = "return Array.from(document.images).every(img => img.complete);"
+
+
+class PageWaiter:
+    """Waits for readiness conditions on a WebDriver page"""
+
+    def __init__(self, browser, log_callback: Callable[[str], None] = print,
+                 poll_interval: float = 0.1):
+        self.browser = browser
+        self.log_callback = log_callback
+        self.poll_interval = poll_interval
+
+    def wait_for(self, name: str, condition: Callable, timeout: float) -> bool:
+        """Wait until condition(browser) is truthy. Returns False on timeout."""
+        start = time.monotonic()
+        try:
+            WebDriverWait(self.browser, timeout, poll_frequency=self.poll_interval).until(condition)
+            self.log_callback(f"Wait for {name}: {time.monotonic() - start:.2f}s")
+            return True
+        except TimeoutException:
+            self.log_callback(f"Wait for {name}: timed out after {timeout:.1f}s")
+            return False
+
+    def document_ready(self, timeout: float) -> bool:
+        """Wait until document.readyState is 'complete'"""
+        return self.wait_for(
+            "document ready",
+            lambda driver: driver.execute_script("return document.readyState;") == "complete",
+            timeout,
+        )
+
+    def track_resources(self) -> None:
+        """Start counting the resources of a freshly loaded page before its timing buffer fills up"""
+        try:
+            self.browser.execute_script(RESOURCE_COUNT_JS, RESOURCE_BUFFER_SIZE)
+        except WebDriverException as e:
+            # network_idle retries on its first check
+            self.log_callback(f"Could not track page resources: {e.__class__.__name__}")
+
+    def settled(self, timeout: float) -> bool:
+        """
+        Wait for whatever the browser was doing when an operation failed to finish.
+        A browser that no longer answers has nothing left to wait for.
+        """
+        try:
+            return self.document_ready(timeout)
+        except WebDriverException as e:
+            self.log_callback(f"Wait for browser to settle: {e.__class__.__name__}")
+            return False
+
+    def network_idle(self, timeout: float, idle_time: float = 0.5) -> bool:
+        """Wait until the page has not requested any new resource for idle_time seconds"""
+        state = {"count": -1, "since": time.monotonic()}
+
+        def is_idle(driver) -> bool:
+            count = driver.execute_script(RESOURCE_COUNT_JS, RESOURCE_BUFFER_SIZE)
+            now = time.monotonic()
+            if count != state["count"]:
+                state["count"], state["since"] = count, now
+                return False
+            return now - state["since"] >= idle_time
+
+        return self.wait_for("network idle", is_idle, timeout)
+
+    def images_complete(self, timeout: float) -> bool:
+        """Wait until every <img> on the page has finished loading"""
+        return self.wait_for(
+            "images complete",
+            lambda driver: driver.execute_script(IMAGES_COMPLETE_JS),
+            timeout,
+        )
+
+    def element_present(self, name: str, timeout: float) -> bool:
+        """Wait until an element with the given name attribute exists"""
+        return self.wait_for(
+            f"element '{name}'",
+            EC.presence_of_element_located((By.NAME, name)),
+            timeout,
+        )
+
+    def cookie_present(self, cookie_name: str, timeout: float) -> bool:
+        """Wait until the browser holds a cookie with the given name"""
+        return self.wait_for(
+            f"cookie '{cookie_name}'",
+            lambda driver: driver.get_cookie(cookie_name) is not None,
+            timeout,
+        )
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Shared cache of Gerrit patch zips.
+A patch zip is fully determined by its server, change number and revision
+hash, so one copy per (server, change, revision) is kept in a store shared by
+all projects and linked into each project's Source/ folder. The store is
+trimmed to a size limit by evicting the least recently used zips (see lru_store).
+"""
+
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+from lru_store import LruStore
+from patch_downloader import holds_revision
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# ioctl that makes a copy-on-write clone of a file (btrfs, XFS)
+FICLONE = 0x40049409
+
+
+def reflink(source: Path, target: Path) -> None:
+    """Clone source to target without copying data. Raises OSError if unsupported."""
+    if fcntl is None:
+        raise OSError("reflinks are not supported on this platform")
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            target.unlink()
+            raise
+
+
+def link_or_copy(source: Path, target: Path) -> str:
+    """Place source at target as a hardlink, a reflink or, failing both, a copy"""
+    try:
+        os.link(source, target)
+        return "hardlink"
+    except OSError:
+        pass
+    try:
+        reflink(source, target)
+        return "reflink"
+    except OSError:
+        pass
+    shutil.copyfile(source, target)
+    return "copy"
+
+
+class PatchCache(LruStore):
+    """Size-limited LRU store of patch zips keyed by (server, change, revision)"""
+
+    ENTRY_NAME = "patches"
+
+    def __init__(self, directory: str, max_bytes: int, log_callback: Callable[[str], None] = print):
+        super().__init__(max_bytes, log_callback)
+        self.directory = Path(directory)
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def path_for(self, server: str, change: str, revision: str) -> Path:
+        safe_server = re.sub(r"[^\w.-]", "_", server)
+        return self.directory / safe_server / revision[:2] / f"{revision}-{change}.zip"
+
+    def fetch(self, server: str, change: str, revision: str, target_path: str) -> bool:
+        """Link the cached zip to target_path. Returns False if the patch is not cached."""
+        cached = self.path_for(server, change, revision)
+        target = Path(target_path)
+        try:
+            size = cached.stat().st_size
+            if target.exists() and not holds_revision(target, revision):
+                self.log_callback(f"Target file {target.name} holds another patch. Replacing it.")
+                target.unlink()
+            if not target.exists():
+                method = link_or_copy(cached, target)
+                self.log_callback(f"Patch cache hit for {change} ({method} to {target.name})")
+            # Mark as recently used for eviction
+            os.utime(cached)
+        except OSError:
+            with self.lock:
+                self.misses += 1
+            return False
+
+        with self.lock:
+            self.hits += 1
+            self.bytes_saved += size
+        return True
+
+    def store(self, server: str, change: str, revision: str, source_path: str) -> None:
+        """Add a downloaded zip to the cache and evict old entries if over the limit"""
+        cached = self.path_for(server, change, revision)
+        if cached.exists():
+            return
+        try:
+            cached.parent.mkdir(parents=True, exist_ok=True)
+            temp = cached.with_name(f"{cached.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            link_or_copy(Path(source_path), temp)
+            size = temp.stat().st_size
+            os.replace(temp, cached)
+        except OSError as e:
+            self.log_callback(f"Could not add {change} to the patch cache: {e}")
+            return
+        self.added(size)
+
+    def entries(self) -> List[Tuple[float, int, List[Path]]]:
+        """(last use, size, [path]) of every cached zip"""
+        entries = []
+        for path in self.directory.glob("*/*/*.zip"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # evicted by another worker
+            entries.append((stat.st_mtime, stat.st_size, [path]))
+        return entries
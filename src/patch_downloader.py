@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Direct HTTP download of Gerrit patch zips.
+Reuses the browser's login cookies in a pooled keep-alive session instead of
+opening every patch URL in a browser window.
+"""
+
+import os
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from browser_cookies import load_cookies
+from gerrit_servers import HostLimiter, is_transient, retry_after
+
+# Every zip file starts with this signature; Gerrit serves an HTML login page otherwise
+ZIP_MAGIC = b"PK"
+# Answers that mean the login cookies are no longer accepted
+AUTH_FAILURE_STATUS = {401, 403}
+
+
+def holds_revision(path: Path, revision: str) -> bool:
+    """
+    True if the zip at path is the patch of this revision. Gerrit zips the
+    git format-patch output, which starts with "From <revision> ...".
+    """
+    try:
+        with zipfile.ZipFile(path) as archive:
+            names = archive.namelist()
+            if len(names) != 1:
+                return False
+            with archive.open(names[0]) as diff:
+                return diff.readline().split()[1:2] == [revision.encode()]
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
+class PatchDownloader:
+    """Streams Gerrit patch zips to disk over a shared HTTP session"""
+
+    def __init__(self, cookies: Optional[List[Dict]] = None, max_workers: int = 4,
+                 timeout: int = 60, log_callback: Callable[[str], None] = print):
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.log_callback = log_callback
+        # Downloads refused since the cookies were last updated, because the login ran out
+        self.auth_failures = 0
+        self.lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if cookies:
+            self.update_cookies(cookies)
+
+    def update_cookies(self, cookies: List[Dict]) -> None:
+        """Add Selenium-style cookie dicts (name, value, domain, path) to the session"""
+        with self.lock:
+            self.auth_failures = 0
+        load_cookies(self.session.cookies, cookies)
+
+    def download(self, url: str, target_path: str, limiter: Optional[HostLimiter] = None,
+                 revision: Optional[str] = None) -> bool:
+        """
+        Stream one patch zip to target_path. Returns True on success. With the
+        server's limiter the download waits for a free connection slot, and is
+        repeated after a backoff if the server answers 429/5xx. An existing
+        target is only kept if it holds the given revision.
+        """
+        target = Path(target_path)
+        if target.exists():
+            if revision is None or holds_revision(target, revision):
+                self.log_callback(f"Target file {target.name} already exists. Skipping download.")
+                return True
+            self.log_callback(f"Target file {target.name} holds another patch. Replacing it.")
+
+        attempts = limiter.retries + 1 if limiter else 1
+        for attempt in range(attempts):
+            try:
+                with limiter.request() if limiter else nullcontext():
+                    self.fetch(url, target)
+            except Exception as e:
+                if limiter and is_transient(e):
+                    delay = limiter.failed(retry_after(e))
+                    if attempt + 1 < attempts:
+                        self.log_callback(f"Error downloading {url}: {e}; retrying in {delay:.0f}s")
+                        continue
+                self.log_callback(f"Error downloading {url}: {e}")
+                return False
+
+            if limiter:
+                limiter.succeeded()
+            self.log_callback(f"Downloaded {url} to {target.name}")
+            return True
+        return False
+
+    def fetch(self, url: str, target: Path) -> None:
+        """Stream one response to target; raises if it failed or is not a zip file"""
+        part_path = target.with_name(target.name + ".part")
+        try:
+            with self.session.get(url, stream=True, timeout=self.timeout) as response:
+                if response.status_code in AUTH_FAILURE_STATUS:
+                    self.count_auth_failure()
+                response.raise_for_status()
+                chunks = response.iter_content(chunk_size=64 * 1024)
+                first_chunk = next(chunks, b"")
+                if not first_chunk.startswith(ZIP_MAGIC):
+                    self.count_auth_failure()
+                    raise ValueError("response is not a zip file (not logged in?)")
+
+                with open(part_path, "wb") as f:
+                    f.write(first_chunk)
+                    for chunk in chunks:
+                        f.write(chunk)
+
+            os.replace(part_path, target)
+        finally:
+            if part_path.exists():
+                part_path.unlink()
+
+    def count_auth_failure(self) -> None:
+        with self.lock:
+            self.auth_failures += 1
+
+    def download_many(self, jobs: List[Tuple[str, ...]],
+                      limiter: Optional[HostLimiter] = None) -> List[bool]:
+        """
+        Download (url, target_path) or (url, target_path, revision) jobs
+        concurrently. Results follow job order.
+        """
+        if not jobs:
+            return []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(lambda job: self.download(job[0], job[1], limiter, *job[2:]), jobs))
+
+    def close(self) -> None:
+        """Close the pooled connections"""
+        self.session.close()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Background PDF rendering.
+Rendering an issue with wkhtmltopdf takes several seconds, during which the
+browser used to sit idle. Jobs are queued here instead and rendered by a
+bounded number of wkhtmltopdf processes while the browser moves on to the
+next issue.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import tracing
+
+
+class PdfRenderPool:
+    """Renders (url, cookies, target) jobs with at most `workers` renderer processes"""
+
+    def __init__(self, render: Callable[..., bool], workers: int = 2, max_pending: int = 0,
+                 log_callback: Callable[[str], None] = print):
+        # render(url, cookies, target, log_callback, auth) -> bool, e.g. FileManager.render_url_to_pdf
+        self.render = render
+        self.log_callback = log_callback
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers),
+                                           thread_name_prefix="pdf-render")
+        # Submitting blocks once this many jobs are waiting, so a fast browser
+        # cannot pile up an unbounded backlog
+        self.slots = threading.BoundedSemaphore(max_pending or max(1, workers) * 4)
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.max_queue_depth = 0
+        self.render_times: List[float] = []
+        self.failures = 0
+
+    def submit(self, url: str, cookies: List[Dict], target_path: str,
+               auth: Optional[Tuple[str, str]] = None, fallback_html: Optional[str] = None,
+               fallback_target: Optional[str] = None) -> Future:
+        """
+        Queue a render. fallback_html is a saved copy of the page: it is deleted
+        once the PDF exists, or moved to fallback_target if rendering fails.
+        """
+        self.slots.acquire()
+        with self.lock:
+            self.pending += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.pending)
+        return self.executor.submit(self.run_queued_job, url, list(cookies), target_path, auth,
+                                    fallback_html, fallback_target)
+
+    def run_queued_job(self, *args) -> bool:
+        try:
+            return self.run_job(*args)
+        finally:
+            with self.lock:
+                self.pending -= 1
+            self.slots.release()
+
+    def run_job(self, url: str, cookies: List[Dict], target_path: str,
+                auth: Optional[Tuple[str, str]] = None, fallback_html: Optional[str] = None,
+                fallback_target: Optional[str] = None) -> bool:
+        """Render one job in the calling thread, with the same statistics and fallback handling"""
+        start = time.monotonic()
+        ok = False
+        try:
+            with tracing.span("pdf.render", issue=Path(target_path).stem):
+                ok = self.render(url, cookies, target_path, self.log_callback, auth)
+        except Exception as e:
+            self.log_callback(f"Error rendering {url}: {e}")
+        finally:
+            elapsed = time.monotonic() - start
+            with self.lock:
+                self.render_times.append(elapsed)
+                self.failures += 0 if ok else 1
+
+        self.log_callback(f"Rendered {Path(target_path).name} in {elapsed:.2f}s" if ok
+                          else f"Rendering {Path(target_path).name} failed after {elapsed:.2f}s")
+        if fallback_html and Path(fallback_html).exists():
+            if ok:
+                Path(fallback_html).unlink()
+            elif fallback_target and fallback_target != fallback_html:
+                os.replace(fallback_html, fallback_target)
+                self.log_callback(f"Saved HTML to {Path(fallback_target).name}")
+        return ok
+
+    def queue_depth(self) -> int:
+        """Jobs queued or rendering right now"""
+        with self.lock:
+            return self.pending
+
+    def stats(self) -> str:
+        with self.lock:
+            times = list(self.render_times)
+            failures = self.failures
+            max_depth = self.max_queue_depth
+        if not times:
+            return "no PDFs rendered"
+        return (f"{len(times)} rendered ({failures} failed), "
+                f"mean {sum(times) / len(times):.2f}s, max {max(times):.2f}s, "
+                f"total {sum(times):.1f}s, max queue depth {max_depth}")
+
+    def close(self) -> None:
+        """Wait for all queued renders to finish"""
+        self.executor.shutdown(wait=True)
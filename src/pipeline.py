@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Staged download pipeline.
+Each stage applies a blocking function (Selenium, ssh, HTTP, wkhtmltopdf) to
+its items in its own thread pool and hands the results to the next stage over
+a bounded asyncio queue. Different issues are in different stages at the same
+time, and a slow stage only fills its own input queue instead of occupying
+the threads of the stages before it.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Marks the end of the stream on a queue
+END = object()
+
+
+@dataclass
+class IssueJob:
+    """One work-list row on its way through the stages"""
+    jira_id: str
+    folder_name: str
+    # Browser worker that fetched the issue; its sessions are reused for the patches
+    worker: Any = None
+    doc_dir: Optional[Path] = None
+    urls: List[str] = field(default_factory=list)
+    gerrit_links: Optional[Dict[str, List[str]]] = None
+    # Keyword arguments of PdfRenderPool.run_job, if the PDF is left to the render stage
+    render: Optional[Dict] = None
+
+    def __str__(self) -> str:
+        return f"{self.jira_id} -> {self.folder_name}"
+
+
+class Stage:
+    """A blocking function applied to every item by at most `concurrency` threads"""
+
+    def __init__(self, name: str, func: Callable[[Any], Any], concurrency: int = 1,
+                 queue_size: int = 0, batch_size: int = 1):
+        # func(item) returns the item for the next stage, or None to drop it.
+        # With a batch_size above 1, func gets a list of whatever items are queued
+        # (at most batch_size) and returns a list of results instead.
+        self.name = name
+        self.func = func
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        # Capacity of the input queue; once it is full the previous stage waits
+        self.queue_size = queue_size or self.concurrency * 2
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+
+    def stats(self) -> str:
+        return (f"{self.name}: {self.processed} done, {self.failed} failed, "
+                f"{self.busy_seconds:.1f}s busy on {self.concurrency} threads, "
+                f"max queue depth {self.max_queue_depth}")
+
+
+class Pipeline:
+    """Streams the items of a source through a chain of stages"""
+
+    def __init__(self, stages: List[Stage], log_callback: Callable[[str], None] = print):
+        self.stages = stages
+        self.log_callback = log_callback
+        self.ingested = 0
+        self.elapsed = 0.0
+
+    def run(self, source: Iterable) -> List:
+        """Process every item of source; returns the items that left the last stage"""
+        return asyncio.run(self.run_async(source))
+
+    async def run_async(self, source: Iterable) -> List:
+        start = time.monotonic()
+        queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        executors = [ThreadPoolExecutor(max_workers=stage.concurrency,
+                                        thread_name_prefix=f"stage-{stage.name}")
+                     for stage in self.stages]
+        completed: List = []
+        try:
+            await asyncio.gather(
+                self.ingest(source, queues[0]),
+                *(self.run_stage(index, queues, executors[index], completed)
+                  for index in range(len(self.stages))),
+            )
+        finally:
+            for executor in executors:
+                executor.shutdown(wait=True)
+            self.elapsed = time.monotonic() - start
+        return completed
+
+    async def ingest(self, source: Iterable, outbox: asyncio.Queue) -> None:
+        """Read the source in a thread of its own, since reading a work list blocks"""
+        loop = asyncio.get_running_loop()
+        iterator = iter(source)
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="stage-ingest") as executor:
+            try:
+                while True:
+                    item = await loop.run_in_executor(executor, next, iterator, END)
+                    if item is END:
+                        break
+                    self.ingested += 1
+                    await self.put(outbox, item, self.stages[0])
+            finally:
+                await outbox.put(END)
+
+    async def run_stage(self, index: int, queues: List[asyncio.Queue],
+                        executor: ThreadPoolExecutor, completed: List) -> None:
+        stage = self.stages[index]
+        inbox = queues[index]
+        is_last = index + 1 == len(self.stages)
+        loop = asyncio.get_running_loop()
+
+        async def take() -> List:
+            """The next item, plus whatever else is already queued in batching stages"""
+            items = [await inbox.get()]
+            while items[-1] is not END and len(items) < stage.batch_size and not inbox.empty():
+                items.append(inbox.get_nowait())
+            return items
+
+        async def consume() -> None:
+            while True:
+                items = await take()
+                finished = items[-1] is END
+                if finished:
+                    # Leave the marker for the other consumers of this stage
+                    await inbox.put(END)
+                    items.pop()
+                if items:
+                    for result in await process(items):
+                        if result is None:
+                            continue
+                        if is_last:
+                            completed.append(result)
+                        else:
+                            await self.put(queues[index + 1], result, self.stages[index + 1])
+                if finished:
+                    return
+
+        async def process(items: List) -> List:
+            start = time.monotonic()
+            try:
+                if stage.batch_size > 1:
+                    results = await loop.run_in_executor(executor, stage.func, items)
+                else:
+                    results = [await loop.run_in_executor(executor, stage.func, items[0])]
+                stage.processed += len(items)
+            except Exception as e:
+                stage.failed += len(items)
+                self.log_callback(f"{stage.name} failed for {', '.join(map(str, items))}: {e}")
+                results = []
+            stage.busy_seconds += time.monotonic() - start
+            return results
+
+        try:
+            await asyncio.gather(*(consume() for _ in range(stage.concurrency)))
+        finally:
+            if not is_last:
+                await queues[index + 1].put(END)
+
+    @staticmethod
+    async def put(outbox: asyncio.Queue, item, stage: Stage) -> None:
+        await outbox.put(item)
+        stage.max_queue_depth = max(stage.max_queue_depth, outbox.qsize())
+
+    def stats(self) -> List[str]:
+        """One line for the source and one per stage"""
+        lines = [f"ingest: {self.ingested} items in {self.elapsed:.1f}s"]
+        return lines + [stage.stats() for stage in self.stages]
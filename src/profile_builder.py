@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Small, disposable Firefox profiles for automation.
+Only the login state (cookies, saved logins and certificates) is taken from
+the user's default profile into a template, together with preferences that
+switch off updates, telemetry, safe browsing and prefetching. Every browser
+launch gets its own copy of the template, so launches are fast, several
+browsers can run side by side and the user's Firefox can stay open.
+"""
+
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+# Files that carry the login state of a profile (with their SQLite journals)
+PROFILE_FILES = (
+    "cookies.sqlite", "cookies.sqlite-wal",
+    "logins.json", "key4.db", "key3.db",
+    "cert9.db", "cert8.db", "cert_override.txt", "pkcs11.txt",
+)
+
+AUTOMATION_PREFERENCES = {
+    # Updates
+    "app.update.auto": False,
+    "app.update.enabled": False,
+    "app.update.checkInstallTime": False,
+    "extensions.update.enabled": False,
+    "app.normandy.enabled": False,
+    # Telemetry
+    "toolkit.telemetry.enabled": False,
+    "toolkit.telemetry.unified": False,
+    "toolkit.telemetry.archive.enabled": False,
+    "datareporting.healthreport.uploadEnabled": False,
+    "datareporting.policy.dataSubmissionEnabled": False,
+    "browser.ping-centre.telemetry": False,
+    # Safe browsing
+    "browser.safebrowsing.malware.enabled": False,
+    "browser.safebrowsing.phishing.enabled": False,
+    "browser.safebrowsing.downloads.enabled": False,
+    "browser.safebrowsing.blockedURIs.enabled": False,
+    # Prefetching and speculative connections
+    "network.prefetch-next": False,
+    "network.dns.disablePrefetch": True,
+    "network.predictor.enabled": False,
+    "network.http.speculative-parallel-limit": 0,
+    # First-run and start pages
+    "browser.shell.checkDefaultBrowser": False,
+    "browser.startup.page": 0,
+    "browser.startup.homepage": "about:blank",
+    "startup.homepage_welcome_url": "about:blank",
+    "browser.aboutwelcome.enabled": False,
+    "datareporting.policy.firstRunURL": "",
+    "browser.newtabpage.enabled": False,
+    "browser.discovery.enabled": False,
+}
+
+
+def format_user_js(preferences: Dict) -> str:
+    """Render preferences as user.js lines"""
+    lines = []
+    for name, value in preferences.items():
+        if isinstance(value, bool):
+            literal = "true" if value else "false"
+        elif isinstance(value, int):
+            literal = str(value)
+        else:
+            literal = '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+        lines.append(f'user_pref("{name}", {literal});')
+    return "\n".join(lines) + "\n"
+
+
+def default_template_dir(tmpfs: bool = False) -> Path:
+    """Where the template lives; /dev/shm keeps it (and its copies) in memory on Linux"""
+    if tmpfs and sys.platform.startswith("linux") and Path("/dev/shm").is_dir():
+        return Path("/dev/shm") / "jira-downloader" / "profile-template"
+    return Path.home() / ".cache" / "jira-downloader" / "profile-template"
+
+
+class ProfileBuilder:
+    """Builds a login-only template from a Firefox profile and hands out copies of it"""
+
+    def __init__(self, source_profile: str, template_dir: str, max_age: float = 3600.0,
+                 log_callback: Callable[[str], None] = print):
+        self.source = Path(source_profile)
+        self.template = Path(template_dir)
+        # The template is refreshed when older than this, to pick up new logins
+        self.max_age = max_age
+        self.log_callback = log_callback
+
+    def source_files(self) -> List[Path]:
+        return [self.source / name for name in PROFILE_FILES if (self.source / name).is_file()]
+
+    def is_stale(self) -> bool:
+        """True if the template is missing, too old, or older than the source's login files"""
+        marker = self.template / "user.js"
+        if not marker.exists():
+            return True
+        built_at = marker.stat().st_mtime
+        if time.time() - built_at > self.max_age:
+            return True
+        return any(path.stat().st_mtime > built_at for path in self.source_files())
+
+    def build_template(self, force: bool = False) -> Path:
+        """(Re)build the template profile if needed and return its path"""
+        if not force and not self.is_stale():
+            return self.template
+
+        start = time.monotonic()
+        self.template.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix="template-", dir=self.template.parent))
+        for path in self.source_files():
+            shutil.copy2(path, staging / path.name)
+        (staging / "user.js").write_text(format_user_js(AUTOMATION_PREFERENCES), encoding="utf-8")
+
+        # Swap in the new template; copies already handed out are unaffected
+        old = self.template.with_name(self.template.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        if self.template.exists():
+            self.template.rename(old)
+        staging.rename(self.template)
+        shutil.rmtree(old, ignore_errors=True)
+
+        size = sum(path.stat().st_size for path in self.template.iterdir())
+        self.log_callback(f"Built automation profile template ({size // 1024} KB) "
+                          f"in {time.monotonic() - start:.2f}s from {self.source}")
+        return self.template
+
+    def create_instance(self, target_dir: str) -> str:
+        """Fresh copy of the template for one browser launch"""
+        template = self.build_template()
+        target = Path(target_dir)
+        if target.exists():
+            shutil.rmtree(target)
+        shutil.copytree(template, target)
+        return str(target)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Checkpoint manifest for resumable runs.
+Records the state of every issue and patch of a project in a SQLite database
+under output/<project>/, so that a restarted run skips finished work and
+picks up where the previous one stopped. Every update is its own transaction.
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PENDING = "pending"
+CAPTURED = "captured"  # issue document saved and Gerrit links recorded
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    jira_id TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    state TEXT NOT NULL,
+    document_path TEXT,
+    gerrit_links TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (jira_id, folder)
+);
+CREATE TABLE IF NOT EXISTS patches (
+    jira_id TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    server TEXT NOT NULL,
+    change TEXT NOT NULL,
+    revision TEXT,
+    state TEXT NOT NULL,
+    path TEXT,
+    updated_at REAL NOT NULL,
+    number INTEGER,
+    PRIMARY KEY (jira_id, folder, server, change)
+);
+"""
+
+
+class RunManifest:
+    """Per-project record of captured issues and downloaded patches"""
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Browser workers share one connection; the lock serialises them
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            self.add_patch_numbers()
+
+    def add_patch_numbers(self) -> None:
+        """Add the number column to manifests written before it existed"""
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(patches)")]
+        if "number" in columns:
+            return
+        self.conn.execute("ALTER TABLE patches ADD COLUMN number INTEGER")
+        # Recorded zips keep the number in their <JIRA>-NN.zip name
+        for rowid, path in self.conn.execute("SELECT rowid, path FROM patches").fetchall():
+            match = re.search(r"-(\d+)\.zip$", path or "")
+            if match:
+                self.conn.execute("UPDATE patches SET number = ? WHERE rowid = ?",
+                                  (int(match.group(1)), rowid))
+
+    def execute(self, sql: str, params=()) -> None:
+        with self.lock, self.conn:
+            self.conn.execute(sql, params)
+
+    def fetchone(self, sql: str, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchone()
+
+    def issue_state(self, jira_id: str, folder: str) -> str:
+        row = self.fetchone("SELECT state FROM issues WHERE jira_id = ? AND folder = ?",
+                            (jira_id, folder))
+        return row[0] if row else PENDING
+
+    def issue_done(self, jira_id: str, folder: str) -> bool:
+        """
+        True if the issue is done and its document is on disk. An issue is marked
+        done once its patches are downloaded, while its PDF may still be queued
+        for rendering; a run stopped before the render finished leaves it to be
+        captured again.
+        """
+        row = self.fetchone("SELECT state, document_path FROM issues WHERE jira_id = ? AND folder = ?",
+                            (jira_id, folder))
+        return bool(row and row[0] == DONE and (not row[1] or Path(row[1]).exists()))
+
+    def captured_links(self, jira_id: str, folder: str) -> Optional[Dict[str, List[str]]]:
+        """
+        Gerrit links recorded when the issue was captured, or None if the issue
+        has to be captured (again), e.g. because its document was deleted.
+        """
+        row = self.fetchone(
+            "SELECT state, document_path, gerrit_links FROM issues WHERE jira_id = ? AND folder = ?",
+            (jira_id, folder),
+        )
+        if not row or row[0] not in (CAPTURED, DONE):
+            return None
+        if row[1] and not Path(row[1]).exists():
+            return None
+        return json.loads(row[2] or "{}")
+
+    def mark_issue_captured(self, jira_id: str, folder: str, gerrit_links: Dict[str, List[str]],
+                            document_path: Optional[str] = None) -> None:
+        self.execute(
+            "INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?, NULL, ?)",
+            (jira_id, folder, CAPTURED, document_path, json.dumps(gerrit_links), time.time()),
+        )
+
+    def mark_issue_done(self, jira_id: str, folder: str) -> None:
+        self.execute("UPDATE issues SET state = ?, updated_at = ? WHERE jira_id = ? AND folder = ?",
+                     (DONE, time.time(), jira_id, folder))
+
+    def mark_issue_failed(self, jira_id: str, folder: str, error: str) -> None:
+        self.execute(
+            "INSERT INTO issues (jira_id, folder, state, error, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (jira_id, folder) DO UPDATE SET state = excluded.state, "
+            "error = excluded.error, updated_at = excluded.updated_at",
+            (jira_id, folder, FAILED, error, time.time()),
+        )
+
+    def patch_done(self, jira_id: str, folder: str, server: str, change: str, revision: str) -> bool:
+        """True if this revision of the change was already downloaded and is still on disk"""
+        row = self.fetchone(
+            "SELECT state, revision, path FROM patches "
+            "WHERE jira_id = ? AND folder = ? AND server = ? AND change = ?",
+            (jira_id, folder, server, change),
+        )
+        return bool(row and row[0] == DONE and row[1] == revision and row[2] and Path(row[2]).exists())
+
+    def patch_number(self, jira_id: str, folder: str, server: str, change: str) -> int:
+        """
+        File number of the change's zip within the issue. A change keeps the number
+        it was given first, so that changes whose lookup failed in an earlier run,
+        or that were merged since, do not shift the names of the others.
+        """
+        key = (jira_id, folder, server, change)
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT number FROM patches WHERE jira_id = ? AND folder = ? AND server = ? "
+                "AND change = ?", key,
+            ).fetchone()
+            if row and row[0] is not None:
+                return row[0]
+            (number,) = self.conn.execute(
+                "SELECT COALESCE(MAX(number), 0) + 1 FROM patches WHERE jira_id = ? AND folder = ?",
+                (jira_id, folder),
+            ).fetchone()
+            self.conn.execute(
+                "INSERT INTO patches (jira_id, folder, server, change, state, updated_at, number) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (jira_id, folder, server, change) "
+                "DO UPDATE SET number = excluded.number",
+                key + (PENDING, time.time(), number),
+            )
+        return number
+
+    def mark_patch(self, jira_id: str, folder: str, server: str, change: str,
+                   revision: str, state: str, path: Optional[str] = None) -> None:
+        self.execute(
+            "INSERT INTO patches (jira_id, folder, server, change, revision, state, path, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (jira_id, folder, server, change) "
+            "DO UPDATE SET revision = excluded.revision, state = excluded.state, "
+            "path = excluded.path, updated_at = excluded.updated_at",
+            (jira_id, folder, server, change, revision, state, path, time.time()),
+        )
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        """Number of issues and patches per state"""
+        result = {}
+        with self.lock:
+            for table in ("issues", "patches"):
+                rows = self.conn.execute(f"SELECT state, COUNT(*) FROM {table} GROUP BY state")
+                result[table] = dict(rows.fetchall())
+        return result
+
+    def reset(self) -> None:
+        """Forget all recorded progress"""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM issues")
+            self.conn.execute("DELETE FROM patches")
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Persistent SSH connections to Gerrit servers.
+Uses OpenSSH connection multiplexing (ControlMaster) so that every host is
+connected and authenticated once per run; each `gerrit query` then opens a
+cheap session over the existing connection.
+"""
+
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# OpenSSH exits with 255 when the connection itself fails
+SSH_CONNECTION_ERROR = 255
+
+
+class SshConnectionPool:
+    """Keeps one multiplexed master connection per host for the whole run"""
+
+    def __init__(self, username: str, port: int = 29418, ssh_command: str = "ssh",
+                 timeout: int = 30, retries: int = 1, multiplex: bool = True,
+                 ports: Optional[Dict[str, int]] = None):
+        self.username = username
+        self.port = port
+        # Hosts whose SSH daemon does not listen on the default port
+        self.ports = ports or {}
+        self.ssh_command = ssh_command
+        self.timeout = timeout
+        self.retries = retries
+        # The Windows OpenSSH client does not support ControlMaster
+        self.multiplex = multiplex and sys.platform != "win32"
+        self.control_dir = tempfile.mkdtemp(prefix="gerrit-ssh-") if self.multiplex else None
+        self.hosts = set()
+        self.lock = threading.Lock()
+
+    def control_path(self, host: str) -> str:
+        """Socket path of the master connection for a host"""
+        # Unix socket paths are limited to ~100 characters, so keep the name short
+        return str(Path(self.control_dir) / f"{host}-{self.host_port(host)}")
+
+    def host_port(self, host: str) -> int:
+        return self.ports.get(host, self.port)
+
+    def base_args(self, host: str) -> List[str]:
+        """ssh arguments shared by every command sent to a host"""
+        args = [self.ssh_command, "-p", str(self.host_port(host))]
+        if self.multiplex:
+            args += [
+                "-o", "ControlMaster=auto",
+                "-o", f"ControlPath={self.control_path(host)}",
+                "-o", "ControlPersist=yes",
+                "-o", "ServerAliveInterval=30",
+            ]
+        return args
+
+    def run(self, host: str, remote_args: List[str]) -> subprocess.CompletedProcess:
+        """
+        Run a remote command over the host's shared connection.
+        The first call connects; if the connection has dropped it is re-established.
+        """
+        with self.lock:
+            self.hosts.add(host)
+
+        cmd = self.base_args(host) + [f"{self.username}@{host}"] + remote_args
+        for attempt in range(self.retries + 1):
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=self.timeout)
+            if result.returncode != SSH_CONNECTION_ERROR or attempt == self.retries:
+                return result
+            print(f"SSH connection to {host} failed, reconnecting: {result.stderr.strip()}")
+            self.reset(host)
+        return result
+
+    def control(self, host: str, operation: str) -> int:
+        """Send a control command (check, exit) to the host's master connection"""
+        if not self.multiplex:
+            return SSH_CONNECTION_ERROR
+        result = subprocess.run(
+            self.base_args(host) + ["-O", operation, f"{self.username}@{host}"],
+            capture_output=True, text=True, timeout=self.timeout,
+        )
+        return result.returncode
+
+    def is_alive(self, host: str) -> bool:
+        """Whether a master connection to the host is currently open"""
+        return self.control(host, "check") == 0
+
+    def reset(self, host: str) -> None:
+        """Drop a broken master connection so the next command reconnects"""
+        if not self.multiplex:
+            return
+        try:
+            self.control(host, "exit")
+        except Exception:
+            pass
+        # A stale socket left by a dead master would block the new one
+        Path(self.control_path(host)).unlink(missing_ok=True)
+
+    def close(self) -> None:
+        """Close all master connections"""
+        for host in list(self.hosts):
+            self.reset(host)
+        self.hosts.clear()
+        if self.control_dir:
+            shutil.rmtree(self.control_dir, ignore_errors=True)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Span tracing for download runs.
+The stages of a run (JIRA page loads, PDF rendering, Gerrit queries, patch
+downloads and download polling) are recorded as spans tagged with the issue,
+Gerrit server and worker, and exported as JSON lines and in the Chrome Trace
+Event format, which ui.perfetto.dev and chrome://tracing open directly.
+While tracing is off, span() returns one shared no-op object, so the
+instrumented code only pays for a function call and an attribute check.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+class NullSpan:
+    """Stands in for a span while tracing is off"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+    def tag(self, **tags) -> None:
+        pass
+
+
+NO_SPAN = NullSpan()
+
+
+class Span:
+    """A timed section of work; nested spans of the same thread inherit its tags"""
+
+    __slots__ = ("tracer", "name", "tags", "start_ns")
+
+    def __init__(self, tracer: "Tracer", name: str, tags: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.tags = tags
+        self.start_ns = 0
+
+    def __enter__(self):
+        stack = self.tracer.stack()
+        if stack:
+            self.tags = {**stack[-1].tags, **self.tags}
+        stack.append(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        end_ns = time.perf_counter_ns()
+        self.tracer.stack().pop()
+        if exc_type:
+            self.tags["error"] = exc_type.__name__
+        self.tracer.record(self, end_ns)
+        return False
+
+    def tag(self, **tags) -> None:
+        """Add tags known only once the work is done, e.g. sizes or results"""
+        self.tags.update(tags)
+
+
+class Tracer:
+    """Collects finished spans from all threads of a run"""
+
+    def __init__(self):
+        self.enabled = False
+        self.spans: List[Dict] = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.origin_ns = 0
+        self.origin_time = 0.0
+
+    def start(self) -> None:
+        with self.lock:
+            self.spans = []
+            self.origin_ns = time.perf_counter_ns()
+            self.origin_time = time.time()
+            self.enabled = True
+
+    def stop(self) -> List[Dict]:
+        """Stop recording and return the spans recorded since start()"""
+        with self.lock:
+            self.enabled = False
+            spans, self.spans = self.spans, []
+        return spans
+
+    def stack(self) -> List[Span]:
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def span(self, name: str, tags: Dict):
+        return Span(self, name, tags) if self.enabled else NO_SPAN
+
+    def record(self, span: Span, end_ns: int) -> None:
+        thread = threading.current_thread()
+        with self.lock:
+            if not self.enabled:
+                return
+            start_us = (span.start_ns - self.origin_ns) / 1000
+            self.spans.append({
+                "name": span.name,
+                "start": round(self.origin_time + start_us / 1e6, 6),
+                "start_us": round(start_us, 1),
+                "duration_us": round((end_ns - span.start_ns) / 1000, 1),
+                "thread": thread.name,
+                "thread_id": thread.ident,
+                "tags": span.tags,
+            })
+
+
+TRACER = Tracer()
+
+
+def span(name: str, **tags):
+    """Context manager timing a section of work, e.g. span("gerrit.query", server=address)"""
+    return TRACER.span(name, tags)
+
+
+def start() -> None:
+    TRACER.start()
+
+
+def stop() -> List[Dict]:
+    return TRACER.stop()
+
+
+def enabled() -> bool:
+    return TRACER.enabled
+
+
+def chrome_trace(spans: List[Dict]) -> Dict:
+    """Spans as Trace Event Format complete events, one track per thread"""
+    pid = os.getpid()
+    thread_ids: Dict[int, int] = {}
+    events = []
+    for record in sorted(spans, key=lambda record: record["start_us"]):
+        if record["thread_id"] not in thread_ids:
+            thread_ids[record["thread_id"]] = tid = len(thread_ids) + 1
+            events.append({"ph": "M", "name": "thread_name", "pid": pid, "tid": tid,
+                           "args": {"name": record["thread"]}})
+        events.append({
+            "ph": "X",
+            "name": record["name"],
+            "cat": record["name"].split(".")[0],
+            "ts": record["start_us"],
+            "dur": record["duration_us"],
+            "pid": pid,
+            "tid": thread_ids[record["thread_id"]],
+            "args": record["tags"],
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def export(spans: List[Dict], directory: Path, name: str) -> Tuple[Path, Path]:
+    """Write <name>.jsonl and <name>.trace.json to directory"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    jsonl_path = directory / f"{name}.jsonl"
+    with open(jsonl_path, "w", encoding="utf-8") as f:
+        for record in spans:
+            f.write(json.dumps(record, default=str) + "\n")
+    trace_path = directory / f"{name}.trace.json"
+    with open(trace_path, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(spans), f, default=str)
+    return jsonl_path, trace_path
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Streaming work-list ingestion.
+Reads (JIRA ID, folder name) pairs from .xlsx, .csv or .jsonl files one row
+at a time, normalizes the IDs and drops repeated pairs, so that processing can
+start with the first row and memory stays flat for very long sheets.
+"""
+
+import csv
+import json
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Sequence, Tuple
+
+import openpyxl
+
+EXCEL_SUFFIXES = (".xlsx", ".xlsm")
+CSV_SUFFIXES = (".csv",)
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+SUPPORTED_SUFFIXES = EXCEL_SUFFIXES + CSV_SUFFIXES + JSONL_SUFFIXES
+
+# Accepted field names for JSON objects, in order of preference
+JSON_ID_FIELDS = ("jira_id", "key", "issue", "id")
+JSON_FOLDER_FIELDS = ("folder", "folder_name")
+
+
+def normalize_jira_id(value) -> str:
+    """
+    Clean up a JIRA ID cell: surrounding whitespace, lower case letters and cells
+    holding a list such as "['HSE-1', 'HSE-2']", of which the first ID is used.
+    """
+    text = str(value).strip() if value is not None else ""
+    if text.startswith("[") and text.endswith("]"):
+        text = text[1:-1].split(",")[0].strip().strip("'\"").strip()
+    return text.upper()
+
+
+def normalize_folder(value, jira_id: str) -> str:
+    """Folder name of a row; the JIRA ID when the cell is empty"""
+    text = str(value).strip() if value is not None else ""
+    return text or jira_id
+
+
+def iter_excel_rows(path: Path) -> Iterator[Sequence]:
+    """Rows of the active sheet after the header, streamed in read-only mode"""
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(min_row=2, values_only=True)
+    finally:
+        workbook.close()
+
+
+def iter_csv_rows(path: Path) -> Iterator[Sequence]:
+    """Rows of a CSV file after the header"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        yield from reader
+
+
+def iter_jsonl_rows(path: Path,
+                    on_malformed: Optional[Callable[[int, str], None]] = None) -> Iterator[Sequence]:
+    """
+    Rows of a JSON Lines file: objects, [id, folder] lists or plain ID strings.
+    Lines that are not valid JSON are skipped and passed to on_malformed with their line number.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                if on_malformed:
+                    on_malformed(line_number, str(e))
+                continue
+            if isinstance(record, dict):
+                jira_id = next((record[k] for k in JSON_ID_FIELDS if record.get(k)), None)
+                folder = next((record[k] for k in JSON_FOLDER_FIELDS if record.get(k)), None)
+                yield jira_id, folder
+            elif isinstance(record, list):
+                yield record
+            else:
+                yield (record,)
+
+
+def iter_rows(path: Path,
+              on_malformed: Optional[Callable[[int, str], None]] = None) -> Iterator[Sequence]:
+    suffix = path.suffix.lower()
+    if suffix in EXCEL_SUFFIXES:
+        return iter_excel_rows(path)
+    if suffix in CSV_SUFFIXES:
+        return iter_csv_rows(path)
+    if suffix in JSONL_SUFFIXES:
+        return iter_jsonl_rows(path, on_malformed)
+    raise ValueError(f"Unsupported work list format '{suffix}' "
+                     f"(expected one of {', '.join(SUPPORTED_SUFFIXES)})")
+
+
+class WorkListReader:
+    """Lazily yields unique (jira_id, folder_name) pairs from a work list file"""
+
+    def __init__(self, path: str, log_callback: Callable[[str], None] = print):
+        self.path = Path(path)
+        self.log_callback = log_callback
+        self.rows = 0
+        self.empty = 0
+        self.duplicates = 0
+        self.malformed = 0
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return self.unique(iter_rows(self.path, self.skip_malformed))
+
+    def skip_malformed(self, line_number: int, error: str) -> None:
+        self.malformed += 1
+        self.log_callback(f"Skipping malformed line {line_number} of {self.path.name}: {error}")
+
+    def unique(self, rows: Iterable[Sequence]) -> Iterator[Tuple[str, str]]:
+        # The same issue may be listed once per folder it is downloaded to
+        seen = set()
+        for row in rows:
+            self.rows += 1
+            jira_id = normalize_jira_id(row[0] if row else None)
+            if not jira_id:
+                self.empty += 1
+                continue
+            item = (jira_id, normalize_folder(row[1] if len(row) > 1 else None, jira_id))
+            if item in seen:
+                self.duplicates += 1
+                continue
+            seen.add(item)
+            yield item
+
+    def summary(self) -> str:
+        return (f"{self.rows} rows read from {self.path.name}, "
+                f"{self.duplicates} duplicate, {self.empty} empty rows and {self.malformed} malformed lines skipped")
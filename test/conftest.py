@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+# The application modules live in src/ and are run as plain scripts
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+# Manual check against the real JIRA with a visible Firefox; run it directly
+collect_ignore = ["test_reuse_profile.py"]
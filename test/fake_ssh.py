@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Stand-in for `ssh` talking to a Gerrit server, used by the tests.
+
+Emulates OpenSSH connection multiplexing with a marker file at ControlPath and
+answers `gerrit query --format=JSON` with one merged change per `change:N` term.
+State is kept in the directory named by FAKE_SSH_STATE:
+  connections.log  one line per new (authenticated) connection
+  drop             if present, the next command fails as a dropped connection
+FAKE_SSH_DELAY, if set, is the number of seconds each query takes.
+"""
+
+import json
+import os
+import re
+import shlex
+import sys
+import time
+from pathlib import Path
+
+
+def main(argv):
+    state = Path(os.environ["FAKE_SSH_STATE"])
+    control_path = None
+    operation = None
+    remote = []
+
+    args = iter(argv)
+    for arg in args:
+        if arg == "-p":
+            next(args)
+        elif arg == "-o":
+            option = next(args)
+            if option.startswith("ControlPath="):
+                control_path = Path(option.split("=", 1)[1])
+        elif arg == "-O":
+            operation = next(args)
+        elif "@" in arg and not remote:
+            remote = list(args)
+
+    if operation == "check":
+        return 0 if control_path and control_path.exists() else 255
+    if operation == "exit":
+        if control_path:
+            control_path.unlink(missing_ok=True)
+        return 0
+
+    drop_marker = state / "drop"
+    if drop_marker.exists():
+        drop_marker.unlink()
+        if control_path:
+            control_path.unlink(missing_ok=True)
+        print("Connection reset by peer", file=sys.stderr)
+        return 255
+
+    # Without a master connection every command would authenticate again
+    new_connection = True
+    if control_path:
+        try:
+            os.close(os.open(control_path, os.O_CREAT | os.O_EXCL))
+        except FileExistsError:
+            new_connection = False
+    if new_connection:
+        with open(state / "connections.log", "a") as log:
+            log.write("connect\n")
+
+    command = shlex.split(" ".join(remote))
+    if command[:2] != ["gerrit", "query"]:
+        print(f"gerrit: {command[0] if command else ''}: not found", file=sys.stderr)
+        return 1
+
+    time.sleep(float(os.environ.get("FAKE_SSH_DELAY", 0)))
+    numbers = re.findall(r"change:(\d+)", command[-1])
+    for number in numbers:
+        print(json.dumps({
+            "project": "platform/test",
+            "number": int(number),
+            "status": "MERGED",
+            "lastUpdated": 1700000000,
+            "currentPatchSet": {"number": 1, "revision": f"rev{number}", "files": []},
+        }))
+    print(json.dumps({"type": "stats", "rowCount": len(numbers)}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
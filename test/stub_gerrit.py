@@ -0,0 +1,131 @@
+"""
+Local stand-in for a Gerrit server's HTTP side, used by the tests.
+
+Serves the REST change query endpoint (with the XSSI prefix) and patch zips.
+Every change number is known and merged unless listed in `unmerged`. With a
+`login_cookie`, patch zips are only served to clients sending that cookie;
+others get the HTML login page, as from a real Gerrit.
+Statuses appended to `failures` are answered, one per request, before any
+real response, to emulate an overloaded server.
+"""
+
+import base64
+import io
+import json
+import re
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def make_patch_zip(change: str, revision: str) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr(f"{revision[:7]}.diff", f"From {revision} Mon Sep 17 00:00:00 2001\n"
+                                                 f"Subject: [PATCH] Change {change}\n")
+    return buffer.getvalue()
+
+
+class StubGerrit:
+    """Threaded HTTP server emulating the Gerrit endpoints the downloader uses"""
+
+    def __init__(self, username="user", password="secret", unmerged=(), delay=0.0, login_cookie=None):
+        self.username = username
+        self.password = password
+        self.unmerged = set(unmerged)
+        # "name=value" of the login cookie patch downloads need, if any
+        self.login_cookie = login_cookie
+        self.failures = []
+        # Seconds every response is held back, to stand in for network and server time
+        self.delay = delay
+        self.requests = []
+        self.client_ports = set()
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler_class())
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def change_info(self, number):
+        revision = f"{int(number):040x}"
+        return {
+            "project": "platform/test",
+            "_number": int(number),
+            "status": "MERGED",
+            "updated": "2023-11-14 22:13:20.000000000",
+            "current_revision": revision,
+            "revisions": {revision: {"_number": 2, "files": {"core/Foo.java": {}}}},
+        }
+
+    def handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; without this every
+            # keep-alive response waits for the client's delayed ACK
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def send_body(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                with stub.lock:
+                    stub.requests.append(self.path)
+                    stub.client_ports.add(self.client_address[1])
+                    failure = stub.failures.pop(0) if stub.failures else None
+                if stub.delay:
+                    time.sleep(stub.delay)
+                if failure:
+                    self.send_response(failure)
+                    self.send_header("Retry-After", "0")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                path = url.path
+                if path.startswith("/a/"):
+                    expected = base64.b64encode(
+                        f"{stub.username}:{stub.password}".encode()).decode()
+                    if self.headers.get("Authorization") != f"Basic {expected}":
+                        self.send_body(401, b"Unauthorized", "text/plain")
+                        return
+                    path = path[2:]
+
+                if path == "/changes/":
+                    query = parse_qs(url.query).get("q", [""])[0]
+                    numbers = [n for n in re.findall(r"change:(\d+)", query)
+                               if n not in stub.unmerged]
+                    body = ")]}'\n" + json.dumps([stub.change_info(n) for n in numbers])
+                    self.send_body(200, body.encode(), "application/json")
+                    return
+
+                match = re.fullmatch(r"/changes/(\d+)/revisions/(\w+)/patch", path)
+                if match and url.query == "zip":
+                    cookies = [c.strip() for c in self.headers.get("Cookie", "").split(";")]
+                    if stub.login_cookie and stub.login_cookie not in cookies:
+                        self.send_body(200, b"<html><body>Sign In</body></html>", "text/html")
+                        return
+                    self.send_body(200, make_patch_zip(*match.groups()), "application/zip")
+                    return
+
+                self.send_body(404, b"Not found", "text/plain")
+
+        return Handler
@@ -0,0 +1,145 @@
+"""
+Local stand-in for the JIRA endpoints the downloader uses, used by the tests.
+
+Serves the issue REST API (with rendered fields), remote links, the current
+user, the
+/browse/ issue page and the printable HTML issue view for the issues passed
+to the constructor, plus static assets that honour If-None-Match.
+"""
+
+import base64
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+class StubJira:
+    """Threaded HTTP server emulating JIRA issue endpoints"""
+
+    def __init__(self, issues, auth=None, assets=None, delay=0.0):
+        # issues: key -> {"description": str, "rendered": str, "remote_links": [url, ...]}
+        self.issues = issues
+        self.auth = auth
+        # assets: path -> {"body": bytes, "content_type": str, "etag": str, "cache_control": str}
+        self.assets = assets or {}
+        # Seconds every response is held back, to stand in for network and server time
+        self.delay = delay
+        self.requests = []
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler_class())
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def issue_json(self, key):
+        issue = self.issues[key]
+        return {
+            "key": key,
+            "fields": {"summary": f"Issue {key}", "description": issue.get("description", ""),
+                       "created": "2025-12-01T10:00:00.000+0900"},
+            "renderedFields": {"description": issue.get("rendered", "")},
+        }
+
+    def html_view(self, key):
+        issue = self.issues[key]
+        return (f"<html><head><title>{key}</title></head><body>"
+                f"<h1>Issue {key}</h1>{issue.get('rendered', '')}</body></html>")
+
+    def browse_page(self, key):
+        """Issue page as the browser sees it: description, remote links and the created-date filter link"""
+        issue = self.issues[key]
+        remote_links = "".join(f'<li><a href="{url}">{url}</a></li>'
+                               for url in issue.get("remote_links", []))
+        return (f"<html><head><title>[{key}] Issue {key}</title></head><body>"
+                f"<h1>Issue {key}</h1>"
+                f'<a href="/issues/?jql=created&amp;from=2025-12-01">Created</a>'
+                f'<div class="description">{issue.get("rendered", "")}</div>'
+                f'<ul class="links">{remote_links}</ul></body></html>')
+
+    def handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; without this every
+            # keep-alive response waits for the client's delayed ACK
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def send_body(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                with stub.lock:
+                    stub.requests.append(path)
+                if stub.delay:
+                    time.sleep(stub.delay)
+
+                if stub.auth:
+                    expected = base64.b64encode(":".join(stub.auth).encode()).decode()
+                    if self.headers.get("Authorization") != f"Basic {expected}":
+                        self.send_body(401, b"Unauthorized", "text/plain")
+                        return
+
+                if path == "/rest/api/2/myself":
+                    self.send_body(200, json.dumps({"name": "stub"}).encode(), "application/json")
+                    return
+
+                match = re.fullmatch(r"/rest/api/2/issue/([A-Z]+-\d+)(/remotelink)?", path)
+                if match and match.group(1) in stub.issues:
+                    key = match.group(1)
+                    if match.group(2):
+                        data = [{"id": n, "object": {"url": url, "title": url}}
+                                for n, url in enumerate(stub.issues[key].get("remote_links", []))]
+                    else:
+                        data = stub.issue_json(key)
+                    self.send_body(200, json.dumps(data).encode(), "application/json")
+                    return
+
+                asset = stub.assets.get(path)
+                if asset:
+                    if asset.get("etag") and self.headers.get("If-None-Match") == asset["etag"]:
+                        self.send_response(304)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    self.send_response(200)
+                    self.send_header("Content-Type", asset["content_type"])
+                    self.send_header("Content-Length", str(len(asset["body"])))
+                    for header, key in (("ETag", "etag"), ("Cache-Control", "cache_control")):
+                        if asset.get(key):
+                            self.send_header(header, asset[key])
+                    self.end_headers()
+                    self.wfile.write(asset["body"])
+                    return
+
+                match = re.fullmatch(r"/si/jira\.issueviews:issue-html/([A-Z]+-\d+)/\1\.html", path)
+                if match and match.group(1) in stub.issues:
+                    self.send_body(200, stub.html_view(match.group(1)).encode(), "text/html")
+                    return
+
+                match = re.fullmatch(r"/browse/([A-Z]+-\d+)", path)
+                if match and match.group(1) in stub.issues:
+                    self.send_body(200, stub.browse_page(match.group(1)).encode(), "text/html")
+                    return
+
+                self.send_body(404, b"Not found", "text/plain")
+
+        return Handler
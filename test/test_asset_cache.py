@@ -0,0 +1,81 @@
+import os
+import threading
+
+from asset_cache import AssetCache
+from stub_jira import StubJira
+
+ASSETS = {
+    "/s/batch.css": {"body": b"body { background: url('../images/bg.png'); }",
+                     "content_type": "text/css", "cache_control": "max-age=3600"},
+    "/images/bg.png": {"body": b"\x89PNG background", "content_type": "image/png"},
+    "/secure/attachment/10/screenshot.png": {"body": b"\x89PNG screenshot",
+                                             "content_type": "image/png", "etag": '"v1"'},
+}
+RENDERED = ('<link rel="stylesheet" href="/s/batch.css">'
+            '<img src="/secure/attachment/10/screenshot.png">'
+            '<a href="/browse/ABC-2">ABC-2</a>')
+
+
+def test_issue_views_reuse_cached_assets(tmp_path):
+    with StubJira({"ABC-1": {"rendered": RENDERED}, "ABC-2": {"rendered": RENDERED}},
+                  assets=ASSETS) as jira:
+        cache = AssetCache(str(tmp_path / "cache"), log_callback=lambda _: None)
+        for key in ("ABC-1", "ABC-2"):
+            page_dir = tmp_path / key
+            page_dir.mkdir()
+            page = cache.save_localized_page(
+                f"{jira.url}si/jira.issueviews:issue-html/{key}/{key}.html", str(page_dir))
+        html = page.read_text()
+
+    # The stylesheet (and the image it references) is fetched once, the attachment is revalidated
+    assert jira.requests.count("/s/batch.css") == 1
+    assert jira.requests.count("/images/bg.png") == 1
+    assert jira.requests.count("/secure/attachment/10/screenshot.png") == 2
+    assert (cache.hits, cache.revalidated, cache.misses) == (1, 1, 3)
+
+    assert 'href="file://' in html and 'src="file://' in html
+    assert 'href="/browse/ABC-2"' in html
+    local_css = next((tmp_path / "cache").glob("*/*.local.css")).read_text()
+    assert "url('file://" in local_css
+
+
+def test_each_thread_sends_its_own_login(tmp_path):
+    auth = ("dev@example.com", "api-token")
+    with StubJira({}, auth=auth, assets=ASSETS) as jira:
+        cache = AssetCache(str(tmp_path / "cache"), log_callback=lambda _: None)
+        results = {}
+
+        def fetch(name, credentials, path):
+            cache.set_credentials([], credentials)
+            results[name] = cache.fetch(jira.url + path.lstrip("/"))
+
+        threads = [threading.Thread(target=fetch, args=("valid", auth, "/s/batch.css")),
+                   threading.Thread(target=fetch, args=("wrong", ("dev@example.com", "old"), "/images/bg.png"))]
+        for thread in threads:
+            thread.start()
+            thread.join()
+        # A thread that never logged in does not borrow another worker's login
+        results["none"] = cache.fetch(jira.url + "images/bg.png")
+
+    assert results["valid"] is not None
+    assert results["wrong"] is None and results["none"] is None
+
+
+def test_least_recently_used_assets_are_evicted(tmp_path):
+    assets = {f"/s/{n}.css": {"body": b"x" * 400, "content_type": "text/css",
+                              "cache_control": "max-age=3600"} for n in range(1, 4)}
+    with StubJira({}, assets=assets) as jira:
+        cache = AssetCache(str(tmp_path / "cache"), log_callback=lambda _: None, max_bytes=1400)
+        for n, age in ((1, 300), (2, 200)):
+            cache.fetch(f"{jira.url}s/{n}.css")
+            for path in cache.paths_for(f"{jira.url}s/{n}.css"):
+                os.utime(path, (path.stat().st_atime - age, path.stat().st_mtime - age))
+
+        # Using asset 1 makes asset 2 the least recently used one
+        cache.fetch(f"{jira.url}s/1.css")
+        cache.fetch(f"{jira.url}s/3.css")
+
+    assert cache.paths_for(f"{jira.url}s/1.css")[0].exists()
+    assert not cache.paths_for(f"{jira.url}s/2.css")[0].exists()
+    assert cache.paths_for(f"{jira.url}s/3.css")[0].exists()
+    assert cache.total_bytes == sum(size for _, size, _ in cache.entries()) <= 1400
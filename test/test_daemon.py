@@ -0,0 +1,133 @@
+import io
+import logging
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from daemon import DONE, FAILED, DownloaderDaemon, read_gerrit_password
+from daemon_client import GERRIT_PASSWORD_ENV, DaemonClient, token_path
+from jira_api import JiraApiClient
+from main import GerritManager, JiraConfig, JiraDownloader
+from patch_downloader import PatchDownloader
+from stub_jira import StubJira
+
+
+class FakeDaemon(DownloaderDaemon):
+    """Daemon whose session and jobs only log, instead of driving browsers"""
+
+    def __init__(self, project_root):
+        super().__init__(project_root, "user", "secret")
+        self.sessions_started = 0
+        self.logger = logging.getLogger("test_daemon")
+        self.logger.setLevel(logging.INFO)
+
+    def start_session(self):
+        self.sessions_started += 1
+        self.pool = SimpleNamespace(workers=[])
+
+    def close_session(self):
+        self.pool = None
+
+    def use_project(self, project):
+        return self.logger
+
+    def run_job(self, job):
+        if "broken" in job.work_list:
+            raise RuntimeError("browser crashed")
+        for line in open(job.work_list, encoding="utf-8"):
+            self.logger.info(f"Processing: {line.strip()}")
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    daemon = FakeDaemon(tmp_path)
+    daemon.start(0)
+    yield daemon
+    daemon.stop()
+
+
+def client_for(daemon, token=True):
+    port = daemon.server.server_port
+    return DaemonClient(port, token_path(daemon.output_base) if token else None)
+
+
+def write_list(tmp_path, name, *rows):
+    path = tmp_path / name
+    path.write_text("\n".join(rows) + "\n", encoding="utf-8")
+    return path
+
+
+def test_jobs_reuse_the_warm_session_and_stream_progress(daemon, tmp_path):
+    client = client_for(daemon)
+    messages = []
+
+    first = client.run("Dec_2025", str(write_list(tmp_path, "a.jsonl", '"HSE-1"', '"HSE-2"')),
+                       messages.append)
+    second = client.run("Dec_2025", str(write_list(tmp_path, "b.jsonl", '"HSE-3"')), messages.append)
+
+    assert first["state"] == second["state"] == DONE
+    assert daemon.sessions_started == 1
+    progress = [message.rsplit(" - ", 1)[-1] for message in messages if "Processing" in message]
+    assert progress == ['Processing: "HSE-1"', 'Processing: "HSE-2"', 'Processing: "HSE-3"']
+    assert client.status()["jobs_run"] == 2
+
+
+def test_failed_job_restarts_the_session(daemon, tmp_path):
+    client = client_for(daemon)
+
+    job = client.run("Dec_2025", str(write_list(tmp_path, "broken.csv", "jira_id")), lambda _: None)
+    assert (job["state"], job["error"]) == (FAILED, "browser crashed")
+    assert client.run("Dec_2025", str(write_list(tmp_path, "ok.csv", "x")), lambda _: None)["state"] == DONE
+    assert daemon.sessions_started == 2
+
+
+def test_requests_are_validated_and_need_the_token(daemon, tmp_path):
+    assert not client_for(daemon, token=False).available()
+
+    client = client_for(daemon)
+    assert client.available()
+    with pytest.raises(RuntimeError, match="not found"):
+        client.submit("Dec_2025", str(tmp_path / "missing.xlsx"))
+    with pytest.raises(RuntimeError, match="Invalid project"):
+        client.submit("../elsewhere", str(write_list(tmp_path, "a.csv", "x")))
+
+
+def test_daemon_without_a_terminal_does_not_prompt(monkeypatch):
+    monkeypatch.setattr(sys, "stdin", io.StringIO(""))
+    monkeypatch.delenv(GERRIT_PASSWORD_ENV, raising=False)
+    assert read_gerrit_password({}) == ""
+
+    monkeypatch.setenv(GERRIT_PASSWORD_ENV, "from-env")
+    assert read_gerrit_password({}) == "from-env"
+    assert read_gerrit_password({"gerrit_password": "from-config"}) == "from-config"
+
+
+def test_refused_logins_are_renewed(tmp_path, monkeypatch):
+    auth = ("dev@example.com", "api-token")
+    with StubJira({}, auth=auth) as jira:
+        worker = JiraDownloader(str(tmp_path))
+        worker.logger = logging.getLogger("test_daemon")
+        worker.gerrit_manager = GerritManager("user")
+        worker.patch_downloader = PatchDownloader(log_callback=lambda _: None)
+        logins = []
+        cookie = {"name": JiraConfig.GERRIT_LOGIN_COOKIE, "value": "session"}
+        monkeypatch.setattr(worker, "gerrit_login", lambda *credentials: logins.append(credentials) or [cookie])
+        monkeypatch.setattr(worker, "create_jira_api_client", lambda: JiraApiClient(jira.url, auth=auth))
+
+        # A cookieless JIRA session and a Gerrit login that downloads were refused with
+        worker.jira_api = JiraApiClient(jira.url)
+        worker.gerrit_cookies = [cookie]
+        worker.patch_downloader.count_auth_failure()
+        worker.refresh_logins("user", "secret")
+
+        assert logins == [("user", "secret")]
+        assert worker.patch_downloader.auth_failures == 0
+        assert worker.jira_api.authenticated()
+
+        # Logins that still work are left alone
+        worker.refresh_logins("user", "secret")
+        assert len(logins) == 1
+        worker.jira_api.close()
+        worker.patch_downloader.close()
+        worker.gerrit_manager.close()
@@ -0,0 +1,50 @@
+import os
+import threading
+
+import pytest
+
+import download_watcher
+from download_watcher import DownloadWatcher
+
+
+def firefox_download(directory, name, content):
+    """Write a file the way Firefox does: empty placeholder, .part file, rename"""
+    (directory / name).touch()
+    part = directory / f"{name}.part"
+    part.write_bytes(content)
+    os.replace(part, directory / name)
+
+
+@pytest.fixture(params=["inotify", "scan"])
+def watcher(request, tmp_path, monkeypatch):
+    if request.param == "scan":
+        monkeypatch.setattr(download_watcher.sys, "platform", "other")
+    elif not download_watcher.sys.platform.startswith("linux"):
+        pytest.skip("inotify is Linux only")
+    watcher = DownloadWatcher(str(tmp_path), log_callback=lambda message: None)
+    watcher.start()
+    yield watcher
+    watcher.close()
+
+
+def test_overlapping_downloads_are_matched_to_their_requests(watcher, tmp_path):
+    first = watcher.expect("aaaaaaa")
+    second = watcher.expect("bbbbbbb")
+
+    # Finish in the opposite order the downloads were started
+    threading.Thread(target=lambda: (
+        firefox_download(tmp_path, "bbbbbbb.diff.zip", b"PK second"),
+        firefox_download(tmp_path, "aaaaaaa.diff.zip", b"PK first"),
+    )).start()
+
+    assert watcher.wait(first, timeout=5).read_bytes() == b"PK first"
+    assert watcher.wait(second, timeout=5).read_bytes() == b"PK second"
+
+
+def test_download_finished_before_request_is_claimed(watcher, tmp_path):
+    other = watcher.expect("ccccccc")
+    firefox_download(tmp_path, "ddddddd.diff.zip", b"PK early")
+    assert watcher.wait(other, timeout=0.5) is None
+
+    request = watcher.expect("ddddddd")
+    assert watcher.wait(request, timeout=1).name == "ddddddd.diff.zip"
@@ -0,0 +1,97 @@
+import logging
+import threading
+import time
+
+import pytest
+
+from jira_api import JiraApiClient
+from main import DownloaderPool, GerritManager, JiraConfig, JiraDownloader
+from patch_downloader import PatchDownloader
+from run_manifest import DONE
+from stub_gerrit import StubGerrit
+from stub_jira import StubJira
+
+ISSUES = {
+    "HSE-1": {"rendered": '<a href="http://10.24.71.91/gerrit/100">a</a> '
+                          '<a href="http://10.24.71.91/gerrit/200">b</a>'},
+    "HSE-2": {"rendered": '<a href="http://10.24.71.91/gerrit/200">b</a> '
+                          '<a href="http://10.24.71.91/gerrit/300">unmerged</a>'},
+    "HSE-3": {"rendered": "<p>No changes</p>"},
+}
+
+
+@pytest.fixture
+def servers(monkeypatch):
+    monkeypatch.setattr(JiraConfig, "GERRIT_SERVERS", dict(JiraConfig.GERRIT_SERVERS))
+    monkeypatch.setattr(JiraConfig, "_link_classifier", None)
+    for name, value in (("PIPELINE", False), ("RESUME", False), ("TRACE", False),
+                        ("PATCH_DOWNLOAD_MODE", "http"), ("DOWNLOAD_GERRIT_ZIP", True)):
+        monkeypatch.setattr(JiraConfig, name, value)
+    with StubJira(ISSUES) as jira, StubGerrit(unmerged={"300"}) as gerrit:
+        JiraConfig.update_gerrit_server("10.24.71.91", url=gerrit.url, backend="rest")
+        yield jira, gerrit
+
+
+def make_worker(download_path, name, logger, jira_url=None):
+    worker = JiraDownloader(str(download_path))
+    worker.worker_name = name
+    worker.logger = logger
+    if jira_url:
+        worker.jira_api = JiraApiClient(jira_url)
+        worker.patch_downloader = PatchDownloader(log_callback=logger.debug)
+    return worker
+
+
+def test_pool_runs_items_in_parallel_and_keeps_their_order(tmp_path):
+    logger = logging.getLogger("test_downloader_pool")
+    pool = DownloaderPool(str(tmp_path), logger, 3)
+    pool.workers = [make_worker(tmp_path, f"worker{n}", logger) for n in range(1, 4)]
+    threads = set()
+
+    def task(worker, item):
+        threads.add(threading.current_thread().name)
+        if item == 4:
+            raise RuntimeError("browser crashed")
+        time.sleep(0.02)
+        return item * 10
+
+    start = time.monotonic()
+    results = pool.run(iter(range(9)), task)
+
+    assert results == [0, 10, 20, 30, None, 50, 60, 70, 80]
+    assert threads == {"worker1", "worker2", "worker3"}
+    # Eight 20 ms items on three workers take about three rounds, not eight
+    assert time.monotonic() - start < 8 * 0.02
+
+
+def test_pool_downloads_every_issue_of_a_work_list(servers, tmp_path):
+    jira, gerrit = servers
+    work_list = tmp_path / "issues.jsonl"
+    work_list.write_text("".join(f'{{"jira_id": "{key}", "folder": "F-{key}"}}\n' for key in ISSUES),
+                         encoding="utf-8")
+    logger = logging.getLogger("test_downloader_pool")
+    coordinator = make_worker(tmp_path / "Project", "main", logger)
+    coordinator.gerrit_manager = GerritManager("user", http_password="secret")
+
+    reader, items = coordinator.open_work_list(str(work_list))
+    pool = DownloaderPool(str(coordinator.download_path), logger, 2)
+    for n in (1, 2):
+        worker = make_worker(coordinator.download_path, f"worker{n}", logger, jira.url)
+        worker.gerrit_manager = coordinator.gerrit_manager
+        worker.manifest = coordinator.manifest
+        pool.workers.append(worker)
+    try:
+        coordinator.run_work_list(reader, items, pool)
+        states = {key: coordinator.manifest.issue_state(key, f"F-{key}") for key in ISSUES}
+    finally:
+        for worker in pool.workers:
+            worker.jira_api.close()
+            worker.patch_downloader.close()
+        coordinator.close_manifest()
+        coordinator.gerrit_manager.close()
+
+    folders = sorted(path.parent.parent.name for path in coordinator.download_path.glob("*/Source/*.zip"))
+    assert folders == ["F-HSE-1", "F-HSE-1", "F-HSE-2"]
+    assert states == {key: DONE for key in ISSUES}
+    # Both workers share one batched query for the whole sheet
+    assert sum(1 for path in gerrit.requests if path.startswith("/a/changes/?")) == 1
@@ -0,0 +1,56 @@
+import json
+import os
+import stat
+import sys
+import time
+
+import pytest
+
+from driver_cache import DriverCache
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="uses a shell script as fake driver")
+
+
+def fake_driver(directory, version="0.34.0"):
+    path = directory / "geckodriver"
+    path.write_text(f"#!/bin/sh\necho 'geckodriver {version} (abc 2024-01-01)'\n")
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+
+def test_pinned_driver_is_reused_without_installing(tmp_path):
+    installs = []
+
+    def install():
+        installs.append(1)
+        return fake_driver(tmp_path)
+
+    cache = DriverCache(str(tmp_path / "cache"), max_age=3600, install=install, log_callback=lambda _: None)
+    first = cache.resolve()
+    second = cache.resolve()
+
+    assert first == second == str(tmp_path / "cache" / "0.34.0" / "geckodriver")
+    assert len(installs) == 1
+    assert cache.read_pin()["version"] == "0.34.0"
+
+
+def test_offline_host_falls_back_to_stale_pin_then_path(tmp_path, monkeypatch):
+    def offline():
+        raise ConnectionError("api.github.com unreachable")
+
+    online = DriverCache(str(tmp_path / "cache"), install=lambda: fake_driver(tmp_path),
+                         log_callback=lambda _: None)
+    online.resolve()
+    pin = online.read_pin()
+    pin["resolved_at"] = time.time() - 30 * 86400
+    online.pin_path.write_text(json.dumps(pin))
+
+    stale = DriverCache(str(tmp_path / "cache"), max_age=86400, install=offline, log_callback=lambda _: None)
+    assert stale.resolve() == pin["path"]
+
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    on_path = fake_driver(bin_dir)
+    monkeypatch.setenv("PATH", str(bin_dir) + os.pathsep + os.environ.get("PATH", ""))
+    empty = DriverCache(str(tmp_path / "empty"), install=offline, log_callback=lambda _: None)
+    assert empty.resolve() == on_path
@@ -0,0 +1,59 @@
+import time
+
+import pytest
+
+from gerrit_cache import GerritMetadataCache
+from gerrit_query import GerritChange
+from gerrit_servers import GerritServer
+from main import GerritManager, JiraConfig
+from stub_gerrit import StubGerrit
+
+
+@pytest.fixture
+def rest_server(monkeypatch):
+    with StubGerrit(unmerged={"300"}) as server:
+        monkeypatch.setitem(JiraConfig.GERRIT_SERVERS, "10.24.71.91",
+                            GerritServer("10.24.71.91", server.url, backend="rest"))
+        yield server
+
+
+def resolve(db_path, ids, negative_ttl=3600.0):
+    cache = GerritMetadataCache(str(db_path), negative_ttl)
+    manager = GerritManager("user", http_password="secret", metadata_cache=cache)
+    resolved = manager.resolve_changes("10.24.71.91", ids)
+    counters = cache.counters()
+    manager.close()
+    return resolved, counters
+
+
+def test_second_run_is_answered_from_the_cache(rest_server, tmp_path):
+    db_path = tmp_path / "gerrit_cache.sqlite"
+    first, counters = resolve(db_path, ["100", "200", "300"])
+    assert sorted(first) == ["100", "200"]
+    assert counters == (0, 3, 0)
+    queries = len(rest_server.requests)
+
+    second, counters = resolve(db_path, ["100", "200", "300"])
+    assert second == first
+    assert counters == (3, 0, 1)
+    assert len(rest_server.requests) == queries
+
+
+def test_negative_results_expire(rest_server, tmp_path):
+    db_path = tmp_path / "gerrit_cache.sqlite"
+    resolve(db_path, ["300"], negative_ttl=0.01)
+    queries = len(rest_server.requests)
+    time.sleep(0.05)
+
+    _, counters = resolve(db_path, ["300"], negative_ttl=0.01)
+    assert counters == (0, 1, 0)
+    assert len(rest_server.requests) == queries + 1
+
+
+def test_merged_changes_never_expire(tmp_path):
+    cache = GerritMetadataCache(str(tmp_path / "gerrit_cache.sqlite"), negative_ttl=0)
+    change = GerritChange("100", "platform/core", "a" * 40, 2, "MERGED", 1700000000, ["Foo.java"])
+    cache.store("10.230.1.88", {"100": change, "101": None})
+
+    assert cache.lookup("10.230.1.88", ["100", "101"]) == {"100": change}
+    cache.close()
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from gerrit_query import build_change_queries, parse_query_output
+from main import GerritManager
+
+
+def change_line(number, revision, project="platform/frameworks/base"):
+    return json.dumps({
+        "project": project,
+        "number": number,
+        "status": "MERGED",
+        "lastUpdated": 1700000000,
+        "currentPatchSet": {"number": 3, "revision": revision,
+                            "files": [{"file": "/COMMIT_MSG"}, {"file": "core/Foo.java"}]},
+    })
+
+
+def test_build_change_queries_chunks_and_deduplicates():
+    queries = build_change_queries(["1", "2", "2", "3"], chunk_size=2)
+    assert queries == [
+        "status:merged AND (change:1 OR change:2)",
+        "status:merged AND (change:3)",
+    ]
+
+
+def test_parse_query_output_skips_stats_row():
+    output = "\n".join([
+        change_line(448462, "abc123"),
+        json.dumps({"type": "stats", "rowCount": 1, "runTimeMilliseconds": 5}),
+    ])
+    changes = parse_query_output(output)
+
+    change = changes["448462"]
+    assert change.revision == "abc123"
+    assert change.patchset == 3
+    assert change.project == "platform/frameworks/base"
+    assert change.files == ["/COMMIT_MSG", "core/Foo.java"]
+
+
+class FakeGerritManager(GerritManager):
+    def __init__(self):
+        super().__init__("user")
+        self.queries = []
+
+    def run_query(self, gerrit_address, query):
+        self.queries.append(query)
+        return "\n".join(change_line(n, f"rev{n}") for n in (101, 102))
+
+
+@pytest.fixture
+def manager():
+    manager = FakeGerritManager()
+    yield manager
+    # Shuts down the SSH connection pool the manager created
+    manager.close()
+
+
+def test_resolve_changes_batches_and_remembers_results(manager):
+    manager.QUERY_CHUNK_SIZE = 10
+
+    resolved = manager.resolve_changes("10.24.71.91", ["101", "102", "999"])
+    assert sorted(resolved) == ["101", "102"]
+    assert len(manager.queries) == 1
+
+    # Known and not-found IDs are not queried again
+    assert manager.query_gerrit("101", "10.24.71.91", "revision") == "rev101"
+    assert manager.query_gerrit("999", "10.24.71.91", "revision") == ""
+    assert len(manager.queries) == 1
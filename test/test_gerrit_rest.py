@@ -0,0 +1,126 @@
+import logging
+
+import pytest
+
+from gerrit_query import GerritLookupError
+from gerrit_rest import GerritRestClient, parse_rest_response
+from gerrit_servers import GerritServer
+from main import GerritManager, JiraConfig, JiraDownloader
+from patch_downloader import PatchDownloader, holds_revision
+from pipeline import IssueJob
+from run_manifest import DONE, RunManifest
+from stub_gerrit import StubGerrit
+
+
+@pytest.fixture
+def rest_server(monkeypatch):
+    with StubGerrit(unmerged={"300"}) as server:
+        monkeypatch.setitem(JiraConfig.GERRIT_SERVERS, "10.24.71.91",
+                            GerritServer("10.24.71.91", server.url, backend="rest"))
+        yield server
+
+
+def test_parse_rest_response_strips_xssi_prefix():
+    assert parse_rest_response(")]}'\n[{\"_number\": 1}]") == [{"_number": 1}]
+
+
+def test_query_changes_uses_authenticated_endpoint(rest_server):
+    client = GerritRestClient(rest_server.url, auth=("user", "secret"))
+    changes = client.query_changes("status:merged AND (change:100 OR change:300)")
+    client.close()
+
+    assert list(changes) == ["100"]
+    assert changes["100"].revision == f"{100:040x}"
+    assert changes["100"].patchset == 2
+    assert changes["100"].files == ["core/Foo.java"]
+    assert rest_server.requests[0].startswith("/a/changes/?q=")
+
+
+def test_manager_batches_rest_queries_over_one_connection(rest_server):
+    manager = GerritManager("user", http_password="secret")
+    manager.QUERY_CHUNK_SIZE = 2
+    manager.QUERY_PARALLELISM = 1
+
+    resolved = manager.resolve_changes("10.24.71.91", ["100", "200", "300", "400"])
+    manager.close()
+
+    assert sorted(resolved) == ["100", "200", "400"]
+    assert len(rest_server.requests) == 2
+    assert len(rest_server.client_ports) == 1
+    assert manager.query_gerrit("300", "10.24.71.91") == ""
+    assert len(rest_server.requests) == 2
+
+
+def test_forgotten_unmerged_change_is_asked_again(rest_server):
+    manager = GerritManager("user", http_password="secret")
+    assert manager.resolve_changes("10.24.71.91", ["100", "300"]).keys() == {"100"}
+
+    # 300 is merged after the first lookup, as between two daemon jobs
+    rest_server.unmerged.clear()
+    assert manager.resolve_changes("10.24.71.91", ["100", "300"]).keys() == {"100"}
+    manager.forget_unmerged()
+    assert manager.resolve_changes("10.24.71.91", ["100", "300"]).keys() == {"100", "300"}
+    manager.close()
+
+    assert len(rest_server.requests) == 2
+    assert "change%3A300" in rest_server.requests[1] and "change%3A100" not in rest_server.requests[1]
+
+
+def test_failed_query_is_not_mistaken_for_unmerged_change(rest_server, tmp_path):
+    JiraConfig.GERRIT_SERVERS["10.24.71.91"].limiter.BASE_BACKOFF = 0.01
+    rest_server.failures.extend([500] * 6)
+    downloader = JiraDownloader(str(tmp_path))
+    downloader.logger = logging.getLogger("test_gerrit_rest")
+    downloader.gerrit_manager = GerritManager("user", http_password="secret")
+    downloader.manifest = RunManifest(str(tmp_path / "manifest.sqlite"))
+
+    downloader.download_issue_patches("HSE-1", "X5P", {"10.24.71.91": ["100"]})
+    assert downloader.manifest.issue_state("HSE-1", "X5P") != DONE
+    with pytest.raises(GerritLookupError):  # the server is still failing
+        downloader.gerrit_manager.get_change("100", "10.24.71.91")
+
+    # Once the server answers again the change resolves, and "not merged" is no error
+    assert downloader.gerrit_manager.query_gerrit("100", "10.24.71.91") == f"{100:040x}"
+    assert downloader.gerrit_manager.query_gerrit("300", "10.24.71.91") == ""
+    downloader.gerrit_manager.close()
+    downloader.manifest.close()
+
+
+def test_patch_keeps_its_file_number_when_an_earlier_lookup_recovers(rest_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(JiraConfig, "PATCH_DOWNLOAD_MODE", "http")
+    JiraConfig.GERRIT_SERVERS["10.24.71.91"].limiter.BASE_BACKOFF = 0.01
+    downloader = JiraDownloader(str(tmp_path))
+    downloader.logger = logging.getLogger("test_gerrit_rest")
+    downloader.manifest = RunManifest(str(tmp_path / "manifest.sqlite"))
+    downloader.patch_downloader = PatchDownloader(log_callback=lambda _: None)
+    source = tmp_path / "X5P" / "Source"
+    source.mkdir(parents=True)
+
+    # The lookup of 100 fails in the first run, so only 200 is downloaded
+    rest_server.failures.extend([500] * 3)
+    for _ in range(2):
+        downloader.gerrit_manager = GerritManager("user", http_password="secret")
+        downloader.download_issue_patches("HSE-1", "X5P", {"10.24.71.91": ["100", "200"]})
+        downloader.gerrit_manager.close()
+    downloader.patch_downloader.close()
+
+    paths = {change: downloader.manifest.fetchone(
+        "SELECT path FROM patches WHERE change = ?", (change,))[0] for change in ("100", "200")}
+    downloader.manifest.close()
+    assert paths == {"100": str(source / "HSE-1-02.zip"), "200": str(source / "HSE-1-01.zip")}
+    assert holds_revision(source / "HSE-1-01.zip", f"{200:040x}")
+    assert holds_revision(source / "HSE-1-02.zip", f"{100:040x}")
+
+
+def test_pipeline_resolves_queued_issues_together(rest_server, tmp_path):
+    downloader = JiraDownloader(str(tmp_path))
+    downloader.logger = logging.getLogger("test_gerrit_rest")
+    downloader.gerrit_manager = GerritManager("user", http_password="secret")
+    jobs = [IssueJob(f"HSE-{n}", "X5P", gerrit_links={"10.24.71.91": ids})
+            for n, ids in enumerate([["100", "200"], ["200", "300"], ["400"]])]
+
+    assert downloader.resolve_jobs_changes(jobs) == jobs
+    downloader.gerrit_manager.close()
+
+    assert len(rest_server.requests) == 1
+    assert downloader.gerrit_manager.query_gerrit("400", "10.24.71.91") == f"{400:040x}"
@@ -0,0 +1,136 @@
+import configparser
+import threading
+import time
+
+import pytest
+
+from gerrit_servers import GerritServer, HostLimiter
+from main import GerritManager, JiraConfig
+from patch_downloader import PatchDownloader
+from stub_gerrit import StubGerrit
+
+CONFIG = """
+[gerrit_backends]
+10.24.71.91 = rest
+
+[gerrit:10.230.1.88]
+ssh_port = 29419
+max_connections = 16
+requests_per_second = 20
+
+[gerrit:10.1.2.3]
+url = https://review.example.com/
+links = review.example.com/
+"""
+
+
+@pytest.fixture
+def servers(monkeypatch):
+    monkeypatch.setattr(JiraConfig, "GERRIT_SERVERS", dict(JiraConfig.GERRIT_SERVERS))
+    monkeypatch.setattr(JiraConfig, "_link_classifier", None)
+    yield JiraConfig.GERRIT_SERVERS
+
+
+def fast(limiter):
+    limiter.BASE_BACKOFF = 0.01
+    return limiter
+
+
+def test_servers_are_read_from_config(servers):
+    config = configparser.ConfigParser()
+    config.read_string(CONFIG)
+    JiraConfig.load_gerrit_backends(config["gerrit_backends"])
+    for section in ("gerrit:10.230.1.88", "gerrit:10.1.2.3"):
+        JiraConfig.load_gerrit_server(section.split(":", 1)[1], config[section])
+
+    assert JiraConfig.gerrit_backend("10.24.71.91") == "rest"
+    ep2 = servers["10.230.1.88"]
+    assert (ep2.ssh_port, ep2.max_connections, ep2.requests_per_second) == (29419, 16, 20.0)
+    assert ep2.links == ["10.230.1.88/"]
+    # EP2 patches come from EP2, not from the 10.24.71.91 server
+    assert ep2.patch_download_url("123", "abc") == "http://10.230.1.88/changes/123/revisions/abc/patch?zip"
+    assert servers["10.1.2.3"].url == "https://review.example.com"
+    assert JiraConfig.link_classifier().classify("https://review.example.com/#/c/12345/").server == "10.1.2.3"
+
+    manager = GerritManager("user")
+    assert manager.ssh_pool.base_args("10.230.1.88")[1:3] == ["-p", "29419"]
+    assert manager.ssh_pool.base_args("10.24.71.91")[1:3] == ["-p", "29418"]
+    manager.ssh_pool.close()
+
+
+def test_limiter_caps_parallel_requests_and_rate():
+    limiter = HostLimiter(max_connections=2)
+    lock = threading.Lock()
+    running = {"now": 0, "max": 0}
+
+    def request():
+        with limiter.request():
+            with lock:
+                running["now"] += 1
+                running["max"] = max(running["max"], running["now"])
+            time.sleep(0.02)
+            with lock:
+                running["now"] -= 1
+
+    threads = [threading.Thread(target=request) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert running["max"] == 2
+
+    limiter = HostLimiter(requests_per_second=50)
+    start = time.monotonic()
+    for _ in range(6):
+        with limiter.request():
+            pass
+    assert time.monotonic() - start >= 5 * 0.02 - 0.005
+    assert limiter.requests == 6
+
+
+def test_limiter_backs_off_and_recovers():
+    limiter = HostLimiter()
+    assert limiter.failed() == limiter.BASE_BACKOFF
+    assert limiter.failed() == 2 * limiter.BASE_BACKOFF
+    assert limiter.failed(delay=10) == 10
+    limiter.succeeded()
+    assert limiter.backoff == 5
+    for _ in range(5):
+        limiter.succeeded()
+    assert limiter.backoff == 0
+
+
+def test_busy_server_is_retried(servers, tmp_path):
+    with StubGerrit(password="") as gerrit:
+        servers["10.24.71.91"] = GerritServer("10.24.71.91", gerrit.url, backend="rest")
+        limiter = fast(servers["10.24.71.91"].limiter)
+
+        gerrit.failures.extend([503, 429])
+        downloader = PatchDownloader(log_callback=lambda _: None)
+        url = servers["10.24.71.91"].patch_download_url("100", "abcdef1")
+        assert downloader.download(url, str(tmp_path / "a.zip"), limiter)
+        downloader.close()
+
+        gerrit.failures.append(502)
+        manager = GerritManager("user")
+        assert manager.query_gerrit("200", "10.24.71.91") == f"{200:040x}"
+        manager.close()
+
+    assert limiter.failures == 3
+    assert len(gerrit.requests) == 5
+
+
+def test_permanent_errors_are_not_retried(servers, tmp_path):
+    with StubGerrit() as gerrit:
+        servers["10.24.71.91"] = GerritServer("10.24.71.91", gerrit.url)
+        limiter = fast(servers["10.24.71.91"].limiter)
+        gerrit.failures.append(403)
+        downloader = PatchDownloader(log_callback=lambda _: None)
+        assert not downloader.download(gerrit.url + "/changes/1/revisions/abc/patch?zip",
+                                       str(tmp_path / "a.zip"), limiter)
+        # A refused download tells a long-lived session to log in again
+        assert downloader.auth_failures == 1
+        downloader.close()
+
+    assert limiter.failures == 0
+    assert len(gerrit.requests) == 1
@@ -0,0 +1,57 @@
+import logging
+
+import pytest
+
+from jira_api import JiraApiClient, extract_urls
+from main import JiraDownloader
+from stub_jira import StubJira
+
+ISSUES = {
+    "HSE-11094": {
+        "description": "Fixed by https://secure.jp.sharp/android_review/gerrit/#/c/448462/",
+        "rendered": '<p><a href="http://10.24.71.91/gerrit/1234567">change</a> '
+                    '<a href="https://example.com/doc?a=1&amp;b=2">doc</a></p>',
+        "remote_links": ["http://10.230.1.88/#/c/98765/"],
+    },
+}
+AUTH = ("dev@example.com", "api-token")
+
+
+@pytest.fixture
+def jira_server():
+    with StubJira(ISSUES, auth=AUTH) as server:
+        yield server
+
+
+def test_extract_urls_unescapes_rendered_html():
+    urls = extract_urls({"rendered": '<a href="https://example.com/?a=1&amp;b=2">x</a>',
+                         "list": ["see http://10.230.1.88/#/c/98765/ here"]})
+    assert urls == ["https://example.com/?a=1&b=2", "http://10.230.1.88/#/c/98765/"]
+
+
+def test_issue_urls_include_fields_and_remote_links(jira_server):
+    client = JiraApiClient(jira_server.url, auth=AUTH)
+    urls = client.get_issue_urls("HSE-11094")
+    client.close()
+
+    assert "https://secure.jp.sharp/android_review/gerrit/#/c/448462/" in urls
+    assert "http://10.24.71.91/gerrit/1234567" in urls
+    assert "http://10.230.1.88/#/c/98765/" in urls
+
+
+def test_capture_without_browser(jira_server, tmp_path):
+    downloader = JiraDownloader(str(tmp_path))
+    downloader.logger = logging.getLogger("test_jira_api")
+    downloader.jira_api = JiraApiClient(jira_server.url, auth=AUTH)
+
+    gerrit_links = downloader.capture_jira_issue("HSE-11094", "X5P")
+    downloader.jira_api.close()
+
+    assert gerrit_links == {
+        "10.24.71.180": ["448462"],
+        "10.24.71.91": ["1234567"],
+        "10.230.1.88": ["98765"],
+    }
+    saved = list((tmp_path / "X5P" / "Investigation").iterdir())
+    assert [path.suffix for path in saved] in ([".html"], [".pdf"])
+    assert not any(path.startswith("/browse/") for path in jira_server.requests)
@@ -0,0 +1,71 @@
+import logging
+from contextlib import contextmanager
+
+from main import LEAN_PREFERENCES, JiraDownloader
+
+
+class FakeFirefox:
+    """Emulates Services.prefs behind the chrome context"""
+
+    CONTEXT_CHROME = "chrome"
+    CONTEXT_CONTENT = "content"
+
+    def __init__(self, user_prefs):
+        self.user_prefs = dict(user_prefs)
+        self.current_context = self.CONTEXT_CONTENT
+        self.loads = []
+
+    @contextmanager
+    def context(self, name):
+        self.current_context = name
+        yield
+        self.current_context = self.CONTEXT_CONTENT
+
+    def execute_script(self, script, preferences):
+        assert self.current_context == self.CONTEXT_CHROME
+        previous = {}
+        for name, value in preferences.items():
+            previous[name] = self.user_prefs.get(name)
+            if value is None:
+                self.user_prefs.pop(name, None)
+            else:
+                self.user_prefs[name] = value
+        return previous
+
+    def get(self, url):
+        self.loads.append((url, dict(self.user_prefs)))
+
+
+def make_downloader(browser, tmp_path):
+    downloader = JiraDownloader(str(tmp_path))
+    downloader.browser = browser
+    downloader.logger = logging.getLogger("test_lean_navigation")
+    return downloader
+
+
+def test_lean_preferences_apply_only_inside_the_block(tmp_path):
+    browser = FakeFirefox({"media.autoplay.default": 1})
+    downloader = make_downloader(browser, tmp_path)
+
+    with downloader.lean_navigation():
+        downloader.load_page("https://jira/browse/ABC-1")
+    downloader.load_page("https://jira/si/ABC-1.html")
+
+    assert browser.loads[0][1] == LEAN_PREFERENCES
+    # Full fidelity again afterwards, including the user's own value
+    assert browser.loads[1][1] == {"media.autoplay.default": 1}
+
+
+def test_unsupported_chrome_context_falls_back_to_full_loads(tmp_path):
+    class NoChromeFirefox(FakeFirefox):
+        def execute_script(self, script, preferences):
+            raise RuntimeError("system access is not allowed")
+
+    browser = NoChromeFirefox({})
+    downloader = make_downloader(browser, tmp_path)
+
+    with downloader.lean_navigation():
+        downloader.load_page("https://jira/browse/ABC-1")
+
+    assert browser.loads == [("https://jira/browse/ABC-1", {})]
+    assert not downloader.lean_supported
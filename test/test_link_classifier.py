@@ -0,0 +1,37 @@
+from link_classifier import GerritLink, GerritLinkClassifier
+from main import JiraConfig
+
+classifier = GerritLinkClassifier(JiraConfig.gerrit_link_prefixes())
+
+
+def test_classifies_each_server_by_prefix():
+    assert classifier.classify("https://secure.jp.sharp/android_review/gerrit/#/c/448462/") == GerritLink(
+        "10.24.71.180", "448462", None, "https://secure.jp.sharp/android_review/gerrit/#/c/448462")
+    assert classifier.classify("http://10.24.71.91/gerrit/#/c/1234567/3").server == "10.24.71.91"
+    assert classifier.classify("http://10.230.1.88/#/c/98765/").server == "10.230.1.88"
+
+
+def test_extracts_patchset_from_gerrit_url_forms():
+    urls = [
+        "http://10.24.71.91/gerrit/1234567",
+        "http://10.24.71.91/gerrit/#/c/1234567/4",
+        "http://10.24.71.91/gerrit/#/c/platform/build/+/1234567/4",
+        "http://10.24.71.91/gerrit/c/platform/build/+/1234567/4",
+    ]
+    links = list(classifier.iter_links(urls))
+    assert [(link.change, link.patchset) for link in links] == [
+        ("1234567", None), ("1234567", 4), ("1234567", 4), ("1234567", 4)]
+
+
+def test_ignores_unrelated_links():
+    assert classifier.classify("https://sharp-smart-mobile-comm.atlassian.net/browse/HSE-11094") is None
+    assert classifier.classify("http://110.230.1.88/#/c/98765/") is None
+    assert classifier.classify("http://10.24.71.91/wiki/1234567") is None
+
+
+def test_scan_text_and_group_by_server():
+    html = ('<a href="http://10.230.1.88/#/c/98765/">a</a> '
+            'see https://secure.jp.sharp/android_review/gerrit/#/c/448462/ and '
+            '<a href="http://10.230.1.88/#/c/98765/2">b</a>')
+    grouped = GerritLinkClassifier.group_by_server(classifier.scan_text(html))
+    assert grouped == {"10.230.1.88": ["98765"], "10.24.71.180": ["448462"]}
@@ -0,0 +1,64 @@
+import logging
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+import requests
+
+from main import PAGE_HREFS_JS, JiraDownloader
+from stub_jira import StubJira
+
+ISSUES = {
+    "HSE-1": {"rendered": '<a href="http://10.24.71.91/gerrit/1234567">change</a>',
+              "remote_links": ["http://10.230.1.88/#/c/98765/", "https://example.com/doc"]},
+}
+
+
+class HrefParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.hrefs = []
+
+    def handle_starttag(self, tag, attrs):
+        self.hrefs.extend(value for name, value in attrs if name == "href")
+
+
+class FakeBrowser:
+    """Loads pages from the stub server and answers the href script like Firefox would"""
+
+    def __init__(self):
+        self.scripts = []
+        self.page = None
+
+    def get(self, url):
+        self.page = requests.get(url, timeout=5)
+
+    def execute_script(self, script, *args):
+        self.scripts.append(script)
+        assert script == PAGE_HREFS_JS
+        parser = HrefParser()
+        parser.feed(self.page.text)
+        # Element.href is the resolved, absolute URL
+        return [urljoin(self.page.url, href) for href in parser.hrefs]
+
+
+def test_links_and_ticket_date_come_from_one_webdriver_call(tmp_path):
+    downloader = JiraDownloader(str(tmp_path))
+    downloader.browser = FakeBrowser()
+    downloader.logger = logging.getLogger("test_link_harvesting")
+
+    with StubJira(ISSUES) as jira:
+        downloader.load_page(jira.url + "browse/HSE-1")
+        gerrit_links = downloader.extract_gerrit_links(downloader.page_urls())
+        ticket_date = downloader.find_ticket_date()
+        assert len(downloader.browser.scripts) == 1
+
+        # A new page is read again
+        downloader.load_page(jira.url + "browse/HSE-1")
+        downloader.page_urls()
+
+    assert gerrit_links == {"10.24.71.91": ["1234567"], "10.230.1.88": ["98765"]}
+    assert ticket_date == 20251201
+    assert len(downloader.browser.scripts) == 2
+    # Four hrefs on the page: each read saves their get_attribute calls, the cached
+    # reuse the find_elements call as well
+    assert downloader.webdriver_commands_saved == 4 + 5 + 4
@@ -0,0 +1,127 @@
+import re
+import time
+
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+
+from page_waits import IMAGES_COMPLETE_JS, RESOURCE_BUFFER_SIZE, RESOURCE_COUNT_JS, PageWaiter
+
+
+class FakeBrowser:
+    """
+    Answers the scripts PageWaiter runs like a page that becomes ready after a
+    number of checks. Resources are counted like the tracker script does: from
+    the timing buffer (250 entries until the script raises the limit) when it is
+    first run, and by the observer after that.
+    """
+
+    def __init__(self, ready_after=0, images_after=0, element_after=0, cookie_after=0,
+                 requested=0, later=()):
+        self.remaining = {"ready": ready_after, "images": images_after,
+                          "element": element_after, "cookie": cookie_after}
+        self.buffer_size = 250
+        self.requested = requested
+        # Resources the page requests before each following count
+        self.later = list(later)
+        self.last_request = None
+        self.tracked = None
+
+    def check(self, condition):
+        if self.remaining[condition]:
+            self.remaining[condition] -= 1
+            return False
+        return True
+
+    def execute_script(self, script, *args):
+        if script == "return document.readyState;":
+            return "complete" if self.check("ready") else "loading"
+        if script == IMAGES_COMPLETE_JS:
+            return self.check("images")
+        assert script == RESOURCE_COUNT_JS
+        new = self.later.pop(0) if self.later else 0
+        if new:
+            self.last_request = time.monotonic()
+        if self.tracked is None:
+            self.tracked = min(self.requested, self.buffer_size)
+            self.buffer_size = args[0]
+        else:
+            self.tracked += new
+        self.requested += new
+        return self.tracked
+
+    def find_element(self, by, value):
+        if not self.check("element"):
+            raise NoSuchElementException(value)
+        return object()
+
+    def get_cookie(self, name):
+        return {"name": name, "value": "session"} if self.check("cookie") else None
+
+
+def make_waiter(browser):
+    logs = []
+    return PageWaiter(browser, logs.append, poll_interval=0.01), logs
+
+
+def test_conditions_are_polled_until_they_hold_and_their_durations_logged():
+    browser = FakeBrowser(ready_after=3, images_after=2, element_after=2, cookie_after=4)
+    waiter, logs = make_waiter(browser)
+
+    assert waiter.document_ready(5)
+    assert waiter.images_complete(5)
+    assert waiter.element_present("login", 5)
+    assert waiter.cookie_present("GerritAccount", 5)
+
+    assert browser.remaining == {"ready": 0, "images": 0, "element": 0, "cookie": 0}
+    names = ["document ready", "images complete", "element 'login'", "cookie 'GerritAccount'"]
+    assert [re.fullmatch(r"Wait for (.+): \d+\.\d\ds", line).group(1) for line in logs] == names
+
+
+def test_timeout_returns_false_and_is_logged():
+    waiter, logs = make_waiter(FakeBrowser(cookie_after=1000))
+
+    start = time.monotonic()
+    assert not waiter.cookie_present("GerritAccount", 0.2)
+    assert time.monotonic() - start >= 0.2
+    assert logs == ["Wait for cookie 'GerritAccount': timed out after 0.2s"]
+
+
+def test_network_idle_waits_until_no_resource_was_requested_for_idle_time():
+    browser = FakeBrowser(later=[0, 3, 0, 2])
+    waiter, logs = make_waiter(browser)
+
+    assert waiter.network_idle(5, idle_time=0.1)
+
+    assert not browser.later
+    assert time.monotonic() - browser.last_request >= 0.1
+    assert logs[0].startswith("Wait for network idle: ")
+
+
+def test_resources_are_counted_past_a_full_timing_buffer():
+    # 300 requests filled the default buffer before the page was first checked
+    browser = FakeBrowser(requested=300, later=[0, 5, 5, 5])
+    waiter, _ = make_waiter(browser)
+
+    assert waiter.network_idle(5, idle_time=0.05)
+    assert browser.buffer_size == RESOURCE_BUFFER_SIZE
+    # The overflow is lost, but every request after the first count still resets the idle timer
+    assert not browser.later
+    assert browser.tracked == 250 + 15
+
+    # Tracking right after a load keeps every later request countable
+    browser = FakeBrowser(requested=10, later=[0, 400])
+    waiter, _ = make_waiter(browser)
+    waiter.track_resources()
+    assert waiter.network_idle(5, idle_time=0.05)
+    assert browser.tracked == browser.requested == 410
+
+
+def test_unresponsive_browser_counts_as_settled():
+    class DeadBrowser(FakeBrowser):
+        def execute_script(self, script, *args):
+            raise WebDriverException("browser has gone away")
+
+    waiter, logs = make_waiter(DeadBrowser())
+    waiter.track_resources()
+    assert not waiter.settled(5)
+    assert logs == ["Could not track page resources: WebDriverException",
+                    "Wait for browser to settle: WebDriverException"]
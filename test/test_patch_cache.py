@@ -0,0 +1,76 @@
+import os
+import threading
+
+from patch_cache import PatchCache
+
+
+def test_cached_patch_is_linked_instead_of_downloaded(tmp_path):
+    cache = PatchCache(str(tmp_path / "cache"), max_bytes=1024 * 1024, log_callback=lambda _: None)
+    downloaded = tmp_path / "ProjectA" / "ABC-1-01.zip"
+    downloaded.parent.mkdir()
+    downloaded.write_bytes(b"PK" + b"x" * 100)
+
+    target = tmp_path / "ProjectB" / "XYZ-9-01.zip"
+    target.parent.mkdir()
+    assert not cache.fetch("10.24.71.91", "123", "ab" * 20, str(target))
+
+    cache.store("10.24.71.91", "123", "ab" * 20, str(downloaded))
+    assert cache.fetch("10.24.71.91", "123", "ab" * 20, str(target))
+    assert target.read_bytes() == downloaded.read_bytes()
+    assert os.path.samefile(target, cache.path_for("10.24.71.91", "123", "ab" * 20))
+    # A different revision of the same change is a different patch
+    assert not cache.fetch("10.24.71.91", "123", "cd" * 20, str(tmp_path / "other.zip"))
+    assert (cache.hits, cache.misses, cache.bytes_saved) == (1, 2, 102)
+
+
+def test_least_recently_used_patches_are_evicted(tmp_path):
+    cache = PatchCache(str(tmp_path / "cache"), max_bytes=1000, log_callback=lambda _: None)
+    for number, age in (("1", 300), ("2", 200), ("3", 100)):
+        source = tmp_path / f"{number}.zip"
+        source.write_bytes(b"PK" + b"x" * 98)
+        cache.store("10.230.1.88", number, number * 40, str(source))
+        cached = cache.path_for("10.230.1.88", number, number * 40)
+        os.utime(cached, (cached.stat().st_atime - age, cached.stat().st_mtime - age))
+
+    # Using patch 1 makes patch 2 the least recently used one
+    assert cache.fetch("10.230.1.88", "1", "1" * 40, str(tmp_path / "copy.zip"))
+    cache.max_bytes = 250
+    cache.evict()
+
+    remaining = sorted(path.name.split("-")[1] for _, _, (path,) in cache.entries())
+    assert remaining == ["1.zip", "3.zip"]
+
+
+def test_store_is_only_scanned_when_over_the_limit(tmp_path, monkeypatch):
+    cache = PatchCache(str(tmp_path / "cache"), max_bytes=1000, log_callback=lambda _: None)
+    scans = []
+    entries = cache.entries
+    monkeypatch.setattr(cache, "entries", lambda: scans.append(1) or entries())
+    for number in range(1, 12):
+        source = tmp_path / f"{number}.zip"
+        source.write_bytes(b"PK" + b"x" * 98)
+        cache.store("10.230.1.88", str(number), f"{number:040d}", str(source))
+
+    # One count on the first store, one eviction when the 11th zip crossed the limit
+    assert len(scans) == 2
+    assert cache.total_bytes == 900 == sum(size for _, size, _ in entries())
+
+
+def test_workers_sharing_one_cache_keep_it_under_the_limit(tmp_path):
+    cache = PatchCache(str(tmp_path / "cache"), max_bytes=2000, log_callback=lambda _: None)
+
+    def worker(start):
+        for number in range(start, start + 20):
+            source = tmp_path / f"{number}.zip"
+            source.write_bytes(b"PK" + b"x" * 98)
+            cache.store("10.230.1.88", str(number), f"{number:040d}", str(source))
+
+    threads = [threading.Thread(target=worker, args=(start,)) for start in (100, 200, 300)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # A zip stored while another worker evicts may be counted twice, never missed
+    stored = sum(size for _, size, _ in cache.entries())
+    assert stored <= cache.total_bytes <= 2000
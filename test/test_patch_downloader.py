@@ -0,0 +1,63 @@
+import zipfile
+
+from patch_downloader import PatchDownloader, holds_revision
+from stub_gerrit import StubGerrit, make_patch_zip
+
+
+def patch_url(gerrit, change):
+    return f"{gerrit.url}/changes/{change}/revisions/{int(change):040x}/patch?zip"
+
+
+def test_patches_are_downloaded_concurrently_over_pooled_connections(tmp_path):
+    with StubGerrit(delay=0.01) as gerrit:
+        downloader = PatchDownloader(max_workers=3, log_callback=lambda _: None)
+        jobs = [(patch_url(gerrit, change), str(tmp_path / f"{change}.zip")) for change in range(100, 109)]
+        results = downloader.download_many(jobs)
+        downloader.close()
+
+    assert results == [True] * 9
+    for _, target in jobs:
+        with zipfile.ZipFile(target) as archive:
+            assert archive.namelist()[0].endswith(".diff")
+    assert len(gerrit.client_ports) <= 3
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_existing_patch_is_not_downloaded_again(tmp_path):
+    target = tmp_path / "100.zip"
+    target.write_bytes(b"PK earlier download")
+    with StubGerrit() as gerrit:
+        downloader = PatchDownloader(log_callback=lambda _: None)
+        assert downloader.download(patch_url(gerrit, "100"), str(target))
+        downloader.close()
+
+    assert gerrit.requests == []
+    assert target.read_bytes() == b"PK earlier download"
+
+
+def test_existing_patch_of_another_change_is_replaced(tmp_path):
+    target = tmp_path / "HSE-1-01.zip"
+    target.write_bytes(make_patch_zip("200", f"{200:040x}"))
+    with StubGerrit() as gerrit:
+        downloader = PatchDownloader(log_callback=lambda _: None)
+        assert downloader.download(patch_url(gerrit, "100"), str(target), revision=f"{100:040x}")
+        downloader.close()
+
+    assert len(gerrit.requests) == 1
+    assert holds_revision(target, f"{100:040x}")
+
+
+def test_login_page_is_not_saved_as_a_patch(tmp_path):
+    target = tmp_path / "100.zip"
+    with StubGerrit(login_cookie="GerritAccount=session") as gerrit:
+        downloader = PatchDownloader(log_callback=lambda _: None)
+        assert not downloader.download(patch_url(gerrit, "100"), str(target))
+        assert not target.exists() and not list(tmp_path.glob("*.part"))
+        assert downloader.auth_failures == 1
+
+        # The browser's login cookies make the same URL serve the zip
+        downloader.update_cookies([{"name": "GerritAccount", "value": "session", "domain": "127.0.0.1"}])
+        assert downloader.download(patch_url(gerrit, "100"), str(target))
+        downloader.close()
+
+    assert zipfile.is_zipfile(target)
@@ -0,0 +1,31 @@
+import base64
+
+from main import FileManager
+
+
+class FakeBrowser:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.options = None
+
+    def print_page(self, options):
+        if self.fail:
+            raise RuntimeError("print not supported")
+        self.options = options
+        return base64.b64encode(b"%PDF-1.4 loaded page").decode()
+
+
+def test_loaded_page_is_printed_with_the_wkhtmltopdf_layout(tmp_path):
+    browser = FakeBrowser()
+    target = tmp_path / "ABC-1.pdf"
+
+    assert FileManager.print_browser_page(browser, str(target), lambda _: None)
+    assert target.read_bytes() == b"%PDF-1.4 loaded page"
+    assert (browser.options.page_width, browser.options.margin_top) == (21.0, 2.4)
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_print_failure_leaves_no_file(tmp_path):
+    target = tmp_path / "ABC-1.pdf"
+    assert not FileManager.print_browser_page(FakeBrowser(fail=True), str(target), lambda _: None)
+    assert not target.exists()
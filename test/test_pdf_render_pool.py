@@ -0,0 +1,53 @@
+import threading
+from pathlib import Path
+
+from pdf_render_pool import PdfRenderPool
+
+
+def fake_render(url, cookies, target_path, log_callback, auth=None):
+    if "broken" in url:
+        return False
+    Path(target_path).write_bytes(b"%PDF-1.4")
+    return True
+
+
+def test_renders_in_background_and_handles_fallback_html(tmp_path):
+    pool = PdfRenderPool(fake_render, workers=2, log_callback=lambda _: None)
+    for name in ("ABC-1", "ABC-2"):
+        (tmp_path / f"{name}_temp.html").write_text("<html></html>")
+
+    pool.submit("https://jira/ABC-1.html", [], str(tmp_path / "ABC-1.pdf"),
+                fallback_html=str(tmp_path / "ABC-1_temp.html"),
+                fallback_target=str(tmp_path / "ABC-1.html"))
+    pool.submit("https://jira/broken/ABC-2.html", [], str(tmp_path / "ABC-2.pdf"),
+                fallback_html=str(tmp_path / "ABC-2_temp.html"),
+                fallback_target=str(tmp_path / "ABC-2.html"))
+    pool.close()
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["ABC-1.pdf", "ABC-2.html"]
+    assert pool.queue_depth() == 0
+    assert pool.stats().startswith("2 rendered (1 failed)")
+
+
+def test_submit_blocks_when_the_queue_is_full(tmp_path):
+    release = threading.Event()
+
+    def slow_render(url, cookies, target_path, log_callback, auth=None):
+        release.wait(5)
+        return fake_render(url, cookies, target_path, log_callback, auth)
+
+    pool = PdfRenderPool(slow_render, workers=1, max_pending=2, log_callback=lambda _: None)
+    pool.submit("https://jira/1", [], str(tmp_path / "1.pdf"))
+    pool.submit("https://jira/2", [], str(tmp_path / "2.pdf"))
+
+    third = threading.Thread(target=pool.submit, args=("https://jira/3", [], str(tmp_path / "3.pdf")))
+    third.start()
+    third.join(0.2)
+    assert third.is_alive()
+    assert pool.queue_depth() == 2
+
+    release.set()
+    third.join(5)
+    pool.close()
+    assert pool.max_queue_depth == 2
+    assert len(list(tmp_path.glob("*.pdf"))) == 3
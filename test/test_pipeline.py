@@ -0,0 +1,95 @@
+import threading
+import time
+
+from pipeline import Pipeline, Stage
+
+
+def test_items_pass_every_stage_and_failures_are_dropped():
+    def parse(item):
+        if item == "bad":
+            raise ValueError("cannot parse")
+        return int(item)
+
+    stages = [Stage("parse", parse, 2), Stage("square", lambda n: n * n, 3),
+              Stage("odd", lambda n: n if n % 2 else None)]
+    errors = []
+    pipeline = Pipeline(stages, errors.append)
+
+    finished = pipeline.run(["1", "2", "bad", "3", "4", "5"])
+
+    assert sorted(finished) == [1, 9, 25]
+    assert pipeline.ingested == 6
+    assert (stages[0].processed, stages[0].failed) == (5, 1)
+    assert stages[2].processed == 5
+    assert errors == ["parse failed for bad: cannot parse"]
+
+
+def test_stage_concurrency_is_limited():
+    lock = threading.Lock()
+    running = {"now": 0, "max": 0}
+
+    def work(item):
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        time.sleep(0.02)
+        with lock:
+            running["now"] -= 1
+        return item
+
+    Pipeline([Stage("work", work, 3)]).run(range(12))
+    assert running["max"] == 3
+
+
+def test_slow_stage_does_not_hold_up_earlier_stages():
+    release = threading.Event()
+    fetched = []
+
+    def fetch(item):
+        fetched.append(item)
+        return item
+
+    def slow_resolve(item):
+        release.wait(5)
+        return item
+
+    stages = [Stage("fetch", fetch, 1, queue_size=4), Stage("resolve", slow_resolve, 1, queue_size=4)]
+    result = []
+    runner = threading.Thread(target=lambda: result.extend(Pipeline(stages).run(range(20))))
+    runner.start()
+
+    # Fetching continues while the first item is stuck in the slow stage,
+    # until that stage's bounded queue is full
+    deadline = time.monotonic() + 5
+    while len(fetched) < 6 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert 6 <= len(fetched) < 20
+
+    release.set()
+    runner.join(5)
+    assert sorted(result) == list(range(20))
+    assert stages[1].max_queue_depth == 4
+
+
+def test_batching_stage_takes_every_queued_item():
+    release = threading.Event()
+    batches = []
+
+    def resolve(items):
+        release.wait(5)
+        batches.append(list(items))
+        return [item for item in items if item != 3]
+
+    def produce(item):
+        if item == 11:
+            release.set()
+        return item
+
+    stages = [Stage("produce", produce), Stage("resolve", resolve, 1, queue_size=20, batch_size=5)]
+    finished = Pipeline(stages).run(range(12))
+
+    assert sorted(finished) == [n for n in range(12) if n != 3]
+    assert sorted(n for batch in batches for n in batch) == list(range(12))
+    assert max(len(batch) for batch in batches) == 5
+    assert len(batches) <= 4
+    assert stages[1].processed == 12
@@ -0,0 +1,45 @@
+import os
+import time
+
+from profile_builder import ProfileBuilder
+
+
+def make_profile(path):
+    path.mkdir()
+    for name in ("cookies.sqlite", "logins.json", "key4.db", "cert9.db", "places.sqlite"):
+        (path / name).write_bytes(name.encode())
+    (path / "cache2").mkdir()
+    (path / "cache2" / "entry").write_bytes(b"x" * 1024)
+    (path / "extensions").mkdir()
+    return path
+
+
+def test_template_holds_only_login_state_and_automation_prefs(tmp_path):
+    source = make_profile(tmp_path / "default")
+    builder = ProfileBuilder(str(source), str(tmp_path / "template"), log_callback=lambda _: None)
+
+    first = builder.create_instance(str(tmp_path / "run" / "one"))
+    second = builder.create_instance(str(tmp_path / "run" / "two"))
+
+    assert first != second
+    assert sorted(os.listdir(first)) == ["cert9.db", "cookies.sqlite", "key4.db", "logins.json", "user.js"]
+    user_js = (tmp_path / "run" / "two" / "user.js").read_text()
+    assert 'user_pref("app.update.auto", false);' in user_js
+    assert 'user_pref("network.http.speculative-parallel-limit", 0);' in user_js
+    assert 'user_pref("browser.startup.homepage", "about:blank");' in user_js
+
+
+def test_template_is_rebuilt_when_logins_change(tmp_path):
+    source = make_profile(tmp_path / "default")
+    builder = ProfileBuilder(str(source), str(tmp_path / "template"), log_callback=lambda _: None)
+    builder.build_template()
+    assert not builder.is_stale()
+
+    later = time.time() + 5
+    (source / "cookies.sqlite").write_bytes(b"new session")
+    os.utime(source / "cookies.sqlite", (later, later))
+    assert builder.is_stale()
+
+    builder.build_template()
+    assert (tmp_path / "template" / "cookies.sqlite").read_bytes() == b"new session"
+    assert not (tmp_path / "template.old").exists()
@@ -0,0 +1,64 @@
+from run_manifest import CAPTURED, DONE, FAILED, PENDING, RunManifest
+
+
+def test_captured_links_survive_a_restart(tmp_path):
+    document = tmp_path / "ABC-1.pdf"
+    document.write_bytes(b"%PDF")
+    manifest = RunManifest(str(tmp_path / "manifest.sqlite"))
+    assert manifest.issue_state("ABC-1", "Folder") == PENDING
+    manifest.mark_issue_captured("ABC-1", "Folder", {"10.24.71.91": ["1", "2"]}, str(document))
+    manifest.close()
+
+    manifest = RunManifest(str(tmp_path / "manifest.sqlite"))
+    assert manifest.issue_state("ABC-1", "Folder") == CAPTURED
+    assert manifest.captured_links("ABC-1", "Folder") == {"10.24.71.91": ["1", "2"]}
+
+    # A deleted document means the issue has to be captured again
+    document.unlink()
+    assert manifest.captured_links("ABC-1", "Folder") is None
+    manifest.close()
+
+
+def test_patch_is_done_only_for_same_revision_on_disk(tmp_path):
+    zip_path = tmp_path / "ABC-1-01.zip"
+    manifest = RunManifest(str(tmp_path / "manifest.sqlite"))
+    manifest.mark_patch("ABC-1", "Folder", "10.24.71.91", "1", "aaa", DONE, str(zip_path))
+
+    assert not manifest.patch_done("ABC-1", "Folder", "10.24.71.91", "1", "aaa")
+    zip_path.write_bytes(b"PK")
+    assert manifest.patch_done("ABC-1", "Folder", "10.24.71.91", "1", "aaa")
+    assert not manifest.patch_done("ABC-1", "Folder", "10.24.71.91", "1", "bbb")
+
+    manifest.mark_patch("ABC-1", "Folder", "10.24.71.91", "2", "ccc", FAILED, None)
+    assert not manifest.patch_done("ABC-1", "Folder", "10.24.71.91", "2", "ccc")
+    assert manifest.summary()["patches"] == {DONE: 1, FAILED: 1}
+    manifest.close()
+
+
+def test_failed_capture_is_retried_and_reset_forgets_progress(tmp_path):
+    manifest = RunManifest(str(tmp_path / "manifest.sqlite"))
+    manifest.mark_issue_failed("ABC-2", "Folder", "timeout")
+    assert manifest.issue_state("ABC-2", "Folder") == FAILED
+    assert manifest.captured_links("ABC-2", "Folder") is None
+
+    manifest.mark_issue_captured("ABC-2", "Folder", {})
+    manifest.mark_issue_done("ABC-2", "Folder")
+    assert manifest.issue_state("ABC-2", "Folder") == DONE
+
+    manifest.reset()
+    assert manifest.issue_state("ABC-2", "Folder") == PENDING
+    manifest.close()
+
+
+def test_done_issue_whose_pdf_was_never_rendered_is_not_skipped(tmp_path):
+    document = tmp_path / "ABC-3.pdf"
+    manifest = RunManifest(str(tmp_path / "manifest.sqlite"))
+    # The run was stopped while the PDF was still queued for rendering
+    manifest.mark_issue_captured("ABC-3", "Folder", {}, str(document))
+    manifest.mark_issue_done("ABC-3", "Folder")
+    assert manifest.issue_state("ABC-3", "Folder") == DONE
+    assert not manifest.issue_done("ABC-3", "Folder")
+
+    document.write_bytes(b"%PDF")
+    assert manifest.issue_done("ABC-3", "Folder")
+    manifest.close()
@@ -0,0 +1,53 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+from main import GerritManager
+from ssh_pool import SshConnectionPool
+
+FAKE_SSH = str(Path(__file__).parent / "fake_ssh.py")
+
+
+@pytest.fixture
+def ssh_pool(tmp_path, monkeypatch):
+    if sys.platform == "win32":
+        pytest.skip("ControlMaster is not available on Windows")
+    monkeypatch.setenv("FAKE_SSH_STATE", str(tmp_path))
+    pool = SshConnectionPool("user", ssh_command=FAKE_SSH)
+    yield pool
+    pool.close()
+
+
+def connections(tmp_path):
+    log = tmp_path / "connections.log"
+    return len(log.read_text().splitlines()) if log.exists() else 0
+
+
+def test_queries_share_one_connection(ssh_pool, tmp_path):
+    manager = GerritManager("user", ssh_pool)
+    manager.QUERY_CHUNK_SIZE = 2
+
+    resolved = manager.resolve_changes("10.24.71.91", ["1", "2", "3", "4", "5"])
+
+    assert sorted(resolved) == ["1", "2", "3", "4", "5"]
+    assert resolved["3"].revision == "rev3"
+    assert connections(tmp_path) == 1
+    assert ssh_pool.is_alive("10.24.71.91")
+
+
+def test_reconnects_after_connection_drop(ssh_pool, tmp_path):
+    manager = GerritManager("user", ssh_pool)
+    assert manager.query_gerrit("1", "10.24.71.91") == "rev1"
+
+    (tmp_path / "drop").touch()
+    assert manager.query_gerrit("2", "10.24.71.91") == "rev2"
+    assert connections(tmp_path) == 2
+
+
+def test_close_shuts_down_master_connections(ssh_pool):
+    GerritManager("user", ssh_pool).query_gerrit("1", "10.230.1.88")
+    assert ssh_pool.is_alive("10.230.1.88")
+
+    ssh_pool.reset("10.230.1.88")
+    assert not ssh_pool.is_alive("10.230.1.88")
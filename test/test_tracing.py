@@ -0,0 +1,66 @@
+import json
+import threading
+
+import pytest
+
+import tracing
+
+
+@pytest.fixture(autouse=True)
+def stop_tracing():
+    yield
+    tracing.stop()
+
+
+def test_nested_spans_inherit_tags():
+    tracing.start()
+    with tracing.span("issue.capture", issue="HSE-1", worker="worker1"):
+        with tracing.span("gerrit.query", server="10.24.71.91") as span:
+            span.tag(found=3)
+    spans = tracing.stop()
+
+    assert [record["name"] for record in spans] == ["gerrit.query", "issue.capture"]
+    assert spans[0]["tags"] == {"issue": "HSE-1", "worker": "worker1",
+                                "server": "10.24.71.91", "found": 3}
+    assert spans[1]["tags"] == {"issue": "HSE-1", "worker": "worker1"}
+    assert spans[1]["start_us"] <= spans[0]["start_us"]
+    assert spans[1]["duration_us"] >= spans[0]["duration_us"]
+
+
+def test_failed_span_is_tagged_and_disabled_tracing_records_nothing():
+    with tracing.span("download.wait") as span:
+        span.tag(ignored=True)
+    assert not tracing.enabled()
+
+    tracing.start()
+    with pytest.raises(ValueError):
+        with tracing.span("pdf.render", issue="HSE-2"):
+            raise ValueError("wkhtmltopdf crashed")
+    spans = tracing.stop()
+    assert spans[0]["tags"] == {"issue": "HSE-2", "error": "ValueError"}
+
+
+def test_export_writes_jsonl_and_a_chrome_trace(tmp_path):
+    tracing.start()
+
+    def work(name):
+        with tracing.span("patches.http", worker=name):
+            pass
+
+    threads = [threading.Thread(target=work, args=(f"worker{n}",), name=f"worker{n}")
+               for n in (1, 2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    jsonl_path, trace_path = tracing.export(tracing.stop(), tmp_path / "traces", "run")
+
+    records = [json.loads(line) for line in jsonl_path.read_text().splitlines()]
+    assert sorted(record["thread"] for record in records) == ["worker1", "worker2"]
+
+    events = json.loads(trace_path.read_text())["traceEvents"]
+    names = {event["args"]["name"] for event in events if event["ph"] == "M"}
+    complete = [event for event in events if event["ph"] == "X"]
+    assert names == {"worker1", "worker2"}
+    assert {event["cat"] for event in complete} == {"patches"}
+    assert len({event["tid"] for event in complete}) == 2
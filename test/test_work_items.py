@@ -0,0 +1,58 @@
+import openpyxl
+import pytest
+
+from work_items import WorkListReader
+
+
+def test_excel_rows_are_normalized_and_deduplicated(tmp_path):
+    path = tmp_path / "sheet.xlsx"
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["JIRA ID", "Folder Name"])
+    sheet.append(["HSE-1", "X5P"])
+    sheet.append(["  hse-2 ", None])
+    sheet.append(["['HSE-3', 'HSE-4']", "Lists"])
+    sheet.append([None, "empty"])
+    sheet.append(["hse-1", "X5P"])
+    sheet.append(["HSE-1", "Other folder"])
+    workbook.save(path)
+
+    reader = WorkListReader(str(path))
+    assert list(reader) == [("HSE-1", "X5P"), ("HSE-2", "HSE-2"), ("HSE-3", "Lists"),
+                            ("HSE-1", "Other folder")]
+    assert (reader.rows, reader.duplicates, reader.empty) == (6, 1, 1)
+
+
+def test_csv_and_jsonl_work_lists(tmp_path):
+    csv_path = tmp_path / "issues.csv"
+    csv_path.write_text("JIRA ID,Folder Name\nPROJ-1,Feature\nPROJ-2\n", encoding="utf-8")
+    assert list(WorkListReader(str(csv_path))) == [("PROJ-1", "Feature"), ("PROJ-2", "PROJ-2")]
+
+    jsonl_path = tmp_path / "issues.jsonl"
+    jsonl_path.write_text('{"jira_id": "PROJ-1", "folder": "Feature"}\n'
+                          '\n'
+                          '["PROJ-2", "Other"]\n'
+                          '"PROJ-3"\n'
+                          '{"key": "proj-1", "folder_name": "Feature"}\n', encoding="utf-8")
+    reader = WorkListReader(str(jsonl_path))
+    assert list(reader) == [("PROJ-1", "Feature"), ("PROJ-2", "Other"), ("PROJ-3", "PROJ-3")]
+    assert reader.duplicates == 1
+
+
+def test_rows_are_yielded_lazily_and_malformed_lines_skipped(tmp_path):
+    path = tmp_path / "issues.jsonl"
+    path.write_text('"PROJ-1"\n{not json}\n"PROJ-2"\n', encoding="utf-8")
+    messages = []
+    reader = WorkListReader(str(path), messages.append)
+    items = iter(reader)
+    # The broken second line is only reached when it is asked for
+    assert next(items) == ("PROJ-1", "PROJ-1")
+    assert messages == []
+    assert list(items) == [("PROJ-2", "PROJ-2")]
+    assert reader.malformed == 1
+    assert messages[0].startswith("Skipping malformed line 2 of issues.jsonl")
+
+
+def test_unsupported_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Unsupported work list format"):
+        list(WorkListReader(str(tmp_path / "issues.xls")))